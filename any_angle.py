@@ -0,0 +1,203 @@
+import heapq
+import math
+import numpy as np
+
+# 8-connected moves, straight ones first
+MOVES8 = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+
+# Lazy Theta* runs on square blocks of pixels, as many as keep the block grid at
+# about this many cells a side
+THETA_GRID = 128
+
+
+def line_of_sight(free, a, b):
+    """
+    Whether the straight segment from pixel a to pixel b only crosses free pixels.
+    The segment is sampled twice per pixel step and both the floor and the ceiling
+    of every sample are checked, so it cannot slip through a diagonal gap. All four
+    corners of the samples are read from the flat map in one gather.
+    """
+    steps = 2 * max(abs(b[0] - a[0]), abs(b[1] - a[1]))
+    if steps == 0:
+        return bool(free[a])
+    t = np.arange(steps + 1) / steps
+    rows = a[0] + t * (b[0] - a[0])
+    cols = a[1] + t * (b[1] - a[1])
+    width = free.shape[1]
+    low_rows, high_rows = rows.astype(np.int64) * width, np.ceil(rows).astype(np.int64) * width
+    low_cols, high_cols = cols.astype(np.int64), np.ceil(cols).astype(np.int64)
+    corners = np.concatenate((low_rows + low_cols, high_rows + high_cols, low_rows + high_cols, high_rows + low_cols))
+    return bool(free.reshape(-1)[corners].all())
+
+
+def distance(a, b):
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+
+def lazy_theta_star(free, start, end, stats=None):
+    """
+    Lazy Theta* on the 8-connected free pixels of a boolean map: like A* with a
+    Euclidean heuristic, but a cell may take the parent of the cell it was reached
+    from as its own parent, so paths run in straight lines at any angle. The line
+    of sight to that parent is only checked when the cell is expanded; if it fails,
+    the cell falls back to its best expanded neighbour.
+
+    Returns the path vertices from start to end as (row, col) tuples, or None. If
+    a `stats` dict is given, the expanded cells and line-of-sight checks are stored
+    under "expanded" and "checks".
+    """
+    height, width = free.shape
+    start = (int(start[0]), int(start[1]))
+    end = (int(end[0]), int(end[1]))
+    g = {start: 0.0}
+    parent = {start: start}
+    closed = set()
+    queue = [(distance(start, end), start)]
+    expanded = checks = 0
+
+    def neighbors(cell):
+        r, c = cell
+        for dr, dc in MOVES8:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < height and 0 <= nc < width and free[nr, nc]:
+                # a diagonal move may not cut the corner of a wall
+                if dr and dc and not (free[r + dr, c] and free[r, c + dc]):
+                    continue
+                yield (nr, nc)
+
+    while queue:
+        f, cell = heapq.heappop(queue)
+        if cell in closed:
+            continue
+        # set the vertex: check the lazily assumed line of sight
+        if parent[cell] != cell:
+            checks += 1
+            if not line_of_sight(free, parent[cell], cell):
+                best = min((n for n in neighbors(cell) if n in closed), key=lambda n: g[n] + distance(n, cell))
+                parent[cell] = best
+                g[cell] = g[best] + distance(best, cell)
+        closed.add(cell)
+        expanded += 1
+        if cell == end:
+            break
+
+        through = parent[cell]
+        for n in neighbors(cell):
+            if n in closed:
+                continue
+            cost = g[through] + distance(through, n)
+            if cost < g.get(n, math.inf):
+                g[n] = cost
+                parent[n] = through
+                heapq.heappush(queue, (cost + distance(n, end), n))
+
+    if stats is not None:
+        stats["expanded"] = expanded
+        stats["checks"] = checks
+    if end not in closed:
+        return None
+    vertices = [end]
+    while vertices[-1] != start:
+        vertices.append(parent[vertices[-1]])
+    return vertices[::-1]
+
+
+def pull_string(chain, free):
+    """
+    Fewest straight segments along a dense chain of pixels: from each kept pixel
+    the step along the chain doubles while the far pixel is in sight, then a
+    binary search between the last pixel seen and the first one hidden picks the
+    next. Takes O(log n) line-of-sight checks per kept vertex instead of O(n).
+    """
+    kept = [chain[0]]
+    i = 0
+    while i < len(chain) - 1:
+        seen, step = i + 1, 1
+        while seen + step < len(chain) and line_of_sight(free, chain[i], chain[seen + step]):
+            seen += step
+            step *= 2
+        hidden = min(seen + step, len(chain))
+        while hidden - seen > 1:
+            middle = (seen + hidden) // 2
+            if line_of_sight(free, chain[i], chain[middle]):
+                seen = middle
+            else:
+                hidden = middle
+        kept.append(chain[seen])
+        i = seen
+    return kept
+
+
+def densify(vertices):
+    """
+    Pixels one step apart along the straight segments between the vertices.
+    """
+    chain = []
+    for a, b in zip(vertices[:-1], vertices[1:]):
+        steps = max(abs(b[0] - a[0]), abs(b[1] - a[1]), 1)
+        t = np.arange(steps) / steps
+        rows = np.round(a[0] + t * (b[0] - a[0])).astype(int)
+        cols = np.round(a[1] + t * (b[1] - a[1])).astype(int)
+        chain.extend(zip(rows.tolist(), cols.tolist()))
+    chain.append(tuple(vertices[-1]))
+    return list(dict.fromkeys(chain))
+
+
+def block_theta_star(free, start, end, factor, stats=None):
+    """
+    Lazy Theta* on factor x factor blocks of a boolean map, where a block is free
+    only when all its pixels are. The block path is returned as the pixels at the
+    block centres, between start and end, or None if the blocks have no path or a
+    segment between the centres is not in sight on the pixels.
+    """
+    if factor == 1:
+        return lazy_theta_star(free, start, end, stats=stats)
+    height, width = free.shape
+    rows, cols = -(-height // factor), -(-width // factor)
+    padded = np.zeros((rows * factor, cols * factor), dtype=bool)
+    padded[:height, :width] = free
+    blocks = padded.reshape(rows, factor, cols, factor).all(axis=(1, 3))
+    block_start = (start[0] // factor, start[1] // factor)
+    block_end = (end[0] // factor, end[1] // factor)
+    blocks[block_start] = True
+    blocks[block_end] = True
+    cells = lazy_theta_star(blocks, block_start, block_end, stats=stats)
+    if cells is None:
+        return None
+    centre = (factor - 1) // 2
+    vertices = ([(int(start[0]), int(start[1]))] +
+                [(min(r * factor + centre, height - 1), min(c * factor + centre, width - 1)) for r, c in cells[1:-1]] +
+                [(int(end[0]), int(end[1]))])
+    if not all(line_of_sight(free, a, b) for a, b in zip(vertices[:-1], vertices[1:])):
+        return None
+    return vertices
+
+
+def any_angle_search(maze_map, start, end, clearance=None, min_clearance=1, stats=None, grid=THETA_GRID):
+    """
+    Straight-segment waypoints from start to end at any angle. Free pixels are those
+    of maze_map (1 = free), or those with at least `min_clearance` in a clearance
+    map (see clearance_map) when one is given; start and end are always free.
+
+    Lazy Theta* runs on blocks of pixels so that the block grid is about `grid`
+    cells a side, which bounds its time whatever the image size; blocks are halved
+    while corridors narrower than a block leave no path. The block path is then
+    pulled taut on the pixels. Returns a list of (row, col) waypoints or None. If a
+    `stats` dict is given, the block size is stored under "factor".
+    """
+    free = maze_map == 1 if clearance is None else clearance >= min_clearance
+    free = free.copy()
+    free[start] = True
+    free[end] = True
+    factor = max(1, math.ceil(max(free.shape) / grid))
+    while True:
+        vertices = block_theta_star(free, start, end, factor, stats=stats)
+        if vertices is not None or factor == 1:
+            break
+        factor //= 2
+    if stats is not None:
+        stats["factor"] = factor
+    if vertices is None:
+        return None
+    return pull_string(densify(vertices), free)
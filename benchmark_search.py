@@ -0,0 +1,641 @@
+import sys
+import time
+import numpy as np
+import maze_solving
+import solution_path
+import grid_search
+
+
+def make_test_blocks(size, cell=64, wall=8, seed=0):
+    """
+    Block grid (255 = free, 0 = wall) of the maze make_test_maze draws, and the width
+    in pixels of every block row and column.
+    """
+    rng = np.random.default_rng(seed)
+    cells = max(2, (size - wall) // cell)
+
+    # Perfect maze on the cell grid with an iterative depth-first search
+    blocks = np.zeros((2 * cells + 1, 2 * cells + 1), dtype=np.uint8)
+    blocks[1::2, 1::2] = 255
+    seen = np.zeros((cells, cells), dtype=bool)
+    stack = [(0, 0)]
+    seen[0, 0] = True
+    while stack:
+        r, c = stack[-1]
+        options = [(r + dr, c + dc) for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]
+                   if 0 <= r + dr < cells and 0 <= c + dc < cells and not seen[r + dr, c + dc]]
+        if not options:
+            stack.pop()
+            continue
+        nr, nc = options[rng.integers(len(options))]
+        blocks[r + nr + 1, c + nc + 1] = 255
+        seen[nr, nc] = True
+        stack.append((nr, nc))
+
+    blocks[0, 1] = 255
+    blocks[-1, -2] = 255
+
+    # Walls are `wall` wide and corridors fill the rest of a cell, the last corridor
+    # absorbs whatever is left so the image is exactly size x size
+    repeats = np.array([wall if i % 2 == 0 else cell - wall for i in range(2 * cells + 1)])
+    repeats[-2] += size - repeats.sum()
+    return blocks, repeats
+
+
+def make_test_maze(size, cell=64, wall=8, seed=0):
+    """
+    Generate a size x size binary maze image (255 = free, 0 = wall) built on a regular
+    block grid like our physical mazes, with an opening on the top and bottom borders.
+    """
+    blocks, repeats = make_test_blocks(size, cell, wall, seed)
+    return np.repeat(np.repeat(blocks, repeats, axis=0), repeats, axis=1)
+
+
+def write_test_maze(path, size, cell=64, wall=8, seed=0):
+    """
+    Write the make_test_maze image to an 8-bit PGM file one block row at a time, so
+    sheets far larger than memory can be generated.
+    """
+    import tiled_maze
+
+    blocks, repeats = make_test_blocks(size, cell, wall, seed)
+    with open(path, "wb") as f:
+        tiled_maze.write_pgm_header(f, (size, size))
+        for row, count in zip(blocks, repeats):
+            np.tile(np.repeat(row, repeats), (count, 1)).tofile(f)
+
+
+def load_maze(size_or_path, **kwargs):
+    """
+    Return (maze_map, entrance, exit_point) for a synthetic maze size or an image file.
+    """
+    if isinstance(size_or_path, int):
+        binary_img = make_test_maze(size_or_path, **kwargs)
+    else:
+        import cv2
+        img = cv2.imread(size_or_path, cv2.IMREAD_GRAYSCALE)
+        _, binary_img = cv2.threshold(img, 127, 255, cv2.THRESH_BINARY)
+
+    entrance, exit_point = maze_solving.detect_entrance_exit(binary_img)
+    maze_map = (binary_img // 255).astype(np.uint8)
+    maze_map[entrance] = 1
+    maze_map[exit_point] = 1
+    return maze_map, entrance, exit_point
+
+
+def reference_bfs(maze_map, start, end):
+    """
+    The original list-queue BFS from find_solution_path, kept only as a baseline.
+    """
+    queue = [start]
+    visited = set()
+    prev = {start: None}
+
+    while queue:
+        current = queue.pop(0)
+        if current in visited:
+            continue
+        visited.add(current)
+        if current == end:
+            break
+        for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+            neighbor = (current[0] + dx, current[1] + dy)
+            if (
+                0 <= neighbor[0] < maze_map.shape[0]
+                and 0 <= neighbor[1] < maze_map.shape[1]
+                and maze_map[neighbor] == 1
+                and neighbor not in visited
+            ):
+                queue.append(neighbor)
+                prev[neighbor] = current
+
+    if end not in visited:
+        return None
+    path = []
+    current = end
+    while current is not None:
+        path.append(current)
+        current = prev[current]
+    path.reverse()
+    return path
+
+
+def time_call(function, *args, **kwargs):
+    """
+    Run function once and return (result, seconds).
+    """
+    t0 = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - t0
+
+
+def benchmark_bfs(sizes=(1024, 4096, 8192), reference_limit=1024):
+    """
+    Time grid_search.bfs_search against the original BFS on synthetic square mazes.
+    The original is only run up to `reference_limit` pixels per side.
+    """
+    print(f"{'size':>6} {'free px':>10} {'path px':>8} {'bfs_search':>11} {'original':>10}")
+    for size in sizes:
+        maze_map, entrance, exit_point = load_maze(size)
+        path, seconds = time_call(grid_search.bfs_search, maze_map, entrance, exit_point)
+        original = "-"
+        if size <= reference_limit:
+            _, reference_seconds = time_call(reference_bfs, maze_map, entrance, exit_point)
+            original = f"{reference_seconds:.2f}s"
+        print(f"{size:>6} {int(maze_map.sum()):>10} {len(path):>8} {seconds:>10.2f}s {original:>10}")
+
+
+def benchmark_methods(targets=(1024, 4096), methods=("bfs", "astar", "jps"), **maze_kwargs):
+    """
+    Compare path length, expanded nodes and time of the grid_search methods.
+    `targets` are synthetic maze sizes or maze image paths.
+    """
+    print(f"{'maze':>12} {'method':>20} {'path px':>8} {'expanded':>10} {'time':>8}")
+    for target in targets:
+        maze_map, entrance, exit_point = load_maze(target, **maze_kwargs)
+        label = str(target)[-12:]
+        for method in methods:
+            stats = {}
+            path, seconds = time_call(grid_search.search, maze_map, entrance, exit_point, method=method, stats=stats)
+            print(f"{label:>12} {method:>20} {len(path):>8} {stats['expanded']:>10} {seconds:>7.2f}s")
+
+
+def benchmark_bidirectional(targets=(1024, 4096), **maze_kwargs):
+    """
+    Compare the bidirectional BFS with the one-sided one on the same mazes.
+    """
+    benchmark_methods(targets, ("bfs", "bidirectional"), **maze_kwargs)
+
+
+def benchmark_skeleton(targets=(1024, 4096), **maze_kwargs):
+    """
+    Time building the skeleton junction graph, a first query and a repeated query,
+    against one full-frame BFS.
+    """
+    import maze_graph
+
+    print(f"{'maze':>12} {'nodes':>7} {'build':>8} {'query':>9} {'repeat':>9} {'bfs':>8}")
+    for target in targets:
+        maze_map, entrance, exit_point = load_maze(target, **maze_kwargs)
+        graph, build = time_call(maze_graph.SkeletonGraph, maze_map)
+        _, query = time_call(graph.solve, entrance, exit_point)
+        _, repeat = time_call(graph.solve, entrance, exit_point)
+        _, bfs = time_call(grid_search.bfs_search, maze_map, entrance, exit_point)
+        print(f"{str(target)[-12:]:>12} {len(graph.nodes):>7} {build:>7.2f}s {query * 1e3:>7.1f}ms "
+              f"{repeat * 1e6:>7.1f}us {bfs:>7.2f}s")
+
+
+def benchmark_lattice(sizes=(1032, 4104), **maze_kwargs):
+    """
+    Time lattice detection plus the cell-level solve against one full-frame BFS.
+    Sizes of cells * 64 + 8 give a maze with a perfectly regular grid.
+    """
+    import maze_lattice
+
+    print(f"{'size':>6} {'cells':>9} {'detect':>9} {'solve':>9} {'waypoints':>10} {'bfs':>8}")
+    for size in sizes:
+        binary_img = make_test_maze(size, **maze_kwargs)
+        maze_map, entrance, exit_point = load_maze(size, **maze_kwargs)
+        lattice, detect = time_call(maze_lattice.detect_lattice, binary_img)
+        waypoints, solve = time_call(lattice.solve, entrance, exit_point)
+        _, bfs = time_call(grid_search.bfs_search, maze_map, entrance, exit_point)
+        cells = f"{lattice.shape[0]}x{lattice.shape[1]}"
+        print(f"{size:>6} {cells:>9} {detect * 1e3:>7.1f}ms {solve * 1e3:>7.2f}ms {len(waypoints):>10} {bfs:>7.2f}s")
+
+
+def benchmark_pyramid(targets=(1024, 4096), **maze_kwargs):
+    """
+    Time and peak traced memory of the coarse-to-fine pyramid planner against one
+    full-frame BFS. Times are measured without tracing, the peaks in a second run.
+    """
+    import tracemalloc
+    import pyramid_planner
+
+    print(f"{'maze':>12} {'method':>8} {'path px':>8} {'expanded':>10} {'time':>8} {'peak':>9}")
+    for target in targets:
+        maze_map, entrance, exit_point = load_maze(target, **maze_kwargs)
+        for name, function in (("bfs", grid_search.bfs_search), ("pyramid", pyramid_planner.pyramid_search)):
+            stats = {}
+            path, seconds = time_call(function, maze_map, entrance, exit_point, stats=stats)
+            tracemalloc.start()
+            function(maze_map, entrance, exit_point)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{str(target)[-12:]:>12} {name:>8} {len(path):>8} {stats['expanded']:>10} "
+                  f"{seconds:>7.2f}s {peak / 2 ** 20:>6.1f}MiB")
+
+
+def benchmark_distance_field(targets=(1024, 4096), starts=100, seed=0, **maze_kwargs):
+    """
+    Time flooding the distance field of the exit once, one descent from the entrance
+    and a batch of `starts` random free start points, against one full-frame BFS.
+    """
+    import distance_field
+
+    rng = np.random.default_rng(seed)
+    print(f"{'maze':>12} {'flood':>8} {'query':>9} {'batch':>8} {'bfs':>8}")
+    for target in targets:
+        maze_map, entrance, exit_point = load_maze(target, **maze_kwargs)
+        field, flood = time_call(distance_field.DistanceField, maze_map, exit_point)
+        _, query = time_call(field.path_from, entrance)
+        free = np.argwhere(maze_map == 1)
+        _, batch = time_call(field.paths_from, free[rng.integers(len(free), size=starts)])
+        _, bfs = time_call(grid_search.bfs_search, maze_map, entrance, exit_point)
+        print(f"{str(target)[-12:]:>12} {flood:>7.2f}s {query * 1e3:>7.1f}ms {batch:>7.2f}s {bfs:>7.2f}s")
+
+
+def benchmark_incremental(sizes=(640, 1024), frames=30, blobs=5, seed=0, **maze_kwargs):
+    """
+    Simulate a live feed where every frame flips `blobs` random 4x4 patches of the
+    captured maze (hands, flicker) and time the D* Lite repair per frame against a
+    fresh BFS of that frame.
+    """
+    import incremental_planner
+
+    rng = np.random.default_rng(seed)
+    print(f"{'size':>6} {'initial':>8} {'repair':>10} {'bfs':>10}")
+    for size in sizes:
+        maze_map, entrance, exit_point = load_maze(size, **maze_kwargs)
+        planner, initial = time_call(incremental_planner.IncrementalPlanner, maze_map, entrance, exit_point)
+        _, first = time_call(planner.path)
+        repair = bfs = 0
+        for _ in range(frames):
+            frame = maze_map.copy()
+            for row, col in rng.integers(size - 4, size=(blobs, 2)):
+                frame[row:row + 4, col:col + 4] ^= 1
+            frame[entrance] = frame[exit_point] = 1
+            _, seconds = time_call(planner.update, frame)
+            _, reference_seconds = time_call(grid_search.bfs_search, frame, entrance, exit_point)
+            repair += seconds
+            bfs += reference_seconds
+        print(f"{size:>6} {initial + first:>7.2f}s {repair / frames * 1e3:>8.1f}ms {bfs / frames * 1e3:>8.1f}ms")
+
+
+def benchmark_dead_ends(targets=(640, 1024), method="bfs", **maze_kwargs):
+    """
+    Removed free space and time of dead-end filling, and the search on the reduced
+    map against the search on the full map.
+    """
+    import maze_reduction
+
+    print(f"{'maze':>12} {'removed':>8} {'rounds':>7} {'fill':>8} {'search':>8} {'full':>8}")
+    for target in targets:
+        maze_map, entrance, exit_point = load_maze(target, **maze_kwargs)
+        stats = {}
+        reduced = maze_reduction.fill_dead_ends(maze_map, keep=(entrance, exit_point), stats=stats)
+        _, search = time_call(grid_search.search, reduced, entrance, exit_point, method=method)
+        _, full = time_call(grid_search.search, maze_map, entrance, exit_point, method=method)
+        print(f"{str(target)[-12:]:>12} {stats['removed']:>7.1%} {stats['rounds']:>7} {stats['seconds']:>7.2f}s "
+              f"{search:>7.2f}s {full:>7.2f}s")
+
+
+def benchmark_clearance(sizes=(640, 1024), robot_sizes=(10, 35, 60, 90), **maze_kwargs):
+    """
+    Time one clearance map per maze and thresholding it for a sweep of robot sizes,
+    against dilating the walls again for every size. The robot sizes give both
+    odd and even kernels, main's robot_size 35 an even 18 px one.
+    """
+    import cv2
+    import clearance_map
+
+    print(f"{'size':>6} {'build':>8} {'sweep':>9} {'dilate':>9} {'largest':>8}")
+    for size in sizes:
+        binary_img = make_test_maze(size, **maze_kwargs)
+        clearance, build = time_call(clearance_map.ClearanceMap, binary_img)
+        sweep = dilate = 0
+        for robot_size in robot_sizes:
+            _, seconds = time_call(clearance.maze_map, clearance_map.clearance_for_robot(robot_size))
+            sweep += seconds
+            kernel_size = int(np.ceil(robot_size / 2))
+            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_size, kernel_size))
+            _, seconds = time_call(cv2.dilate, 255 - binary_img, kernel)
+            dilate += seconds
+        largest = maze_solving.largest_feasible_clearance(clearance)
+        print(f"{size:>6} {build * 1e3:>6.1f}ms {sweep * 1e3:>7.2f}ms {dilate * 1e3:>7.2f}ms {largest:>6}px")
+
+
+def benchmark_centerline(targets=(640, 1024), **maze_kwargs):
+    """
+    Time the centre-line planner against the BFS + adjust_points_to_center +
+    align_to_cardinal pipeline, with the waypoint counts of both.
+    """
+    import centerline_planner
+
+    print(f"{'maze':>12} {'centerline':>11} {'waypoints':>10} {'pipeline':>9} {'waypoints':>10}")
+    for target in targets:
+        maze_map, entrance, exit_point = load_maze(target, **maze_kwargs)
+        waypoints, seconds = time_call(centerline_planner.centerline_search, maze_map, entrance, exit_point)
+
+        def pipeline():
+            simplified_path = solution_path.find_solution_path(maze_map, entrance, exit_point)
+            return maze_solving.align_to_cardinal(maze_solving.adjust_points_to_center(maze_map, simplified_path))
+
+        aligned_points, pipeline_seconds = time_call(pipeline)
+        print(f"{str(target)[-12:]:>12} {seconds:>10.2f}s {len(waypoints):>10} {pipeline_seconds:>8.2f}s "
+              f"{len(aligned_points):>10}")
+
+
+def benchmark_turns(targets=(640, 1024), turn_costs=(0, 4, 16, 64), pixels_per_second=100.0,
+                    seconds_per_turn=2.0, seconds_per_waypoint=0.5, **maze_kwargs):
+    """
+    Path length, turns and waypoints of find_solution_path with the BFS against the
+    turn-penalised search for several turn costs, and the robot time they would
+    take. The time is only an estimate from the given speed, time per turn and
+    time per waypoint (set_angles call); set them to the measured values of the arm.
+    """
+    print(f"{'maze':>12} {'method':>10} {'path px':>8} {'turns':>6} {'waypoints':>10} {'search':>8} {'robot':>8}")
+    for target in targets:
+        maze_map, entrance, exit_point = load_maze(target, **maze_kwargs)
+        runs = [("bfs", "bfs", {})] + [(f"turns {cost}", "turns", {"turn_cost": cost}) for cost in turn_costs]
+        for label, method, kwargs in runs:
+            path, seconds = time_call(grid_search.SEARCH_METHODS[method], maze_map, entrance, exit_point, **kwargs)
+            turns = grid_search.count_turns(path)
+            waypoints = len(solution_path.simplify_path(path))
+            robot = len(path) / pixels_per_second + turns * seconds_per_turn + waypoints * seconds_per_waypoint
+            print(f"{str(target)[-12:]:>12} {label:>10} {len(path):>8} {turns:>6} {waypoints:>10} "
+                  f"{seconds:>7.2f}s {robot:>7.1f}s")
+
+
+def benchmark_any_angle(targets=(640, 1024, 2048), pixel_limit=640, **maze_kwargs):
+    """
+    Waypoints, path length and time of the Lazy Theta* mode against the JPS path
+    reduced to its turn points. Up to `pixel_limit` pixels a side Theta* is also
+    run on the pixels themselves (block size 1), the path the blocks approximate.
+    """
+    import math
+    import any_angle
+
+    def length(points):
+        return sum(math.dist(a, b) for a, b in zip(points[:-1], points[1:]))
+
+    print(f"{'maze':>12} {'method':>7} {'block':>6} {'waypoints':>10} {'length':>8} {'checks':>8} {'time':>8}")
+    for target in targets:
+        maze_map, entrance, exit_point = load_maze(target, **maze_kwargs)
+        turn_points, jps_seconds = time_call(solution_path.find_solution_path, maze_map, entrance, exit_point,
+                                             method="jps")
+        print(f"{str(target)[-12:]:>12} {'jps':>7} {'-':>6} {len(turn_points):>10} {length(turn_points):>8.0f} "
+              f"{'-':>8} {jps_seconds:>7.2f}s")
+        grids = [any_angle.THETA_GRID]
+        if max(maze_map.shape) <= pixel_limit:
+            grids.append(max(maze_map.shape))
+        for grid in grids:
+            stats = {}
+            waypoints, seconds = time_call(any_angle.any_angle_search, maze_map, entrance, exit_point, stats=stats,
+                                           grid=grid)
+            print(f"{str(target)[-12:]:>12} {'theta':>7} {stats['factor']:>6} {len(waypoints):>10} "
+                  f"{length(waypoints):>8.0f} {stats['checks']:>8} {seconds:>7.2f}s")
+
+
+def benchmark_visibility(cell_sizes=(64, 128, 256, 512), cells=8, robot_radius=None):
+    """
+    The same maze of cells x cells blocks captured at increasing resolution: corner
+    nodes, build and query time of the visibility graph against the JPS search.
+    The graph only grows with the number of wall corners, not with the pixels.
+    """
+    import visibility_graph
+
+    print(f"{'pixels':>7} {'nodes':>6} {'edges':>6} {'build':>8} {'query':>8} {'waypoints':>10} {'jps':>8}")
+    for cell in cell_sizes:
+        wall = cell // 8
+        binary_img = make_test_maze(cells * cell + wall, cell=cell, wall=wall)
+        free_map = visibility_graph.inflated_free_map(binary_img, robot_radius or wall).copy()
+        entrance, exit_point = maze_solving.detect_entrance_exit(255 * free_map)
+        free_map[entrance] = 1
+        free_map[exit_point] = 1
+        graph, build = time_call(visibility_graph.VisibilityGraph, free_map)
+        waypoints, query = time_call(graph.solve, entrance, exit_point)
+        _, jps_seconds = time_call(grid_search.search, free_map, entrance, exit_point, method="jps")
+        edges = sum(len(links) for links in graph.adjacency) // 2
+        print(f"{free_map.shape[0]:>7} {len(graph.nodes):>6} {edges:>6} {build * 1000:>6.1f}ms "
+              f"{query * 1000:>6.1f}ms {len(waypoints):>10} {jps_seconds:>7.2f}s")
+
+
+def benchmark_packed(targets=(1024, 4096), **maze_kwargs):
+    """
+    Time and search-state memory of bfs_search (bool visited + int parent arrays)
+    against packed_bfs_search (visited bitset + 2-bit parent codes).
+    """
+    print(f"{'maze':>12} {'method':>7} {'time':>8} {'state':>10} {'same path':>10}")
+    for target in targets:
+        maze_map, entrance, exit_point = load_maze(target, **maze_kwargs)
+        size = maze_map.size
+        path, seconds = time_call(grid_search.bfs_search, maze_map, entrance, exit_point)
+        state = size * (1 + np.dtype(grid_search.index_dtype(size)).itemsize)
+        print(f"{str(target)[-12:]:>12} {'bfs':>7} {seconds:>7.2f}s {state / 2**20:>7.1f}MiB {'-':>10}")
+        stats = {}
+        packed, seconds = time_call(grid_search.packed_bfs_search, maze_map, entrance, exit_point, stats=stats)
+        print(f"{str(target)[-12:]:>12} {'packed':>7} {seconds:>7.2f}s {stats['state_bytes'] / 2**20:>7.1f}MiB "
+              f"{str(packed == path):>10}")
+
+
+def benchmark_kernels(targets=(640, 1024), **maze_kwargs):
+    """
+    The Numba kernels of fast_kernels against the NumPy and Python code they stand
+    in for: the BFS, the turn detection of simplify_path and the wall scans of
+    getInterPolationPoints (four per path pixel away from the border). The first
+    compiled call, which loads the kernels from the disk cache or compiles them,
+    is timed on its own.
+    """
+    import fast_kernels
+
+    backends = [("python", False)]
+    if fast_kernels.numba is None:
+        print("Numba is not installed, only the Python backend is timed.")
+    else:
+        backends.append(("numba", True))
+    compiled = fast_kernels.COMPILED
+
+    print(f"{'maze':>12} {'backend':>8} {'first':>8} {'bfs':>8} {'turns':>8} {'scans':>8}")
+    for target in targets:
+        maze_map, entrance, exit_point = load_maze(target, **maze_kwargs)
+        height, width = maze_map.shape
+        img = np.repeat(255 * maze_map[:, :, None], 3, axis=2)
+        path = grid_search.bfs_search(maze_map, entrance, exit_point)
+        inner = [(row, col) for row, col in path if 16 <= row < height - 16 and 16 <= col < width - 16]
+        for name, use_compiled in backends:
+            fast_kernels.COMPILED = use_compiled
+            first_wall = fast_kernels.first_wall if use_compiled else getattr(fast_kernels.first_wall, "py_func",
+                                                                              fast_kernels.first_wall)
+            t0 = time.perf_counter()
+            solution_path.simplify_path(path[:3])
+            grid_search.bfs_search(np.ones((3, 3), dtype=np.uint8), (0, 0), (2, 2))
+            first_wall(img, inner[0][0], inner[0][1], 0, 1, 1, 0, 16)
+            first = time.perf_counter() - t0
+            _, bfs_seconds = time_call(grid_search.bfs_search, maze_map, entrance, exit_point)
+            _, turn_seconds = time_call(solution_path.simplify_path, path)
+            t0 = time.perf_counter()
+            for row, col in inner:
+                for dr, dc in grid_search.DIRECTIONS:
+                    first_wall(img, row, col, dr, dc, dc, dr, 16)
+            scan_seconds = time.perf_counter() - t0
+            print(f"{str(target)[-12:]:>12} {name:>8} {first:>7.3f}s {bfs_seconds:>7.3f}s {turn_seconds:>7.3f}s "
+                  f"{scan_seconds:>7.3f}s")
+    fast_kernels.COMPILED = compiled
+
+
+def _solve_sheet_child(path, tile):
+    """
+    solve_sheet in a fresh process, returning its time, stats and peak RSS in MiB.
+    """
+    import resource
+    import tiled_maze
+
+    stats = {}
+    waypoints, seconds = time_call(tiled_maze.solve_sheet, path, tile=tile, stats=stats)
+    return seconds, stats, len(waypoints), resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def benchmark_tiled(sizes=(2048, 4096, 8192), tile=1024, path="benchmark_sheet.pgm"):
+    """
+    Solve synthetic sheets written to a PGM file with the out-of-core tiled search,
+    each in its own process so the peak RSS is that of the search alone.
+    """
+    import os
+    from concurrent.futures import ProcessPoolExecutor
+
+    print(f"{'pixels':>7} {'time':>8} {'passes':>7} {'loads':>6} {'pending':>8} {'length':>8} {'RSS':>9}")
+    for size in sizes:
+        write_test_maze(path, size)
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            seconds, stats, _, rss = pool.submit(_solve_sheet_child, path, tile).result()
+        print(f"{size:>7} {seconds:>7.1f}s {stats['passes']:>7} {stats['tile_loads']:>6} {stats['pending']:>8} "
+              f"{stats['length']:>8} {rss:>6.0f}MiB")
+    os.remove(path)
+
+
+
+def benchmark_openings(size=1024, openings=(2, 4, 8, 16), **maze_kwargs):
+    """
+    Mazes with more and more openings cut into the border walls: the closest
+    entrance and exit found by one grid_search.nearest_pair_search against one BFS
+    per entrance and exit pair.
+    """
+    import itertools
+
+    blocks, repeats = make_test_blocks(size, **maze_kwargs)
+    cells = blocks.shape[0] // 2
+    rng = np.random.default_rng(1)
+    # every odd block of a border row or column is a cell that can be opened
+    sides = [(0, slice(None)), (-1, slice(None)), (slice(None), 0), (slice(None), -1)]
+
+    print(f"{'openings':>9} {'pair':>8} {'length':>7} {'search':>8} {'per pair':>9}")
+    for count in openings:
+        opened = blocks.copy()
+        while len(maze_solving.border_openings(opened)) < count:
+            side = sides[rng.integers(4)]
+            cell = 2 * int(rng.integers(cells)) + 1
+            if side[0] == slice(None):
+                opened[cell, side[1]] = 255
+            else:
+                opened[side[0], cell] = 255
+        maze_map = (np.repeat(np.repeat(opened, repeats, axis=0), repeats, axis=1) // 255).astype(np.uint8)
+        entrances, exits = grid_search.split_openings(maze_solving.border_openings(255 * maze_map), maze_map.shape)
+        points = entrances + exits
+        (i, j, path), seconds = time_call(grid_search.nearest_pair_search, maze_map, points,
+                                          groups=[0] * len(entrances) + [1] * len(exits))
+
+        def every_pair():
+            lengths = [len(grid_search.bfs_search(maze_map, a, b) or ())
+                       for a, b in itertools.product(entrances, exits)]
+            return min(length for length in lengths if length)
+
+        _, pair_seconds = time_call(every_pair)
+        print(f"{len(points):>9} {f'{i}-{j}':>8} {len(path):>7} {seconds:>7.3f}s {pair_seconds:>8.2f}s")
+
+
+def benchmark_simplify(targets=(1024, 4096), **maze_kwargs):
+    """
+    simplify_path on the BFS path: the original atan2 loop against turn_indices on
+    the list of tuples (including its conversion to an array) and on an N x 2 array.
+    """
+    import fast_kernels
+
+    compiled = fast_kernels.COMPILED
+    fast_kernels.COMPILED = False
+    print(f"{'maze':>12} {'path px':>8} {'turns':>6} {'loop':>8} {'list':>8} {'array':>8}")
+    for target in targets:
+        maze_map, entrance, exit_point = load_maze(target, **maze_kwargs)
+        path = grid_search.bfs_search(maze_map, entrance, exit_point)
+        points = np.array(path, dtype=np.int64)
+        _, loop_seconds = time_call(solution_path.simplify_path, path, vectorized=False)
+        simplified, list_seconds = time_call(solution_path.simplify_path, path)
+        _, array_seconds = time_call(solution_path.turn_indices, points)
+        print(f"{str(target)[-12:]:>12} {len(path):>8} {len(simplified) - 2:>6} {loop_seconds * 1000:>6.1f}ms "
+              f"{list_seconds * 1000:>6.1f}ms {array_seconds * 1000:>6.1f}ms")
+    fast_kernels.COMPILED = compiled
+
+
+def benchmark_segments(targets=(1024, 4096), robot_width=192, **maze_kwargs):
+    """
+    SegmentPath of the BFS path: building it from the pixel path and from the
+    simplified waypoints, the instructions from the segments, expanding the pixels
+    again, and the memory of the segments against a list of pixel tuples.
+    """
+    import segment_path
+
+    print(f"{'maze':>12} {'path px':>8} {'segments':>9} {'from px':>8} {'from wp':>8} {'instr':>8} "
+          f"{'pixels':>8} {'memory':>8} {'tuples':>9}")
+    for target in targets:
+        maze_map, entrance, exit_point = load_maze(target, **maze_kwargs)
+        path = grid_search.bfs_search(maze_map, entrance, exit_point)
+        waypoints = solution_path.simplify_path(path)
+        _, pixel_seconds = time_call(segment_path.SegmentPath.from_points, path)
+        segments, waypoint_seconds = time_call(segment_path.SegmentPath.from_points, waypoints)
+        _, instruction_seconds = time_call(segments.instructions, robot_width)
+        _, expand_seconds = time_call(segments.pixels)
+        memory = segments.starts.nbytes + segments.steps.nbytes + segments.lengths.nbytes
+        tuples = sys.getsizeof(path) + sum(sys.getsizeof(point) for point in path)
+        print(f"{str(target)[-12:]:>12} {len(path):>8} {len(segments):>9} {pixel_seconds * 1000:>6.1f}ms "
+              f"{waypoint_seconds * 1000:>6.2f}ms {instruction_seconds * 1000:>6.2f}ms {expand_seconds * 1000:>6.1f}ms "
+              f"{memory / 1024:>6.1f}KiB {tuples / 1024:>7.0f}KiB")
+
+
+def benchmark_frame_bfs(corridors=((48, 6), (16, 4), (8, 2)), size=640):
+    """
+    The click-to-solve BFS of maze_solver and maze_solution on a camera-sized frame:
+    grid_search.bfs_parents (the NumPy fallback of the Numba kernel) between the
+    openings of a `size`-px-wide maze, against the original list BFS.
+
+    The fallback costs about 20 us per BFS level whatever the frontier size, so its
+    time follows the path length, not the maze area. It stays near the 100 ms per
+    frame target with 12 px corridors or wider, but 6 px corridors give a path of
+    about 15000 px and take about 300 ms. Only the Numba kernel meets the target there.
+    """
+    # the order of dir4 in the interactive tools, as (row, col) moves
+    steps_row, steps_col = np.array([-1, 1, 0, 0]), np.array([0, 0, 1, -1])
+    print(f"{'corridor':>9} {'path px':>8} {'bfs_parents':>12} {'original':>9}")
+    for cell, wall in corridors:
+        maze_map, start, end = load_maze(size, cell=cell, wall=wall)
+        maze_map = np.ascontiguousarray(maze_map)
+        height, width = maze_map.shape
+        start_index, end_index = start[0] * width + start[1], end[0] * width + end[1]
+        (parent, _), seconds = time_call(grid_search.bfs_parents, maze_map.reshape(-1), height, width,
+                                         start_index, end_index, steps_row, steps_col, False)
+        path = grid_search.reconstruct_path(parent, start_index, end_index, width)
+        _, reference_seconds = time_call(reference_bfs, maze_map, start, end)
+        print(f"{cell - wall:>7}px {len(path):>8} {seconds * 1000:>10.1f}ms {reference_seconds:>8.2f}s")
+
+
+if __name__ == "__main__":
+    targets = [int(arg) if arg.isdigit() else arg for arg in sys.argv[1:]] or [1024, 4096, 8192]
+    benchmark_bfs([target for target in targets if isinstance(target, int)])
+    benchmark_methods(targets)
+    benchmark_bidirectional(targets)
+    benchmark_skeleton(targets)
+    benchmark_lattice()
+    benchmark_pyramid(targets)
+    benchmark_distance_field(targets)
+    benchmark_incremental()
+    benchmark_dead_ends()
+    benchmark_clearance()
+    benchmark_centerline(targets)
+    benchmark_turns()
+    benchmark_any_angle()
+    benchmark_visibility()
+    benchmark_tiled()
+    benchmark_packed(targets)
+    benchmark_kernels()
+    benchmark_openings()
+    benchmark_simplify(targets)
+    benchmark_segments(targets)
+    benchmark_frame_bfs()
@@ -0,0 +1,129 @@
+import cv2
+import numpy as np
+import grid_search
+
+
+def centerline_cost(maze_map, window=15, weight=1):
+    """
+    Integer cost of entering every pixel of maze_map (1 = free): one step plus
+    `weight` times how far its clearance to the walls is below the largest clearance
+    in the surrounding window x window pixels. Corridor centres cost 1, pixels
+    towards the walls cost more. Returns (cost, clearance).
+    """
+    clearance = cv2.distanceTransform(maze_map.astype(np.uint8), cv2.DIST_C, 3)
+    local_max = cv2.dilate(clearance, np.ones((window, window), np.uint8))
+    cost = 1 + weight * np.rint(local_max - clearance).astype(np.int64)
+    return cost, clearance
+
+
+def cost_search(maze_map, cost, start, end, stats=None):
+    """
+    Dijkstra over the free cells of maze_map with the integer cost of entering each
+    cell. The open list is a dict of buckets, one per path cost (Dial's algorithm),
+    and every bucket is expanded at once with vectorised NumPy operations.
+
+    Returns the pixel path from start to end as (row, col) tuples or None. If a
+    `stats` dict is given, the number of expanded cells and the path cost are stored
+    under "expanded" and "cost".
+    """
+    height, width = maze_map.shape
+    size = height * width
+    free = maze_map.reshape(-1) == 1
+    cost = cost.reshape(-1)
+
+    start_index = int(start[0]) * width + int(start[1])
+    end_index = int(end[0]) * width + int(end[1])
+    distance = np.full(size, np.iinfo(np.int64).max, dtype=np.int64)
+    parent = np.full(size, -1, dtype=grid_search.index_dtype(size))
+    done = np.zeros(size, dtype=bool)
+    distance[start_index] = 0
+
+    buckets = {0: [np.array([start_index], dtype=np.int64)]}
+    current = 0
+    expanded = 0
+    while buckets and not done[end_index]:
+        if current not in buckets:
+            current += 1
+            continue
+        nodes = np.unique(np.concatenate(buckets.pop(current)))
+        # skip cells that were improved or settled since they were bucketed
+        nodes = nodes[(distance[nodes] == current) & ~done[nodes]]
+        done[nodes] = True
+        expanded += len(nodes)
+
+        candidates, sources = grid_search.neighbor_candidates(nodes, free, width)
+        costs = current + cost[candidates]
+        better = costs < distance[candidates]
+        candidates, sources, costs = candidates[better], sources[better], costs[better]
+        # the cheapest offer per cell wins, equal offers keep their expansion order
+        order = np.lexsort((costs, candidates))
+        candidates, sources, costs = candidates[order], sources[order], costs[order]
+        first = np.ones(len(candidates), dtype=bool)
+        first[1:] = candidates[1:] != candidates[:-1]
+        candidates, sources, costs = candidates[first], sources[first], costs[first]
+
+        distance[candidates] = costs
+        parent[candidates] = sources
+        for value in np.unique(costs).tolist():
+            buckets.setdefault(value, []).append(candidates[costs == value])
+        current += 1
+
+    if stats is not None:
+        stats["expanded"] = expanded
+        stats["cost"] = int(distance[end_index]) if done[end_index] else None
+    if not done[end_index]:
+        return None
+    return grid_search.reconstruct_path(parent, start_index, end_index, width)
+
+
+def straighten(path, jog=3):
+    """
+    Turn a 4-connected pixel path into axis-aligned waypoints. From every waypoint
+    the path is followed along the row or the column, whichever stays within `jog`
+    pixels of the line for longer, and the segment ends where the path leaves it.
+    Small steps of the path off its line (uneven walls, a slightly rotated maze)
+    therefore do not become waypoints. The last waypoint is the end of the path,
+    reached by an extra corner if needed.
+    """
+    points = np.array(path, dtype=np.int64)
+    waypoints = [tuple(points[0].tolist())]
+    anchor = points[0]
+    i = 0
+    while i < len(points) - 1:
+        best = None
+        for axis in (0, 1):
+            # axis 0: horizontal segment at the anchor's row, axis 1: vertical at its column
+            off = np.abs(points[i + 1:, axis] - anchor[axis]) > jog
+            run = int(np.argmax(off)) if off.any() else len(points) - 1 - i
+            if best is None or run > best[0]:
+                best = (run, axis)
+        run, axis = best
+        if run == 0:
+            # the very next pixel is already off the line: take it as it is
+            run = 1
+        i += run
+        end = anchor.copy()
+        end[1 - axis] = points[i, 1 - axis]
+        if tuple(end.tolist()) != waypoints[-1]:
+            waypoints.append(tuple(end.tolist()))
+        anchor = end
+
+    last = tuple(points[-1].tolist())
+    if waypoints[-1] != last:
+        if waypoints[-1][0] != last[0] and waypoints[-1][1] != last[1]:
+            waypoints.append((waypoints[-1][0], last[1]))
+        waypoints.append(last)
+    return waypoints
+
+
+def centerline_search(maze_map, start, end, window=15, weight=1, jog=3, stats=None):
+    """
+    Wall-centred, axis-aligned waypoints from start to end in one search: Dijkstra on
+    centerline_cost keeps the path on the corridor centres and straighten() reads the
+    waypoints off it. Returns a list of (row, col) waypoints or None.
+    """
+    cost, _ = centerline_cost(maze_map, window, weight)
+    path = cost_search(maze_map, cost, start, end, stats=stats)
+    if path is None:
+        return None
+    return straighten(path, jog)
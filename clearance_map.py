@@ -0,0 +1,92 @@
+import cv2
+import numpy as np
+import maze_graph
+
+
+class ClearanceMap(object):
+    """
+    Clearance of every free pixel of a binary maze image (255 or 1 = free): its
+    chessboard distance to the nearest wall pixel, from a single distance transform.
+
+    A pixel is a free centre for a square robot footprint of half-width r exactly
+    when its clearance is at least r + 1, which is what dilating the walls with a
+    (2r + 1) x (2r + 1) rectangle used to give. An even 2r x 2r rectangle is
+    anchored at (r, r), so it reaches one pixel further up and left than right and
+    down; that is asked for with min_clearance r + 0.5, see maze_map. Maps for any
+    clearance are thresholded from the same transform when first asked for and then kept.
+    """
+
+    def __init__(self, binary_img):
+        free = (binary_img != 0).astype(np.uint8)
+        self.distance = cv2.distanceTransform(free, cv2.DIST_C, 3)
+        self.maps = {}
+
+    @property
+    def max_clearance(self):
+        return int(self.distance.max())
+
+    def maze_map(self, min_clearance):
+        """
+        Binary map (1 = free) of the pixels with at least `min_clearance` clearance.
+        A half-integer r + 0.5 keeps the pixels whose 2 x 2 block reaching up and left
+        all have clearance r, the footprint of an even kernel, half a pixel off centre.
+        """
+        if min_clearance not in self.maps:
+            free = self.distance >= int(min_clearance)
+            if min_clearance != int(min_clearance):
+                free[1:, :] &= free[:-1, :]
+                free[:, 1:] &= free[:, :-1]
+            self.maps[min_clearance] = free.astype(np.uint8)
+        return self.maps[min_clearance]
+
+    def connects(self, min_clearance, start, end):
+        """
+        Whether start and end (kept open) are 4-connected at this clearance.
+        """
+        maze_map = self.maze_map(min_clearance).copy()
+        maze_map[start] = 1
+        maze_map[end] = 1
+        _, labels = cv2.connectedComponents(maze_map, connectivity=4)
+        return labels[start] == labels[end]
+
+    def largest_clearance(self, start, end):
+        """
+        Largest min_clearance at which start and end are still connected, found by a
+        binary search over the clearance values, or 0 if they are not connected at all.
+        """
+        if not self.connects(1, start, end):
+            return 0
+        low, high = 1, self.max_clearance
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.connects(middle, start, end):
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+
+def clearance_for_robot(robot_size):
+    """
+    min_clearance equivalent to the wall dilation of maze_solving.main: a square
+    kernel of ceil(robot_size / 2) pixels. That is (kernel_size + 1) / 2, a whole
+    number for an odd kernel and a half-pixel shifted one for an even kernel, such
+    as the 18 px of robot_size 35.
+    """
+    kernel_size = int(np.ceil(robot_size / 2))
+    if kernel_size % 2:
+        return (kernel_size + 1) // 2
+    return (kernel_size + 1) / 2
+
+
+_clearance_cache = maze_graph.MazeCache()
+
+
+def get_clearance_map(binary_img, key=None):
+    """
+    Return the ClearanceMap of a captured image, computing the distance transform only
+    the first time the image is seen. `key` identifies the image instead of a hash of
+    its pixels, see maze_graph.maze_key.
+    """
+    return _clearance_cache.get(maze_graph.maze_key(binary_img) if key is None else key,
+                                lambda: ClearanceMap(binary_img))
@@ -1,6 +1,7 @@
 import cv2
 import os
 import time
+import frame_source
 
 # Global variables for drawing the rectangle
 drawing = False
@@ -49,6 +50,7 @@ def detect_markers_once(cap):
     """
     Detect two sets of ArUco markers. Detect the second set only after pressing the 'e' key.
     Capture and save the frame as PNG after pressing 'k'.
+    :param cap: FrameSource (or cv2.VideoCapture) the frames are read from
     """
     aruco_dict = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_6X6_250)
     aruco_params = cv2.aruco.DetectorParameters()
@@ -171,9 +173,11 @@ def main():
     marker_4_pixel = []
     
     
-    cap = cv2.VideoCapture(2)
-    if not cap.isOpened():
+    # Grabbed on a background thread, both loops below get the newest frame instead of a queued one
+    cap = frame_source.get_frame_source(2)
+    if not cap.is_opened():
         print("Failed to open camera.")
+        cap.release()
         return
 
     print("Instructions:")
@@ -213,6 +217,7 @@ def main():
             print("Exiting.")
             break
 
+    print(f"Camera: {cap.summary()}")
     cap.release()
     cv2.destroyAllWindows()
     
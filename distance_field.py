@@ -0,0 +1,113 @@
+import numpy as np
+import grid_search
+import maze_graph
+
+# Distance of walls and of cells that cannot reach the goal
+UNREACHABLE = -1
+
+
+class DistanceField(object):
+    """
+    BFS distance of every free cell of maze_map (1 = free) to one goal cell.
+
+    The field is flooded once and keeps, for every reached cell, its neighbour one
+    step closer to the goal. A path from any start is then found by walking down
+    these steps, so a query costs O(path length) instead of a new search of the maze.
+    """
+
+    def __init__(self, maze_map, goal):
+        self.shape = maze_map.shape
+        self.goal = (int(goal[0]), int(goal[1]))
+        self.distance, self.next_hop = self.flood(maze_map, self.goal)
+
+    @staticmethod
+    def flood(maze_map, goal):
+        """
+        Level-synchronous BFS from goal. Returns an int32 array of distances, with
+        UNREACHABLE for walls and cells that cannot reach the goal, and the flat index
+        of the neighbour one step closer to the goal for every reached cell (the goal
+        points at itself).
+        """
+        height, width = maze_map.shape
+        size = height * width
+        free = maze_map.reshape(-1) == 1
+        distance = np.full(size, UNREACHABLE, dtype=np.int32)
+        next_hop = np.full(size, -1, dtype=grid_search.index_dtype(size))
+
+        goal_index = goal[0] * width + goal[1]
+        frontier = np.array([goal_index], dtype=np.int64)
+        distance[goal_index] = 0
+        next_hop[goal_index] = goal_index
+        level = 0
+        while len(frontier):
+            level += 1
+            candidates, sources = grid_search.neighbor_candidates(frontier, free, width)
+            new = distance[candidates] == UNREACHABLE
+            frontier, first = np.unique(candidates[new], return_index=True)
+            distance[frontier] = level
+            next_hop[frontier] = sources[new][first]
+        return distance.reshape(height, width), next_hop
+
+    def path_from(self, start):
+        """
+        Shortest path from start to the goal as a list of (row, col), or None if the
+        goal cannot be reached. A start on a wall pixel steps into its nearest free
+        neighbour first, like the BFS it replaces.
+        """
+        return self.paths_from([start])[0]
+
+    def entry(self, start):
+        """
+        Flat index where the descent from start begins: start itself when it is on
+        the field, else its neighbour closest to the goal, or None.
+        """
+        height, width = self.shape
+        if self.distance[start] != UNREACHABLE:
+            return start[0] * width + start[1]
+        best = None
+        for dr, dc in grid_search.DIRECTIONS:
+            row, col = start[0] + dr, start[1] + dc
+            if 0 <= row < height and 0 <= col < width and self.distance[row, col] != UNREACHABLE:
+                if best is None or self.distance[row, col] < self.distance[best]:
+                    best = (row, col)
+        return None if best is None else best[0] * width + best[1]
+
+    def paths_from(self, starts):
+        """
+        Shortest paths from a batch of start points in one pass: all starts follow
+        their next hops towards the goal together. Returns one list of (row, col) per
+        start, or None for starts that cannot reach the goal.
+        """
+        width = self.shape[1]
+        starts = [(int(row), int(col)) for row, col in starts]
+        entries = [self.entry(start) for start in starts]
+        reached = [k for k, index in enumerate(entries) if index is not None]
+
+        position = np.array([entries[k] for k in reached], dtype=np.int64)
+        trail = [position]
+        # the goal is its own next hop, so finished starts simply stay there
+        for _ in range(int(self.distance.reshape(-1)[position].max()) if len(position) else 0):
+            position = self.next_hop[position].astype(np.int64)
+            trail.append(position)
+
+        paths = [None] * len(starts)
+        if reached:
+            rows, cols = np.divmod(np.stack(trail, axis=1), width)
+            for k, row, col in zip(reached, rows, cols):
+                length = int(self.distance.reshape(-1)[entries[k]]) + 1
+                path = list(zip(row[:length].tolist(), col[:length].tolist()))
+                paths[k] = path if path[0] == starts[k] else [starts[k]] + path
+        return paths
+
+
+_field_cache = maze_graph.MazeCache()
+
+
+def get_distance_field(maze_map, goal, key=None):
+    """
+    Return the DistanceField of maze_map towards goal, flooding it only the first
+    time this maze and goal are seen. `key` identifies the maze instead of a hash
+    of its pixels, see maze_graph.maze_key.
+    """
+    key = maze_graph.maze_key(maze_map) if key is None else key, (int(goal[0]), int(goal[1]))
+    return _field_cache.get(key, lambda: DistanceField(maze_map, goal))
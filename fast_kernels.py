@@ -0,0 +1,114 @@
+import math
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# True when the kernels below are compiled with Numba. Callers check it and keep their
+# NumPy or Python code otherwise; setting it to False switches every caller back.
+COMPILED = numba is not None
+
+
+def kernel(function):
+    """
+    Compile a pixel-loop kernel with Numba when it is installed. The machine code is
+    cached on disk (__pycache__ next to this file), so only the first run after a
+    change pays the JIT warm-up. Without Numba the function stays plain Python.
+    """
+    if numba is None:
+        return function
+    return numba.njit(cache=True, nogil=True)(function)
+
+
+@kernel
+def bfs_parents(free, height, width, start_index, end_index, steps_row, steps_col, keep_last):
+    """
+    Level-by-level BFS over a flat 0/1 free map from start_index, trying the moves
+    (steps_row[k], steps_col[k]) in order. Returns (parent, expanded) where parent
+    holds the flat index of every reached cell's parent and -1 elsewhere.
+
+    With keep_last a cell keeps the last cell of its level that saw it, like
+    grid_search.bfs_search; otherwise the first, like the queue BFS in maze_solver.
+    """
+    size = height * width
+    parent = np.full(size, -1, dtype=np.int64)
+    level = np.full(size, -1, dtype=np.int32)
+    queue = np.empty(size, dtype=np.int64)
+    queue[0] = start_index
+    level[start_index] = 0
+    parent[start_index] = start_index
+    head, tail, depth = 0, 1, 0
+    while head < tail and level[end_index] == -1:
+        end_of_level = tail
+        depth += 1
+        while head < end_of_level:
+            cell = queue[head]
+            head += 1
+            row = cell // width
+            col = cell - row * width
+            for k in range(len(steps_row)):
+                r = row + steps_row[k]
+                c = col + steps_col[k]
+                if r < 0 or r >= height or c < 0 or c >= width:
+                    continue
+                neighbor = r * width + c
+                if free[neighbor] == 0:
+                    continue
+                if level[neighbor] == -1:
+                    level[neighbor] = depth
+                    parent[neighbor] = cell
+                    queue[tail] = neighbor
+                    tail += 1
+                elif keep_last and level[neighbor] == depth:
+                    parent[neighbor] = cell
+    return parent, head
+
+
+@kernel
+def turn_indices(rows, cols, entrance_threshold):
+    """
+    Indices of the turn points of a path kept by solution_path.simplify_path: the
+    same atan2 angle test between consecutive steps, beyond the entrance threshold.
+    """
+    turns = np.empty(len(rows), dtype=np.int64)
+    count = 0
+    last_row, last_col = 0.0, 0.0
+    have_last = False
+    for i in range(1, len(rows)):
+        step_row = rows[i] - rows[i - 1]
+        step_col = cols[i] - cols[i - 1]
+        if not have_last:
+            last_row, last_col = step_row, step_col
+            have_last = True
+            continue
+        angle = math.degrees(math.atan2(step_col, step_row) - math.atan2(last_col, last_row))
+        angle = abs((angle + 180) % 360 - 180)
+        distance_from_entrance = abs(rows[i] - rows[0]) + abs(cols[i] - cols[0])
+        if angle > 10 and distance_from_entrance > entrance_threshold:
+            turns[count] = i - 1
+            count += 1
+            last_row, last_col = step_row, step_col
+    return turns[:count]
+
+
+@kernel
+def first_wall(img, row, col, step_row, step_col, side_row, side_col, steps):
+    """
+    First i in 1..steps-1 where the pixel i steps from (row, col), or the one next to
+    it on the given side, is black in all channels (a wall), or 0 if there is none.
+    Pixels beyond the border count as free, like grid_search.first_wall.
+    The scan getInterPolationPoints runs before every turn.
+    """
+    height, width = img.shape[0], img.shape[1]
+    for i in range(1, steps):
+        r = row + i * step_row
+        c = col + i * step_col
+        if 0 <= r < height and 0 <= c < width and img[r, c, 0] == 0 and img[r, c, 1] == 0 and img[r, c, 2] == 0:
+            return i
+        r += side_row
+        c += side_col
+        if 0 <= r < height and 0 <= c < width and img[r, c, 0] == 0 and img[r, c, 1] == 0 and img[r, c, 2] == 0:
+            return i
+    return 0
@@ -0,0 +1,167 @@
+import collections
+import threading
+import time
+import cv2
+import numpy as np
+
+
+class FrameSource(object):
+    """
+    Camera opened once and read on a background thread into a small ring buffer.
+
+    The thread keeps calling read() on the device, so the driver queue never fills
+    up with old frames and a consumer always gets the newest one instead of the one
+    grabbed when it last asked. Every frame carries a sequence number and the time it
+    was captured: frames that were replaced before anyone took them are counted as
+    dropped, and the time from capture to hand-out is kept as the latency.
+    """
+
+    def __init__(self, device=0, buffer_size=4, capture=None, latency_window=256):
+        # `capture` can be any object with read() / isOpened() / release(), in place
+        # of opening cv2.VideoCapture(device)
+        self.device = device
+        self.capture = capture if capture is not None else cv2.VideoCapture(device)
+        self.frames = collections.deque(maxlen=buffer_size)
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+
+        self.captured = 0
+        self.delivered = 0
+        self.repeated = 0
+        self.dropped = 0
+        self.read_failures = 0
+        self.last_sequence = 0
+        self.latencies = collections.deque(maxlen=latency_window)
+        self.max_latency = 0.0
+        self.started = None
+
+    def is_opened(self):
+        return bool(self.capture.isOpened())
+
+    def start(self):
+        """
+        Start the grabbing thread (once) and return self.
+        """
+        if self.thread is None and self.is_opened():
+            self.running = True
+            self.started = time.perf_counter()
+            self.thread = threading.Thread(target=self._grab, daemon=True)
+            self.thread.start()
+        return self
+
+    def _grab(self):
+        while self.running:
+            ret, frame = self.capture.read()
+            if not ret:
+                with self.condition:
+                    self.read_failures += 1
+                # a camera that stopped answering should not spin a core
+                time.sleep(0.01)
+                continue
+            with self.condition:
+                self.captured += 1
+                self.frames.append((self.captured, time.perf_counter(), frame))
+                self.condition.notify_all()
+
+    def latest(self, copy=True):
+        """
+        Newest frame without waiting, as (ret, frame) like cv2.VideoCapture.read, or
+        (False, None) if nothing was captured yet. The frame is a copy unless
+        copy=False, so drawing on it does not change what the next caller gets.
+        """
+        with self.condition:
+            if not self.frames:
+                return False, None
+            sequence, captured_at, frame = self.frames[-1]
+            self._deliver(sequence, captured_at)
+        return True, frame.copy() if copy else frame
+
+    def read(self, timeout=1.0, copy=True):
+        """
+        Drop-in for cv2.VideoCapture.read in display loops: waits up to `timeout`
+        seconds for a frame newer than the last one handed out, so a loop runs at the
+        camera rate instead of showing the same frame again, then returns latest().
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: not self.running or
+                                    (self.frames and self.frames[-1][0] > self.last_sequence), timeout)
+        return self.latest(copy=copy)
+
+    def _deliver(self, sequence, captured_at):
+        # called with the condition held
+        if sequence == self.last_sequence:
+            self.repeated += 1
+        else:
+            self.dropped += sequence - self.last_sequence - 1
+            self.last_sequence = sequence
+        self.delivered += 1
+        latency = time.perf_counter() - captured_at
+        self.latencies.append(latency)
+        self.max_latency = max(self.max_latency, latency)
+
+    def stats(self):
+        """
+        Counters and capture-to-consumer latency (seconds) since start(): frames
+        captured and handed out, frames handed out again (repeated), frames never
+        handed out (dropped), failed device reads, and the mean / 95th percentile
+        of the recent latencies with the overall maximum.
+        """
+        with self.condition:
+            latencies = np.array(self.latencies)
+            elapsed = time.perf_counter() - self.started if self.started is not None else 0.0
+            return {
+                "captured": self.captured,
+                "delivered": self.delivered,
+                "repeated": self.repeated,
+                "dropped": self.dropped,
+                "read_failures": self.read_failures,
+                "capture_fps": self.captured / elapsed if elapsed > 0 else 0.0,
+                "latency_mean": float(latencies.mean()) if len(latencies) else 0.0,
+                "latency_p95": float(np.percentile(latencies, 95)) if len(latencies) else 0.0,
+                "latency_max": self.max_latency,
+            }
+
+    def summary(self):
+        """
+        stats() as one line to print.
+        """
+        s = self.stats()
+        return (f"{s['captured']} frames captured ({s['capture_fps']:.1f} fps), {s['delivered']} handed out, "
+                f"{s['dropped']} dropped, {s['repeated']} repeated, {s['read_failures']} failed reads, "
+                f"latency mean {s['latency_mean'] * 1000:.1f} ms / p95 {s['latency_p95'] * 1000:.1f} ms / "
+                f"max {s['latency_max'] * 1000:.1f} ms")
+
+    def release(self):
+        """
+        Stop the thread and release the device.
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+        self.capture.release()
+        if _sources.get(self.device) is self:
+            del _sources[self.device]
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.release()
+
+
+_sources = {}
+
+
+def get_frame_source(device=0, **kwargs):
+    """
+    The started FrameSource of a camera device, opened only the first time it is
+    asked for, so every tool in the process shares one handle and one thread.
+    Keyword arguments are passed to FrameSource when it is created.
+    """
+    if device not in _sources:
+        _sources[device] = FrameSource(device, **kwargs)
+    return _sources[device].start()
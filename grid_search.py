@@ -0,0 +1,852 @@
+import numpy as np
+import fast_kernels
+
+# Cardinal moves as (row, col) offsets, in the order find_solution_path has always tried them
+DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+STEPS_ROW = np.array([dr for dr, dc in DIRECTIONS], dtype=np.int64)
+STEPS_COL = np.array([dc for dr, dc in DIRECTIONS], dtype=np.int64)
+
+
+def index_dtype(size):
+    """
+    Smallest signed integer type able to hold every flat index of a grid with `size` cells.
+    """
+    return np.int32 if size < 2**31 else np.int64
+
+
+def neighbor_candidates(frontier, free, width):
+    """
+    Expand a frontier of flat indices into its free 4-neighbours.
+    Returns (candidates, sources) ordered source by source, then by DIRECTIONS.
+    """
+    height = len(free) // width
+    rows = frontier // width
+    cols = frontier - rows * width
+
+    candidates = np.empty((len(frontier), 4), dtype=frontier.dtype)
+    valid = np.empty((len(frontier), 4), dtype=bool)
+    for k, (dr, dc) in enumerate(DIRECTIONS):
+        candidates[:, k] = frontier + dr * width + dc
+        if dr == -1:
+            valid[:, k] = rows > 0
+        elif dr == 1:
+            valid[:, k] = rows < height - 1
+        elif dc == -1:
+            valid[:, k] = cols > 0
+        else:
+            valid[:, k] = cols < width - 1
+
+    sources = np.repeat(frontier, 4)
+    candidates = candidates.reshape(-1)
+    valid = valid.reshape(-1)
+    valid[valid] = free[candidates[valid]]
+    return candidates[valid], sources[valid]
+
+
+def wall_mask(img):
+    """
+    Boolean mask of the wall pixels of a BGR maze image, those black in every channel.
+    The channels are OR-ed plane by plane, much faster than a reduction over axis 2.
+    """
+    lit = img[:, :, 0].copy()
+    for channel in range(1, img.shape[2]):
+        lit |= img[:, :, channel]
+    return lit == 0
+
+
+def first_wall(wall, row, col, step_row, step_col, side_row, side_col, steps):
+    """
+    fast_kernels.first_wall on a wall_mask for an axis-aligned ray: the first i in
+    1..steps-1 where the pixel i steps from (row, col), or the one next to it on the
+    given side, is a wall, or 0. The two rows of the ray are one slice of the mask
+    and the first hit is found by argmax. Pixels beyond the border count as free.
+    """
+    if step_row != 0:
+        # a vertical ray is a horizontal one on the transposed mask
+        return first_wall(wall.T, col, row, step_col, step_row, side_col, side_row, steps)
+    lines = wall[max(min(row, row + side_row), 0):max(row, row + side_row) + 1]
+    if step_col > 0:
+        ray = lines[:, col + 1:col + steps].any(axis=0)
+    else:
+        ray = lines[:, max(col - steps + 1, 0):max(col, 0)].any(axis=0)[::-1]
+    first = int(np.argmax(ray)) if len(ray) else 0
+    return first + 1 if len(ray) and ray[first] else 0
+
+
+def reconstruct_path(parent, start_index, end_index, width):
+    """
+    Walk the flat parent array back from end to start and return (row, col) tuples.
+    """
+    indices = [end_index]
+    current = end_index
+    while current != start_index:
+        current = int(parent[current])
+        indices.append(current)
+    indices.reverse()
+    rows, cols = np.divmod(np.array(indices, dtype=np.int64), width)
+    return list(zip(rows.tolist(), cols.tolist()))
+
+
+def bfs_parents(free, height, width, start_index, end_index, steps_row, steps_col, keep_last):
+    """
+    NumPy version of fast_kernels.bfs_parents with the same arguments and result,
+    (parent, expanded), for when Numba is not installed. bfs_search and the click
+    BFS of maze_solver and maze_solution run on it.
+
+    The map is padded with a ring of walls, so a level is expanded by adding the
+    move offsets to the frontier without any bounds checks. Among the cells that see
+    the same new cell, the first (or with keep_last the last) in queue and move
+    order is found with np.minimum.at on its position in the level. The next level
+    is queued in the order its cells were first seen.
+    """
+    padded_width = width + 2
+    dtype = index_dtype((height + 2) * padded_width)
+    unseen = np.zeros((height + 2, padded_width), dtype=bool)
+    unseen[1:-1, 1:-1] = np.asarray(free).reshape(height, width) != 0
+    unseen = unseen.reshape(-1)
+    # cells are indexed with int64 (the fast path of np.minimum.at), stored with dtype
+    offsets = np.asarray(steps_row, dtype=np.int64) * padded_width + np.asarray(steps_col, dtype=np.int64)
+    start = (start_index // width + 1) * padded_width + start_index % width + 1
+    end = (end_index // width + 1) * padded_width + end_index % width + 1
+
+    parent = np.full(len(unseen), -1, dtype=dtype)
+    # smallest position in the current level that saw each cell; a cell is only a
+    # candidate in one level, so the entries of earlier levels never need a reset
+    seen_at = np.full(len(unseen), np.iinfo(dtype).max, dtype=dtype)
+    parent[start] = start
+    unseen[start] = False
+    frontier = np.array([start], dtype=np.int64)
+    expanded = 0
+    while len(frontier) and parent[end] == -1:
+        expanded += len(frontier)
+        candidates = frontier[:, None] + offsets
+        keep = unseen[candidates]
+        sources = frontier[np.nonzero(keep)[0]]
+        candidates = candidates[keep]
+        position = np.arange(len(candidates), dtype=dtype)
+        np.minimum.at(seen_at, candidates, position)
+        new = seen_at[candidates] == position
+        frontier = candidates[new]
+        if keep_last:
+            # the same on the level read backwards finds the last one
+            seen_at[candidates] = np.iinfo(dtype).max
+            np.minimum.at(seen_at, candidates, position[::-1])
+            parent[frontier] = sources[len(candidates) - 1 - seen_at[frontier]]
+        else:
+            parent[frontier] = sources[new]
+        unseen[frontier] = False
+
+    # back to the indices of the unpadded map
+    parent = parent.reshape(height + 2, padded_width)[1:-1, 1:-1].reshape(-1)
+    reached = parent != -1
+    rows, cols = np.divmod(parent[reached], padded_width)
+    parent[reached] = (rows - 1) * width + cols - 1
+    return parent, expanded
+
+
+def bfs_search(maze_map, start, end, stats=None):
+    """
+    Breadth-first search over the free cells (value 1) of maze_map.
+
+    Every level is expanded at once, by fast_kernels.bfs_parents when Numba is
+    installed and by bfs_parents otherwise. Parents are one flat array indexed by
+    row * width + col. Ties are broken exactly like the original list-based BFS in
+    find_solution_path: cells are discovered in queue order and keep the last parent
+    that enqueued them, so the returned path is the same.
+
+    Returns the full pixel path from start to end as a list of (row, col) tuples,
+    or None when end cannot be reached. If a `stats` dict is given, the number of
+    expanded cells is stored under "expanded".
+    """
+    height, width = maze_map.shape
+    free = maze_map.reshape(-1) == 1
+
+    start_index = start[0] * width + start[1]
+    end_index = end[0] * width + end[1]
+
+    bfs = fast_kernels.bfs_parents if fast_kernels.COMPILED else bfs_parents
+    parent, expanded = bfs(free.view(np.uint8), height, width, start_index, end_index, STEPS_ROW, STEPS_COL, True)
+    if stats is not None:
+        stats["expanded"] = int(expanded)
+    if parent[end_index] == -1:
+        return None
+    return reconstruct_path(parent, start_index, end_index, width)
+
+
+class PackedSearchState(object):
+    """
+    Search state of a grid in 3/8 of a byte per cell: visited flags in a bitset and
+    the parent of every visited cell as a 2-bit code, the index in DIRECTIONS of the
+    step from the parent to the cell. The path is read back by walking the codes
+    from the end, so no index array is needed.
+    """
+
+    def __init__(self, size):
+        self.visited = np.zeros((size + 7) // 8, dtype=np.uint8)
+        self.codes = np.zeros((size + 3) // 4, dtype=np.uint8)
+
+    @property
+    def nbytes(self):
+        return self.visited.nbytes + self.codes.nbytes
+
+    def is_visited(self, indices):
+        return (self.visited[indices >> 3] >> (indices & 7).astype(np.uint8)) & 1 == 1
+
+    def visit(self, indices):
+        np.bitwise_or.at(self.visited, indices >> 3, np.left_shift(1, indices & 7).astype(np.uint8))
+
+    def set_parents(self, indices, codes):
+        """
+        Store the codes of cells visited for the first time (their bits are still zero).
+        """
+        np.bitwise_or.at(self.codes, indices >> 2, np.left_shift(codes, 2 * (indices & 3)).astype(np.uint8))
+
+    def path(self, start_index, end_index, width):
+        """
+        Walk the codes back from end to start and return (row, col) tuples.
+        """
+        steps = [dr * width + dc for dr, dc in DIRECTIONS]
+        codes = self.codes
+        indices = [end_index]
+        current = end_index
+        while current != start_index:
+            current -= steps[(int(codes[current >> 2]) >> (2 * (current & 3))) & 3]
+            indices.append(current)
+        indices.reverse()
+        rows, cols = np.divmod(np.array(indices, dtype=np.int64), width)
+        return list(zip(rows.tolist(), cols.tolist()))
+
+
+def direction_codes(candidates, sources, width):
+    """
+    Index in DIRECTIONS of the step from every source to its candidate neighbour.
+    """
+    step = candidates - sources
+    return ((step == width) * 1 + (step == -1) * 2 + (step == 1) * 3).astype(np.uint8)
+
+
+def packed_bfs_search(maze_map, start, end, stats=None):
+    """
+    bfs_search with a PackedSearchState instead of the visited and parent arrays,
+    about 13 times less search memory on top of maze_map. Ties are broken the same
+    way, so the path is the same. If a `stats` dict is given, the expanded cells
+    and the bytes of search state are stored under "expanded" and "state_bytes".
+    """
+    height, width = maze_map.shape
+    size = height * width
+    # a 0/1 map is used as it is, a copy of the free flags would be larger than the state
+    flat = maze_map.reshape(-1)
+    free = flat if flat.dtype == np.uint8 and flat.max() <= 1 else flat == 1
+
+    start_index = start[0] * width + start[1]
+    end_index = end[0] * width + end[1]
+
+    state = PackedSearchState(size)
+    state.visit(np.array([start_index], dtype=np.int64))
+
+    # only one level is held at a time, like bfs_search
+    frontier = np.array([start_index], dtype=np.int64)
+    expanded = 0
+    found = start_index == end_index
+
+    while len(frontier) and not found:
+        expanded += len(frontier)
+
+        candidates, sources = neighbor_candidates(frontier, free, width)
+        keep = ~state.is_visited(candidates)
+        candidates = candidates[keep]
+        sources = sources[keep]
+        if len(candidates) == 0:
+            break
+
+        # Queue order follows the first time a cell was seen, the parent is the last cell that saw it
+        cells, first = np.unique(candidates, return_index=True)
+        _, last = np.unique(candidates[::-1], return_index=True)
+        state.set_parents(cells, direction_codes(cells, sources[len(candidates) - 1 - last], width))
+        state.visit(cells)
+        frontier = candidates[np.sort(first)]
+        found = state.is_visited(np.array([end_index], dtype=np.int64))[0]
+
+    if stats is not None:
+        stats["expanded"] = expanded
+        stats["state_bytes"] = state.nbytes
+
+    if not found:
+        return None
+    return state.path(start_index, end_index, width)
+
+
+def sparse_bfs_search(cells, shape, start, end, stats=None):
+    """
+    Breadth-first search restricted to `cells`, a sorted array of free flat indices
+    (row * width + col) of a grid of the given shape. Neighbours are looked up with
+    np.searchsorted, so visited and parent storage only scales with len(cells).
+    start and end must be in cells. Returns the full pixel path or None.
+    """
+    height, width = shape
+    count = len(cells)
+    start_position = int(np.searchsorted(cells, start[0] * width + start[1]))
+    end_position = int(np.searchsorted(cells, end[0] * width + end[1]))
+    for position, point in ((start_position, start), (end_position, end)):
+        if position == count or cells[position] != point[0] * width + point[1]:
+            raise ValueError(f"{point} is not one of the search cells.")
+
+    # neighbour table: position of each cell's up/down/left/right neighbour in cells,
+    # or `count` (a sentinel that is always visited) when it is not a search cell
+    dtype = index_dtype(count + 1)
+    cols = cells % width
+    neighbors = np.full((count, len(DIRECTIONS)), count, dtype=dtype)
+    for k, (dr, dc) in enumerate(DIRECTIONS):
+        ok = (cols > 0) if dc == -1 else (cols < width - 1) if dc == 1 else np.ones(count, dtype=bool)
+        target = cells[ok] + dr * width + dc
+        position = np.minimum(np.searchsorted(cells, target), count - 1)
+        found = cells[position] == target
+        column = neighbors[:, k]
+        column[np.flatnonzero(ok)[found]] = position[found]
+    del cols
+
+    visited = np.zeros(count + 1, dtype=bool)
+    visited[count] = True
+    parent = np.full(count, -1, dtype=dtype)
+    visited[start_position] = True
+    frontier = np.array([start_position], dtype=np.int64)
+    expanded = 0
+
+    while len(frontier) and not visited[end_position]:
+        expanded += len(frontier)
+        candidates = neighbors[frontier].reshape(-1)
+        sources = np.repeat(frontier, len(DIRECTIONS))
+        keep = ~visited[candidates]
+        nxt, first = np.unique(candidates[keep], return_index=True)
+        parent[nxt] = sources[keep][first]
+        visited[nxt] = True
+        frontier = nxt
+
+    if stats is not None:
+        stats["expanded"] = expanded
+
+    if not visited[end_position]:
+        return None
+    positions = [end_position]
+    while positions[-1] != start_position:
+        positions.append(int(parent[positions[-1]]))
+    rows, cols = np.divmod(cells[positions[::-1]].astype(np.int64), width)
+    return list(zip(rows.tolist(), cols.tolist()))
+
+
+def manhattan(a, b):
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+def straight_path(points):
+    """
+    Fill the pixels between consecutive axis-aligned points (jump points, corridor
+    corners) and return the full (row, col) pixel path.
+    """
+    path = [tuple(points[0])]
+    for (r0, c0), (r1, c1) in zip(points[:-1], points[1:]):
+        dr = (r1 > r0) - (r1 < r0)
+        dc = (c1 > c0) - (c1 < c0)
+        for k in range(1, max(abs(r1 - r0), abs(c1 - c0)) + 1):
+            path.append((r0 + k * dr, c0 + k * dc))
+    return path
+
+
+def astar_search(maze_map, start, end, stats=None):
+    """
+    A* over the free cells of maze_map with a Manhattan heuristic.
+
+    Ties on f are broken towards the cell closest to the goal, which keeps the search
+    to a narrow band on open floors. The path has the same length as the BFS one.
+    Returns the full pixel path or None, like bfs_search.
+    """
+    import heapq
+
+    height, width = maze_map.shape
+    size = height * width
+    free = (maze_map.reshape(-1) == 1).tobytes()
+    end_row, end_col = end
+
+    start_index = start[0] * width + start[1]
+    end_index = end_row * width + end_col
+
+    cost = np.full(size, -1, dtype=np.int64)
+    parent = np.full(size, -1, dtype=index_dtype(size))
+    closed = bytearray(size)
+    cost[start_index] = 0
+    heap = [(manhattan(start, end), manhattan(start, end), start_index)]
+    expanded = 0
+
+    while heap:
+        f, h, current = heapq.heappop(heap)
+        if closed[current]:
+            continue
+        closed[current] = 1
+        expanded += 1
+        if current == end_index:
+            break
+
+        g = f - h + 1
+        row, col = divmod(current, width)
+        for dr, dc in DIRECTIONS:
+            r, c = row + dr, col + dc
+            if not (0 <= r < height and 0 <= c < width):
+                continue
+            neighbor = r * width + c
+            if not free[neighbor] or closed[neighbor]:
+                continue
+            if cost[neighbor] == -1 or g < cost[neighbor]:
+                cost[neighbor] = g
+                parent[neighbor] = current
+                h = abs(r - end_row) + abs(c - end_col)
+                heapq.heappush(heap, (g + h, h, neighbor))
+
+    if stats is not None:
+        stats["expanded"] = expanded
+
+    if not closed[end_index]:
+        return None
+    return reconstruct_path(parent, start_index, end_index, width)
+
+
+class JumpPointGrid(object):
+    """
+    Jump primitives for Jump Point Search on a uniform-cost 4-connected grid.
+
+    Canonical paths move vertically first: a vertical move may continue or turn
+    left/right, a horizontal move only continues unless an obstacle that ends beside
+    it forces a vertical turn. Horizontal scans are done on NumPy row slices.
+    """
+
+    def __init__(self, maze_map, goal):
+        self.free = maze_map == 1
+        self.height, self.width = maze_map.shape
+        self.goal = tuple(goal)
+
+    def is_free(self, row, col):
+        return 0 <= row < self.height and 0 <= col < self.width and self.free[row, col]
+
+    def forced_vertical(self, row, col, dc):
+        """
+        Vertical directions forced open at (row, col) when arriving with horizontal step dc.
+        """
+        return [dr for dr in (-1, 1)
+                if self.is_free(row + dr, col) and not self.is_free(row + dr, col - dc)]
+
+    def jump_horizontal(self, row, col, dc):
+        line = self.free[row]
+        if dc == 1:
+            cells = line[col + 1:]
+        else:
+            cells = line[:col][::-1]
+        blocked = np.flatnonzero(~cells)
+        length = blocked[0] if len(blocked) else len(cells)
+        if length == 0:
+            return None
+
+        stop = length
+        if self.goal[0] == row:
+            k = (self.goal[1] - col) * dc - 1
+            if 0 <= k < length:
+                stop = k
+        for dr in (-1, 1):
+            if not 0 <= row + dr < self.height:
+                continue
+            side = self.free[row + dr]
+            if dc == 1:
+                ahead = side[col + 1:col + 1 + length]
+                behind = side[col:col + length]
+            else:
+                ahead = side[:col][::-1][:length]
+                behind = side[:col + 1][::-1][:length]
+            forced = np.flatnonzero(ahead & ~behind)
+            if len(forced) and forced[0] < stop:
+                stop = forced[0]
+
+        if stop == length:
+            return None
+        return (row, col + dc * (int(stop) + 1))
+
+    def jump_vertical(self, row, col, dr):
+        while True:
+            row += dr
+            if not self.is_free(row, col):
+                return None
+            if (row, col) == self.goal:
+                return (row, col)
+            if self.jump_horizontal(row, col, 1) or self.jump_horizontal(row, col, -1):
+                return (row, col)
+
+    def jump(self, row, col, dr, dc):
+        if dr:
+            return self.jump_vertical(row, col, dr)
+        return self.jump_horizontal(row, col, dc)
+
+    def successors(self, row, col, direction):
+        """
+        Directions to scan from a jump point reached with step `direction` (None at the start).
+        """
+        if direction is None:
+            return DIRECTIONS
+        dr, dc = direction
+        if dr:
+            return [(dr, 0), (0, -1), (0, 1)]
+        return [(0, dc)] + [(v, 0) for v in self.forced_vertical(row, col, dc)]
+
+
+def jps_search(maze_map, start, end, stats=None):
+    """
+    Jump Point Search for uniform 4-connected grids.
+
+    A* runs over jump points only, straight runs between them are skipped by the
+    JumpPointGrid scans. The path has the same length as the BFS one. Returns the
+    full pixel path or None, like bfs_search; "expanded" counts jump points.
+    """
+    import heapq
+
+    start = (int(start[0]), int(start[1]))
+    end = (int(end[0]), int(end[1]))
+    grid = JumpPointGrid(maze_map, end)
+
+    cost = {start: 0}
+    parent = {start: None}
+    closed = set()
+    heap = [(manhattan(start, end), manhattan(start, end), start, None)]
+    expanded = 0
+
+    while heap:
+        f, h, current, direction = heapq.heappop(heap)
+        if (current, direction) in closed or f - h > cost[current]:
+            continue
+        closed.add((current, direction))
+        expanded += 1
+        if current == end:
+            break
+
+        g = f - h
+        for dr, dc in grid.successors(current[0], current[1], direction):
+            point = grid.jump(current[0], current[1], dr, dc)
+            if point is None:
+                continue
+            new_cost = g + manhattan(current, point)
+            if point not in cost or new_cost <= cost[point]:
+                if point not in cost or new_cost < cost[point]:
+                    parent[point] = current
+                cost[point] = new_cost
+                h = manhattan(point, end)
+                heapq.heappush(heap, (new_cost + h, h, point, (dr, dc)))
+
+    if stats is not None:
+        stats["expanded"] = expanded
+
+    if end not in parent:
+        return None
+    points = [end]
+    while parent[points[-1]] is not None:
+        points.append(parent[points[-1]])
+    points.reverse()
+    return straight_path(points)
+
+
+def bidirectional_bfs_search(maze_map, start, end, stats=None):
+    """
+    Breadth-first search run from start and end at once until the two frontiers meet.
+
+    Each step expands the smaller frontier by a whole level, vectorised like bfs_search.
+    When the new level touches cells already reached from the other side, the meeting
+    cell with the smallest total distance is picked and the two half paths are joined
+    through it. Returns the full pixel path or None.
+    """
+    height, width = maze_map.shape
+    size = height * width
+    dtype = index_dtype(size)
+    free = maze_map.reshape(-1) == 1
+    if not free[end[0] * width + end[1]]:
+        return None
+
+    start_index = start[0] * width + start[1]
+    end_index = end[0] * width + end[1]
+    if start_index == end_index:
+        return [tuple(start)]
+
+    # side 0 grows from start, side 1 from end
+    distance = [np.full(size, -1, dtype=dtype), np.full(size, -1, dtype=dtype)]
+    parent = [np.full(size, -1, dtype=dtype), np.full(size, -1, dtype=dtype)]
+    frontier = [np.array([start_index], dtype=dtype), np.array([end_index], dtype=dtype)]
+    level = [0, 0]
+    distance[0][start_index] = 0
+    distance[1][end_index] = 0
+    expanded = 0
+    meet = None
+
+    while len(frontier[0]) and len(frontier[1]):
+        side = 0 if len(frontier[0]) <= len(frontier[1]) else 1
+        other = 1 - side
+        expanded += len(frontier[side])
+
+        candidates, sources = neighbor_candidates(frontier[side], free, width)
+        keep = distance[side][candidates] == -1
+        candidates = candidates[keep]
+        sources = sources[keep]
+        cells, first = np.unique(candidates, return_index=True)
+        level[side] += 1
+        parent[side][cells] = sources[first]
+        distance[side][cells] = level[side]
+        frontier[side] = candidates[np.sort(first)]
+
+        touching = cells[distance[other][cells] != -1]
+        if len(touching):
+            meet = int(touching[np.argmin(distance[other][touching])])
+            break
+
+    if stats is not None:
+        stats["expanded"] = expanded
+
+    if meet is None:
+        return None
+    forward = reconstruct_path(parent[0], start_index, meet, width)
+    backward = reconstruct_path(parent[1], end_index, meet, width)
+    return forward + backward[::-1][1:]
+
+
+# Extra cost of a change of heading in turn_search, in pixels of path length
+TURN_COST = 16
+
+
+def count_turns(path):
+    """
+    Number of heading changes along a 4-connected pixel path.
+    """
+    if len(path) < 3:
+        return 0
+    steps = np.diff(np.array(path, dtype=np.int64), axis=0)
+    return int(np.count_nonzero(np.any(steps[1:] != steps[:-1], axis=1)))
+
+
+def turn_search(maze_map, start, end, turn_cost=TURN_COST, stats=None):
+    """
+    Cheapest path over the free cells of maze_map when every step costs 1 and every
+    change of heading costs `turn_cost` more, so among paths of (nearly) the same
+    length the one with the fewest turns wins. A turn is worth `turn_cost` pixels
+    of detour; turn_cost=0 gives a plain shortest path.
+
+    The search state is (cell, heading), flat index cell * 4 + heading into
+    DIRECTIONS, and the open list is a dict of buckets per integer path cost (Dial's
+    algorithm) expanded a bucket at a time with NumPy. The start may leave in any
+    heading at no cost. State arrays are four times the size of bfs_search's.
+
+    Returns the full pixel path or None; `stats` gets the expanded states, the path
+    cost and the number of turns.
+    """
+    height, width = maze_map.shape
+    size = height * width
+    free = maze_map.reshape(-1) == 1
+    headings = len(DIRECTIONS)
+    offsets = np.array([dr * width + dc for dr, dc in DIRECTIONS], dtype=np.int64)
+
+    start_index = int(start[0]) * width + int(start[1])
+    end_index = int(end[0]) * width + int(end[1])
+    distance = np.full(size * headings, np.iinfo(np.int32).max, dtype=np.int32)
+    parent = np.full(size * headings, -1, dtype=index_dtype(size * headings))
+    done = np.zeros(size * headings, dtype=bool)
+    first_states = start_index * headings + np.arange(headings)
+    distance[first_states] = 0
+
+    buckets = {0: [first_states]}
+    current = 0
+    expanded = 0
+    goal = None
+    while buckets:
+        if current not in buckets:
+            current += 1
+            continue
+        states = np.unique(np.concatenate(buckets.pop(current)))
+        states = states[(distance[states] == current) & ~done[states]]
+        done[states] = True
+        expanded += len(states)
+        at_goal = states[states // headings == end_index]
+        if len(at_goal):
+            goal = int(at_goal[0])
+            break
+
+        cells = states // headings
+        heading = states - cells * headings
+        rows = cells // width
+        cols = cells - rows * width
+        candidates, sources, costs = [], [], []
+        for k, (dr, dc) in enumerate(DIRECTIONS):
+            ok = ((rows > 0) if dr == -1 else (rows < height - 1) if dr == 1 else
+                  (cols > 0) if dc == -1 else (cols < width - 1))
+            target = cells[ok] + offsets[k]
+            ok_free = free[target]
+            candidates.append(target[ok_free] * headings + k)
+            sources.append(states[ok][ok_free])
+            costs.append(current + 1 + turn_cost * (heading[ok][ok_free] != k))
+        candidates = np.concatenate(candidates)
+        sources = np.concatenate(sources)
+        costs = np.concatenate(costs).astype(np.int64)
+        better = costs < distance[candidates]
+        candidates, sources, costs = candidates[better], sources[better], costs[better]
+        # the cheapest offer per state wins
+        order = np.lexsort((costs, candidates))
+        candidates, sources, costs = candidates[order], sources[order], costs[order]
+        first = np.ones(len(candidates), dtype=bool)
+        first[1:] = candidates[1:] != candidates[:-1]
+        candidates, sources, costs = candidates[first], sources[first], costs[first]
+
+        distance[candidates] = costs
+        parent[candidates] = sources
+        for value in np.unique(costs).tolist():
+            buckets.setdefault(value, []).append(candidates[costs == value])
+        current += 1
+
+    if goal is None:
+        if stats is not None:
+            stats["expanded"] = expanded
+        return None
+
+    states = [goal]
+    while states[-1] // headings != start_index:
+        states.append(int(parent[states[-1]]))
+    rows, cols = np.divmod(np.array(states[::-1], dtype=np.int64) // headings, width)
+    path = list(zip(rows.tolist(), cols.tolist()))
+    if stats is not None:
+        stats["expanded"] = expanded
+        stats["cost"] = int(distance[goal])
+        stats["turns"] = count_turns(path)
+    return path
+
+
+def perimeter_openings(top, right, bottom, left):
+    """
+    Centres of the openings of a maze from the free flags of its four borders (top and
+    bottom left to right, left and right top to bottom). The border is walked once
+    clockwise from the top-left corner and every run of free pixels, also one turning
+    a corner or wrapping around the start, is one opening. Returns (row, col) points
+    in that clockwise order.
+    """
+    height, width = len(left), len(top)
+    rows = np.concatenate((np.zeros(width, dtype=np.int64), np.arange(1, height),
+                           np.full(width - 1, height - 1), np.arange(height - 2, 0, -1)))
+    cols = np.concatenate((np.arange(width), np.full(height - 1, width - 1),
+                           np.arange(width - 2, -1, -1), np.zeros(height - 2, dtype=np.int64)))
+    free = np.concatenate((top, right[1:], bottom[-2::-1], left[-2:0:-1])).astype(bool)
+    if not free.any():
+        return []
+    if free.all():
+        return [(int(rows[len(free) // 2]), int(cols[len(free) // 2]))]
+
+    # walk from a wall pixel, so that no run wraps around the end of the array
+    shift = int(np.argmin(free))
+    free = np.roll(free, -shift)
+    edges = np.diff(np.concatenate(([0], free.view(np.int8), [0])))
+    starts, stops = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    centres = (starts + (stops - 1 - starts) // 2 + shift) % len(free)
+    return [(int(rows[i]), int(cols[i])) for i in np.sort(centres)]
+
+
+def split_openings(openings, shape):
+    """
+    Openings split into entrances (top edge, then left) and exits (bottom edge, then
+    right), each side from its first pixel on, like the old detection searched the
+    borders. A corner belongs to the top or bottom edge.
+    """
+    height, width = shape
+    entrances = sorted((point for point in openings if point[0] == 0 or (point[1] == 0 and point[0] != height - 1)),
+                       key=lambda point: (point[0] != 0, point[0] + point[1]))
+    exits = sorted((point for point in openings if point not in entrances),
+                   key=lambda point: (point[0] != height - 1, point[0] + point[1]))
+    return entrances, exits
+
+
+def nearest_pair_search(maze_map, points, stats=None, groups=None):
+    """
+    Shortest path between the closest two of several points (e.g. the openings on the
+    border of a maze) in one breadth-first search, instead of one search per pair.
+
+    All points are queued at once and every reached cell is labelled with the point it
+    was reached from. A shortest path between two points crosses the edge where their
+    two regions meet, so every edge joining differently labelled cells is a candidate
+    of length distance + 1 + distance. The search stops once no later level can meet
+    with a shorter length.
+
+    With `groups` (one id per point) only points of different groups are paired, e.g.
+    group 0 for the entrances and 1 for the exits: the shortest path between the two
+    groups also crosses an edge where a region of each meets.
+
+    Returns (i, j, path) with the pixel path from points[i] to points[j], or None when
+    no two points are connected. If a `stats` dict is given, the number of expanded
+    cells is stored under "expanded".
+    """
+    height, width = maze_map.shape
+    size = height * width
+    dtype = index_dtype(size)
+    free = maze_map.reshape(-1) == 1
+
+    label = np.full(size, -1, dtype=np.int32)
+    distance = np.zeros(size, dtype=dtype)
+    parent = np.full(size, -1, dtype=dtype)
+    roots = np.array([point[0] * width + point[1] for point in points], dtype=dtype).reshape(-1)
+    # points on a wall are never reached, a point given twice keeps its first label
+    frontier = np.unique(roots[free[roots]])
+    if len(frontier) < 2:
+        return None
+    label[roots[::-1]] = np.arange(len(roots), dtype=np.int32)[::-1]
+    group = np.arange(len(roots)) if groups is None else np.asarray(groups).reshape(-1)
+    parent[frontier] = frontier
+
+    best, meet = None, None
+    level = 0
+    expanded = 0
+    while len(frontier):
+        expanded += len(frontier)
+        candidates, sources = neighbor_candidates(frontier, free, width)
+
+        fresh = label[candidates] == -1
+        cells, first = np.unique(candidates[fresh], return_index=True)
+        parent[cells] = sources[fresh][first]
+        label[cells] = label[parent[cells]]
+        distance[cells] = level + 1
+
+        # edges between the regions of two points, including cells claimed in this level
+        crossing = group[label[candidates]] != group[label[sources]]
+        if crossing.any():
+            u, v = sources[crossing], candidates[crossing]
+            lengths = distance[u] + 1 + distance[v]
+            k = int(np.argmin(lengths))
+            if best is None or lengths[k] < best:
+                best, meet = int(lengths[k]), (int(u[k]), int(v[k]))
+        # edges found from the next level on join cells of level >= level + 1 and >= level
+        if best is not None and best <= 2 * level + 2:
+            break
+        frontier = cells
+        level += 1
+
+    if stats is not None:
+        stats["expanded"] = expanded
+
+    if meet is None:
+        return None
+    u, v = meet
+    i, j = int(label[u]), int(label[v])
+    forward = reconstruct_path(parent, int(roots[i]), u, width)
+    backward = reconstruct_path(parent, int(roots[j]), v, width)
+    return i, j, forward + backward[::-1]
+
+
+SEARCH_METHODS = {
+    "bfs": bfs_search,
+    "packed": packed_bfs_search,
+    "astar": astar_search,
+    "jps": jps_search,
+    "bidirectional": bidirectional_bfs_search,
+    "turns": turn_search,
+}
+
+def search(maze_map, start, end, method="bfs", stats=None):
+    """
+    Run the grid search selected by `method`, one of the SEARCH_METHODS keys.
+    """
+    if method not in SEARCH_METHODS:
+        raise ValueError(f"Unknown search method: {method}")
+    return SEARCH_METHODS[method](maze_map, start, end, stats=stats)
@@ -0,0 +1,167 @@
+import heapq
+import numpy as np
+import grid_search
+import distance_field
+
+INF = float("inf")
+
+
+def map_diff(previous, current):
+    """
+    Diff of two consecutive binary maps (1 = free) of the same shape: the flat
+    indices of the cells that changed and their new free flags.
+    """
+    changed = np.flatnonzero(previous.reshape(-1) != current.reshape(-1))
+    return changed, current.reshape(-1)[changed] == 1
+
+
+class IncrementalPlanner(object):
+    """
+    D* Lite on the 4-connected free cells of a binary maze map.
+
+    The search runs backwards from the goal and keeps its g / rhs values and
+    priority queue between calls, so after a map change only the cells whose
+    distance to the goal is affected by the change are expanded again. The start
+    may also move (the robot driving along the path) without a new search.
+
+    g and rhs are float arrays over the flat map. They start out as the BFS
+    distance field of the goal, which is the state a full D* Lite search of the
+    first map would end in, so the queue starts empty and the first path is one
+    level-synchronous flood instead of a search cell by cell.
+    """
+
+    def __init__(self, maze_map, start, goal):
+        self.shape = maze_map.shape
+        height, width = self.shape
+        self.maze_map = (maze_map == 1).astype(np.uint8)
+        # flat view of maze_map, apply_diff writes both at once
+        self.free = self.maze_map.reshape(-1)
+        self.start = int(start[0]) * width + int(start[1])
+        self.goal = int(goal[0]) * width + int(goal[1])
+        self.last = self.start
+        self.km = 0
+
+        distance, _ = distance_field.DistanceField.flood(self.maze_map, divmod(self.goal, width))
+        distance = distance.reshape(-1)
+        self.g = np.where(distance == distance_field.UNREACHABLE, INF, distance.astype(np.float64))
+        self.rhs = self.g.copy()
+        # cell -> key it is queued with, heap entries with another key are stale
+        self.queued = {}
+        self.queue = []
+        self.expanded = 0
+
+    def neighbors(self, index):
+        width = self.shape[1]
+        row, col = divmod(index, width)
+        if row > 0:
+            yield index - width
+        if row < self.shape[0] - 1:
+            yield index + width
+        if col > 0:
+            yield index - 1
+        if col < width - 1:
+            yield index + 1
+
+    def heuristic(self, index):
+        width = self.shape[1]
+        return grid_search.manhattan(divmod(index, width), divmod(self.start, width))
+
+    def cost(self, a, b):
+        return 1 if self.free[a] and self.free[b] else INF
+
+    def key(self, index):
+        best = min(self.g[index], self.rhs[index])
+        return (best + self.heuristic(index) + self.km, best)
+
+    def push(self, index):
+        key = self.key(index)
+        self.queued[index] = key
+        heapq.heappush(self.queue, (key, index))
+
+    def top(self):
+        # drop heap entries that were superseded or removed
+        while self.queue and self.queued.get(self.queue[0][1]) != self.queue[0][0]:
+            heapq.heappop(self.queue)
+        return self.queue[0] if self.queue else ((INF, INF), None)
+
+    def update_vertex(self, index):
+        if index != self.goal:
+            self.rhs[index] = min((self.cost(index, n) + self.g[n] for n in self.neighbors(index)), default=INF)
+        self.queued.pop(index, None)
+        if self.g[index] != self.rhs[index]:
+            self.push(index)
+
+    def compute_shortest_path(self):
+        g, rhs = self.g, self.rhs
+        while True:
+            key, index = self.top()
+            if index is None or (key >= self.key(self.start) and rhs[self.start] == g[self.start]):
+                break
+            heapq.heappop(self.queue)
+            del self.queued[index]
+            self.expanded += 1
+            new_key = self.key(index)
+            if key < new_key:
+                self.queued[index] = new_key
+                heapq.heappush(self.queue, (new_key, index))
+            elif g[index] > rhs[index]:
+                g[index] = rhs[index]
+                for n in self.neighbors(index):
+                    self.update_vertex(n)
+            else:
+                g[index] = INF
+                self.update_vertex(index)
+                for n in self.neighbors(index):
+                    self.update_vertex(n)
+
+    def apply_diff(self, diff):
+        """
+        Apply a map_diff of the previous and the current frame and repair the search.
+        """
+        changed, free = diff
+        for index, is_free in zip(changed.tolist(), free.tolist()):
+            if self.free[index] == is_free:
+                continue
+            self.free[index] = is_free
+            # every edge into and out of the cell changed cost
+            self.update_vertex(index)
+            for n in self.neighbors(index):
+                self.update_vertex(n)
+
+    def update(self, maze_map, stats=None):
+        """
+        Take the binary map of a new frame, apply what changed since the last one and
+        return the repaired path (see path for `stats`).
+        """
+        self.apply_diff(map_diff(self.maze_map, maze_map))
+        return self.path(stats)
+
+    def move_start(self, start):
+        """
+        Move the start (e.g. to where the robot is now) while keeping the search state.
+        """
+        width = self.shape[1]
+        start = int(start[0]) * width + int(start[1])
+        self.km += grid_search.manhattan(divmod(self.last, width), divmod(start, width))
+        self.last = self.start = start
+
+    def path(self, stats=None):
+        """
+        Current shortest path from start to goal as a list of (row, col), or None.
+        If a `stats` dict is given, the cells expanded since the planner was
+        created are stored under "expanded".
+        """
+        self.compute_shortest_path()
+        if stats is not None:
+            stats["expanded"] = self.expanded
+        if self.g[self.start] == INF:
+            return None
+
+        width = self.shape[1]
+        current = self.start
+        path = [current]
+        while current != self.goal:
+            # next cell down the g values, ties go to the first of grid_search.DIRECTIONS
+            current = min(self.neighbors(current), key=lambda n: self.cost(current, n) + self.g[n])
+            path.append(current)
+        return [divmod(index, width) for index in path]
@@ -0,0 +1,382 @@
+import hashlib
+import heapq
+import pickle
+from collections import OrderedDict
+import cv2
+import numpy as np
+import grid_search
+
+# 8-neighbourhood as (row, col) offsets, clockwise from north (P2..P9 in Zhang-Suen terms)
+NEIGHBORS8 = [(-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1)]
+
+
+def zhang_suen_thinning(free):
+    """
+    Zhang-Suen thinning of a boolean image, returns a one-pixel-wide skeleton.
+
+    Only pixels on the current boundary can be peeled, so each pass evaluates just
+    those (as flat indices into a padded image) instead of the whole frame.
+    """
+    height, width = free.shape
+    img = np.pad(free.astype(np.uint8), 1)
+    stride = width + 2
+    offsets = np.array([dr * stride + dc for dr, dc in NEIGHBORS8])
+    flat = img.reshape(-1)
+
+    eroded = cv2.erode(img, np.ones((3, 3), np.uint8), borderType=cv2.BORDER_CONSTANT, borderValue=0)
+    candidates = np.flatnonzero((img == 1) & (eroded == 0))
+
+    while len(candidates):
+        changed = False
+        for step in (0, 1):
+            ring = flat[candidates[:, None] + offsets]
+            p2, p4, p6, p8 = ring[:, 0], ring[:, 2], ring[:, 4], ring[:, 6]
+            count = ring.sum(axis=1)
+            transitions = ((ring == 0) & (np.roll(ring, -1, axis=1) == 1)).sum(axis=1)
+            if step == 0:
+                sides = ((p2 & p4 & p6) == 0) & ((p4 & p6 & p8) == 0)
+            else:
+                sides = ((p2 & p4 & p8) == 0) & ((p2 & p6 & p8) == 0)
+            remove = (flat[candidates] == 1) & (count >= 2) & (count <= 6) & (transitions == 1) & sides
+            if not remove.any():
+                continue
+            changed = True
+            removed = candidates[remove]
+            flat[removed] = 0
+            # neighbours of peeled pixels are on the new boundary
+            candidates = np.concatenate((candidates[~remove], (removed[:, None] + offsets).reshape(-1)))
+            candidates = np.sort(candidates[flat[candidates] == 1])
+            candidates = candidates[np.concatenate(([True], candidates[1:] != candidates[:-1]))]
+        if not changed:
+            break
+
+    return img[1:-1, 1:-1].astype(bool)
+
+
+def skeletonize(maze_map):
+    """
+    Thin the free space of maze_map (1 = free) to an 8-connected skeleton.
+    Uses cv2.ximgproc.thinning when opencv-contrib is installed.
+    """
+    if hasattr(cv2, "ximgproc"):
+        return cv2.ximgproc.thinning((maze_map == 1).astype(np.uint8) * 255) > 0
+    return zhang_suen_thinning(maze_map == 1)
+
+
+class SkeletonGraph(object):
+    """
+    Corridor graph of a maze: junctions and dead ends of the skeleton are nodes, the
+    skeleton runs between them are edges weighted by their length that keep their
+    pixel polylines. Dijkstra on this graph replaces a full-frame pixel search, and
+    solved queries are memoised so repeating one is a dictionary lookup.
+    """
+
+    def __init__(self, maze_map):
+        self.maze_map = maze_map
+        self.shape = maze_map.shape
+        height, width = self.shape
+
+        skeleton = skeletonize(maze_map)
+        padded = np.pad(skeleton, 1)
+        degree = sum(padded[1 + dr:height + 1 + dr, 1 + dc:width + 1 + dc].astype(np.uint8)
+                     for dr, dc in NEIGHBORS8)
+        node_mask = skeleton & (degree != 2)
+
+        # Junction pixels touching along a side form one node, represented by its first
+        # pixel; diagonal neighbours are linked by an edge, which is dropped at a pinch
+        count, labels = cv2.connectedComponents(node_mask.astype(np.uint8), connectivity=4)
+        node_pixels = np.flatnonzero(node_mask)
+        node_ids = labels.reshape(-1)[node_pixels] - 1
+        _, first = np.unique(node_ids, return_index=True)
+        self.nodes = [divmod(int(p), width) for p in node_pixels[first]]
+        self.edges = []
+        self.adjacency = [[] for _ in range(count - 1)]
+
+        traced = np.zeros(self.shape, dtype=bool)
+        pixel_index, pixel_edge, pixel_position = [], [], []
+        direct = set()
+
+        def node_of(pixel):
+            return int(labels[pixel]) - 1
+
+        for flat in node_pixels:
+            source = divmod(int(flat), width)
+            u = node_of(source)
+            pixel_index.append(int(flat))
+            pixel_edge.append(-1)
+            pixel_position.append(u)
+            for dr, dc in NEIGHBORS8:
+                nxt = (source[0] + dr, source[1] + dc)
+                if not (0 <= nxt[0] < height and 0 <= nxt[1] < width) or not skeleton[nxt]:
+                    continue
+                if self.pinched(source, nxt):
+                    continue
+                if node_mask[nxt]:
+                    v = node_of(nxt)
+                    if v != u and (min(u, v), max(u, v)) not in direct:
+                        direct.add((min(u, v), max(u, v)))
+                        self._add_edge(u, v, [source, nxt])
+                    continue
+                if traced[nxt]:
+                    continue
+
+                # Follow the corridor until the next node pixel
+                polyline = [source, nxt]
+                while not node_mask[polyline[-1]]:
+                    current = polyline[-1]
+                    traced[current] = True
+                    options = [(current[0] + r, current[1] + c) for r, c in NEIGHBORS8
+                               if 0 <= current[0] + r < height and 0 <= current[1] + c < width
+                               and skeleton[current[0] + r, current[1] + c]
+                               and (current[0] + r, current[1] + c) not in polyline[-3:]
+                               and not self.pinched(current, (current[0] + r, current[1] + c))]
+                    # a corridor leaving u may brush another pixel of u on its first step
+                    if len(polyline) == 2:
+                        options = [p for p in options if not node_mask[p] or node_of(p) != u]
+                    if not options:
+                        break
+                    nodes = [p for p in options if node_mask[p]]
+                    polyline.append(nodes[0] if nodes else options[0])
+                if not node_mask[polyline[-1]]:
+                    continue
+                edge = self._add_edge(u, node_of(polyline[-1]), polyline)
+                for position, (r, c) in enumerate(polyline[1:-1], 1):
+                    pixel_index.append(r * width + c)
+                    pixel_edge.append(edge)
+                    pixel_position.append(position)
+
+        # Sorted lookup from skeleton pixel to (edge, position), or (-1, node) for node pixels
+        order = np.argsort(pixel_index)
+        self.pixel_index = np.array(pixel_index, dtype=np.int64)[order]
+        self.pixel_edge = np.array(pixel_edge, dtype=np.int32)[order]
+        self.pixel_position = np.array(pixel_position, dtype=np.int32)[order]
+        # only skeleton pixels that made it into the graph are useful to attach to
+        self.skeleton = np.zeros(self.shape, dtype=bool)
+        self.skeleton.reshape(-1)[self.pixel_index] = True
+        self.queries = {}
+
+    def pinched(self, a, b):
+        """
+        Whether a step between neighbouring pixels a and b is diagonal with walls on
+        both of its sides. The skeleton is 8-connected, but no 4-connected path (or
+        robot) passes between two walls touching at a corner, so these steps are
+        never traced.
+        """
+        return a[0] != b[0] and a[1] != b[1] and self.maze_map[a[0], b[1]] != 1 and self.maze_map[b[0], a[1]] != 1
+
+    def _add_edge(self, u, v, polyline):
+        polyline = np.array(polyline, dtype=np.int32)
+        steps = np.hypot(*np.diff(polyline, axis=0).T)
+        cumulative = np.concatenate(([0.0], np.cumsum(steps)))
+        edge = len(self.edges)
+        self.edges.append((u, v, polyline, cumulative))
+        self.adjacency[u].append((v, cumulative[-1], edge))
+        self.adjacency[v].append((u, cumulative[-1], edge))
+        return edge
+
+    def locate(self, pixel):
+        """
+        Return (edge, position) for a skeleton pixel, or (-1, node) for a node pixel.
+        """
+        flat = pixel[0] * self.shape[1] + pixel[1]
+        k = np.searchsorted(self.pixel_index, flat)
+        if k == len(self.pixel_index) or self.pixel_index[k] != flat:
+            raise ValueError(f"{pixel} is not on the maze skeleton.")
+        return int(self.pixel_edge[k]), int(self.pixel_position[k])
+
+    def attach(self, point):
+        """
+        4-connected BFS over free pixels from point to the nearest skeleton pixel of the
+        graph. The flood runs in a window around point that doubles until it succeeds.
+        Returns the pixel path from point to that skeleton pixel.
+        """
+        height, width = self.shape
+        row, col = int(point[0]), int(point[1])
+        radius = 32
+        while True:
+            r0, r1 = max(row - radius, 0), min(row + radius + 1, height)
+            c0, c1 = max(col - radius, 0), min(col + radius + 1, width)
+            window_width = c1 - c0
+            free = (self.maze_map[r0:r1, c0:c1] == 1).reshape(-1)
+            target = self.skeleton[r0:r1, c0:c1].reshape(-1)
+            origin = (row - r0) * window_width + (col - c0)
+
+            parent = np.full(len(free), -1, dtype=np.int64)
+            parent[origin] = origin
+            frontier = np.array([origin], dtype=np.int64)
+            while len(frontier) and not target[frontier].any():
+                candidates, sources = grid_search.neighbor_candidates(frontier, free, window_width)
+                keep = parent[candidates] == -1
+                candidates, first = np.unique(candidates[keep], return_index=True)
+                parent[candidates] = sources[keep][first]
+                frontier = candidates
+
+            if len(frontier):
+                current = int(frontier[np.argmax(target[frontier])])
+                path = [current]
+                while current != origin:
+                    current = int(parent[current])
+                    path.append(current)
+                return [(r0 + p // window_width, c0 + p % window_width) for p in reversed(path)]
+            if (r0, r1, c0, c1) == (0, height, 0, width):
+                raise ValueError(f"No skeleton reachable from {(row, col)}.")
+            radius *= 2
+
+    def _entry_links(self, pixel):
+        """
+        Graph nodes reachable directly from a skeleton pixel as (node, cost, polyline).
+        """
+        edge, position = self.locate(pixel)
+        if edge == -1:
+            return [(position, 0.0, np.array([pixel], dtype=np.int32))]
+        u, v, polyline, cumulative = self.edges[edge]
+        return [(u, cumulative[position], polyline[position::-1]),
+                (v, cumulative[-1] - cumulative[position], polyline[position:])]
+
+    def shortest_polyline(self, start_pixel, end_pixel):
+        """
+        Dijkstra between two skeleton pixels, returns the skeleton polyline as an N x 2 array.
+        """
+        start_edge, start_position = self.locate(start_pixel)
+        end_edge, end_position = self.locate(end_pixel)
+
+        best_cost, best_polyline = np.inf, None
+        if start_edge != -1 and start_edge == end_edge:
+            _, _, polyline, cumulative = self.edges[start_edge]
+            best_cost = abs(cumulative[end_position] - cumulative[start_position])
+            step = 1 if end_position >= start_position else -1
+            best_polyline = polyline[start_position:end_position + step if end_position + step >= 0 else None:step]
+
+        exits = {node: (cost, polyline[::-1]) for node, cost, polyline in self._entry_links(end_pixel)}
+        distance = {}
+        previous = {}
+        heap = []
+        for node, cost, polyline in self._entry_links(start_pixel):
+            if cost < distance.get(node, np.inf):
+                distance[node] = cost
+                previous[node] = (None, polyline)
+                heapq.heappush(heap, (cost, node))
+
+        while heap:
+            cost, node = heapq.heappop(heap)
+            if cost > distance[node] or cost >= best_cost:
+                continue
+            if node in exits and cost + exits[node][0] < best_cost:
+                best_cost = cost + exits[node][0]
+                best_polyline = self._unwind(previous, node, exits[node][1])
+            for neighbor, length, edge in self.adjacency[node]:
+                if cost + length < distance.get(neighbor, np.inf):
+                    distance[neighbor] = cost + length
+                    previous[neighbor] = (node, edge)
+                    heapq.heappush(heap, (cost + length, neighbor))
+
+        if best_polyline is None:
+            raise ValueError("No path found from start to end.")
+        return best_polyline
+
+    def _unwind(self, previous, node, tail):
+        pieces = [tail]
+        while True:
+            parent, link = previous[node]
+            if parent is None:
+                pieces.append(link)
+                break
+            u, v, polyline, _ = self.edges[link]
+            pieces.append(polyline if v == node and u == parent else polyline[::-1])
+            node = parent
+        pieces.reverse()
+        # drop the joining pixel where consecutive pieces share it
+        joined = [pieces[0]]
+        for piece in pieces[1:]:
+            joined.append(piece[1:] if (piece[0] == joined[-1][-1]).all() else piece)
+        return np.concatenate(joined)
+
+    def solve(self, start, end, epsilon=2.0):
+        """
+        Waypoints from start to end in the same (row, col) format as find_solution_path,
+        ready for adjust_points_to_center. The skeleton polyline is reduced with
+        cv2.approxPolyDP using `epsilon` pixels of tolerance.
+        """
+        key = (int(start[0]), int(start[1]), int(end[0]), int(end[1]), epsilon)
+        if key in self.queries:
+            return self.queries[key]
+
+        head = self.attach(start)
+        tail = self.attach(end)
+        middle = self.shortest_polyline(head[-1], tail[-1])
+        pixels = np.concatenate((np.array(head[:-1], dtype=np.int32).reshape(-1, 2),
+                                 middle,
+                                 np.array(tail[::-1][1:], dtype=np.int32).reshape(-1, 2)))
+
+        # approxPolyDP works on (x, y) points
+        approx = cv2.approxPolyDP(pixels[:, ::-1].reshape(-1, 1, 2).copy(), epsilon, False)
+        waypoints = [(int(y), int(x)) for x, y in approx.reshape(-1, 2)]
+        if waypoints[-1] != (key[2], key[3]):
+            waypoints.append((key[2], key[3]))
+
+        self.queries[key] = waypoints
+        return waypoints
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+# Number of mazes whose graphs, fields and clearance maps are kept in memory. A
+# camera loop sees a new maze every frame, so the caches drop the oldest ones
+CACHED_MAZES = 8
+
+
+class MazeCache(object):
+    """
+    Per-maze structures (graphs, distance fields, clearance maps) by key, like the
+    tile cache of tiled_maze.TiledMaze: the least recently used entry is dropped
+    once there are more than `size`.
+    """
+
+    def __init__(self, size=CACHED_MAZES):
+        self.size = size
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, build):
+        """
+        The entry of key, calling build() to make it the first time.
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        value = build()
+        self.entries[key] = value
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self.entries.clear()
+
+
+_graph_cache = MazeCache()
+
+
+def maze_key(maze_map):
+    """
+    Identify a maze by its shape and a hash of its pixels. Callers that already know
+    which maze they hold (a frame number, a generation counter) can pass their own
+    key to the get_* functions instead and skip hashing the pixels.
+    """
+    return maze_map.shape, hashlib.sha1(memoryview(np.ascontiguousarray(maze_map)).cast("B")).hexdigest()
+
+
+def get_skeleton_graph(maze_map, key=None):
+    """
+    Return the SkeletonGraph of maze_map, building it only the first time a maze is seen.
+    """
+    return _graph_cache.get(maze_key(maze_map) if key is None else key, lambda: SkeletonGraph(maze_map))
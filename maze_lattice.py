@@ -0,0 +1,196 @@
+from collections import deque
+import numpy as np
+
+# Wall bits of a cell in MazeLattice.walls
+NORTH, EAST, SOUTH, WEST = 1, 2, 4, 8
+
+# (row, col) step and the wall bit that blocks it
+CELL_MOVES = [(-1, 0, NORTH), (1, 0, SOUTH), (0, -1, WEST), (0, 1, EAST)]
+
+
+def profile_pitch(profile, min_pitch=8, min_score=0.3):
+    """
+    Period of a wall projection profile from its autocorrelation, or None if the
+    profile is not clearly periodic. The smallest lag whose correlation is close to
+    the best one wins, so multiples of the pitch are not picked by mistake.
+    """
+    n = len(profile)
+    x = profile - profile.mean()
+    if not x.any():
+        return None
+    spectrum = np.fft.rfft(x, 2 * n)
+    ac = np.fft.irfft(spectrum * np.conj(spectrum))[:n]
+    # the biased estimate fades with the lag, which keeps noisy long lags from winning
+    ac = ac / ac[0]
+
+    lags = np.arange(min_pitch, n // 2)
+    if len(lags) == 0:
+        return None
+    values = ac[lags]
+    peaks = (values[1:-1] >= values[:-2]) & (values[1:-1] >= values[2:])
+    peak_lags = lags[1:-1][peaks]
+    peak_values = values[1:-1][peaks]
+    if len(peak_lags) == 0 or peak_values.max() < min_score:
+        return None
+    return int(peak_lags[np.argmax(peak_values >= 0.8 * peak_values.max())])
+
+
+def fit_lines(profile, pitch):
+    """
+    Locate the wall lines of a profile with a coarse pitch and return (origin, pitch)
+    refined by a least-squares fit of the line centroids.
+    """
+    n = len(profile)
+    # phase that puts the most wall on the comb of lines
+    phase = int(np.argmax([profile[offset::pitch].mean() for offset in range(pitch)]))
+
+    half = max(1, pitch // 4)
+    indices, centers = [], []
+    for k, guess in enumerate(range(phase, n, pitch)):
+        lo, hi = max(guess - half, 0), min(guess + half + 1, n)
+        weights = profile[lo:hi] - profile[lo:hi].min()
+        if weights.sum() == 0:
+            continue
+        indices.append(k)
+        centers.append(np.dot(np.arange(lo, hi), weights) / weights.sum())
+    if len(indices) < 2:
+        return float(phase), float(pitch)
+    slope, intercept = np.polyfit(indices, centers, 1)
+    return float(intercept), float(slope)
+
+
+class MazeLattice(object):
+    """
+    Regular block grid of a maze: wall lines at origin + k * pitch on both axes and a
+    cells x cells matrix of NORTH/EAST/SOUTH/WEST wall bits.
+    """
+
+    def __init__(self, origin, pitch, walls):
+        self.origin = origin  # (row, col) of the first wall line centres
+        self.pitch = pitch  # (row, col) distance between wall lines in pixels
+        self.walls = walls
+
+    @property
+    def shape(self):
+        return self.walls.shape
+
+    def cell_of(self, point):
+        """
+        Cell (i, j) containing a pixel, clipped to the lattice.
+        """
+        return tuple(int(np.clip(np.floor((point[axis] - self.origin[axis]) / self.pitch[axis]),
+                                 0, self.walls.shape[axis] - 1)) for axis in (0, 1))
+
+    def center_of(self, cell):
+        """
+        Pixel (row, col) at the centre of a cell.
+        """
+        return tuple(int(round(self.origin[axis] + (cell[axis] + 0.5) * self.pitch[axis])) for axis in (0, 1))
+
+    def solve_cells(self, start_cell, end_cell):
+        """
+        BFS on the cell matrix, returns the list of cells from start_cell to end_cell or None.
+        """
+        rows, cols = self.walls.shape
+        prev = {start_cell: None}
+        queue = deque([start_cell])
+        while queue:
+            cell = queue.popleft()
+            if cell == end_cell:
+                path = []
+                while cell is not None:
+                    path.append(cell)
+                    cell = prev[cell]
+                return path[::-1]
+            for dr, dc, bit in CELL_MOVES:
+                nxt = (cell[0] + dr, cell[1] + dc)
+                if 0 <= nxt[0] < rows and 0 <= nxt[1] < cols and not self.walls[cell] & bit and nxt not in prev:
+                    prev[nxt] = cell
+                    queue.append(nxt)
+        return None
+
+    def solve(self, start, end):
+        """
+        Centred, axis-aligned waypoints from start to end in (row, col) pixels.
+
+        start and end (entrance and exit on the image border) are moved along the
+        border onto the centre line of their cell, every other waypoint is the centre
+        of a cell where the path turns.
+        """
+        start_cell, end_cell = self.cell_of(start), self.cell_of(end)
+        cells = self.solve_cells(start_cell, end_cell)
+        if cells is None:
+            raise ValueError("No path found from start to end.")
+
+        points = [self.align(start, start_cell)] + [self.center_of(cell) for cell in cells] + [self.align(end, end_cell)]
+        waypoints = [points[0]]
+        for prev, current, nxt in zip(points[:-2], points[1:-1], points[2:]):
+            straight = (prev[0] == current[0] == nxt[0]) or (prev[1] == current[1] == nxt[1])
+            if not straight and current != waypoints[-1]:
+                waypoints.append(current)
+        waypoints.append(points[-1])
+        return waypoints
+
+    def align(self, point, cell):
+        """
+        Slide a border point onto the centre line of its cell, keeping it on the border.
+        """
+        center = self.center_of(cell)
+        if abs(point[0] - center[0]) <= abs(point[1] - center[1]):
+            return (center[0], int(point[1]))
+        return (int(point[0]), center[1])
+
+
+def detect_lattice(binary_img, min_pitch=8, min_score=0.3, wall_fraction=0.5):
+    """
+    Infer the block grid of a thresholded maze image (255 = free, 0 = wall).
+
+    The pitch of each axis comes from the autocorrelation of the wall projection
+    profile, the origin from a fit of the wall line centres. Each cell side is then
+    probed along its wall line and counts as a wall when more than `wall_fraction`
+    of its middle half is wall. Returns a MazeLattice, or None if no regular grid
+    is found.
+    """
+    wall = (binary_img == 0)
+    origin, pitch = [], []
+    for axis in (0, 1):
+        profile = wall.view(np.uint8).sum(axis=1 - axis, dtype=np.int32) / wall.shape[1 - axis]
+        coarse = profile_pitch(profile, min_pitch, min_score)
+        if coarse is None:
+            return None
+        o, p = fit_lines(profile, coarse)
+        origin.append(o)
+        pitch.append(p)
+
+    # wall line positions that lie inside the image
+    lines, first = [], []
+    for axis in (0, 1):
+        k = np.arange(int(np.ceil(-origin[axis] / pitch[axis])), int((wall.shape[axis] - 1 - origin[axis]) / pitch[axis]) + 1)
+        lines.append(np.round(origin[axis] + k * pitch[axis]).astype(int))
+        first.append(origin[axis] + k[0] * pitch[axis])
+    row_lines, col_lines = lines
+    rows, cols = len(row_lines) - 1, len(col_lines) - 1
+    if rows < 1 or cols < 1:
+        return None
+
+    # prefix sums along the wall lines only give every probed segment in O(1)
+    along_rows = np.pad(np.cumsum(wall[row_lines], axis=1, dtype=np.int32), ((0, 0), (1, 0)))
+    along_cols = np.pad(np.cumsum(wall[:, col_lines], axis=0, dtype=np.int32), ((1, 0), (0, 0)))
+
+    def middle(lines):
+        quarter = np.diff(lines) // 4
+        return lines[:-1] + quarter, lines[1:] - quarter
+
+    c0, c1 = middle(col_lines)
+    r0, r1 = middle(row_lines)
+    horizontal = (along_rows[:, c1] - along_rows[:, c0]) / (c1 - c0) > wall_fraction
+    vertical = (along_cols[r1] - along_cols[r0]) / (r1 - r0)[:, None] > wall_fraction
+
+    walls = np.zeros((rows, cols), dtype=np.uint8)
+    walls |= np.where(horizontal[:-1], NORTH, 0).astype(np.uint8)
+    walls |= np.where(horizontal[1:], SOUTH, 0).astype(np.uint8)
+    walls |= np.where(vertical[:, :-1], WEST, 0).astype(np.uint8)
+    walls |= np.where(vertical[:, 1:], EAST, 0).astype(np.uint8)
+
+    # the lattice origin is the first wall line inside the image
+    return MazeLattice(tuple(first), tuple(pitch), walls)
@@ -0,0 +1,119 @@
+import time
+import numpy as np
+
+
+def pocket_mask(free, protected):
+    """
+    Pixels of every pocket closed towards the top in a boolean map `free`, found for
+    the whole image at once. A pocket is a maximal run of free pixels in a row whose
+    row above is all wall and whose row below is all free (or all wall, then the run
+    is cut off anyway). Its ends are walls by construction, so it is closed on three
+    sides and can only be entered from below, where a straight free segment gives the
+    same path length. Filling it never disconnects or lengthens a path.
+
+    A pocket on top of a straight corridor (runs with the same span stacked below
+    it) is returned with the whole corridor, down to the last run that is still a
+    pocket once the ones above it are filled, so a straight dead end goes in one
+    call. Runs holding a `protected` pixel, and the corridor below them, are kept.
+    """
+    height, width = free.shape
+    # a wall column on the right, so that no run continues on the next row
+    padded = np.zeros((height, width + 1), dtype=bool)
+    padded[:, :width] = free
+    flat = padded.reshape(-1)
+    starts = flat.copy()
+    starts[1:] &= ~flat[:-1]
+    ids = np.cumsum(starts) - 1
+    pixels = np.flatnonzero(flat)
+    if len(pixels) == 0:
+        return np.zeros(free.shape, dtype=bool)
+    run = ids[pixels]
+    row, col = np.divmod(pixels, width + 1)
+
+    # free pixels above and below each run, shifted slices of the padded map
+    above = np.zeros_like(padded)
+    above[1:] = padded[:-1]
+    below = np.zeros_like(padded)
+    below[:-1] = padded[1:]
+    length = np.bincount(run)
+    open_above = np.bincount(run, weights=above.reshape(-1)[pixels])
+    free_below = np.bincount(run, weights=below.reshape(-1)[pixels])
+    kept = np.bincount(run, weights=protected[row, col]) > 0
+
+    # the run right below with the same span continues a straight corridor
+    first = pixels[starts[pixels]]
+    count = len(length)
+    below_first = first + width + 1
+    below_first = np.where(below_first < flat.size, below_first, first)
+    same = (below_first != first) & starts[below_first] & (free_below == length)
+    same[same] = length[ids[below_first[same]]] == length[same]
+    previous = np.full(count, -1, dtype=np.int64)
+    previous[ids[below_first[same]]] = np.flatnonzero(same)
+
+    # pointer jumping: the top run of every corridor and the depth of each run in it
+    head = np.where(previous >= 0, previous, np.arange(count))
+    depth = (previous >= 0).astype(np.int64)
+    while True:
+        jump = head[head]
+        if np.array_equal(jump, head):
+            break
+        depth += depth[head]
+        head = jump
+    first_kept = np.full(count, np.iinfo(np.int64).max)
+    np.minimum.at(first_kept, head[kept], depth[kept])
+
+    # inside a corridor the run below is all free, its last run needs the pocket rule
+    closed_below = (free_below == length) | (free_below == 0)
+    fill = (open_above[head] == 0) & (depth < first_kept[head]) & (same | closed_below)
+    return fill[ids].reshape(height, width + 1)[:, :width] & free
+
+
+def fill_dead_ends(maze_map, keep=(), stats=None):
+    """
+    Dead-end filling of a binary maze map (1 = free): pockets closed on three sides
+    are filled until nothing changes, for the whole image in each of the four
+    directions per round. In a maze with one pixel wide corridors a pocket is a free
+    pixel with three blocked 4-neighbours; in wide corridors it is a whole row or
+    column closing a dead end, so dead ends are filled from their tip back to the
+    junction, one straight stretch per round. For a perfect maze only the corridor
+    from entrance to exit is left.
+
+    Pixels listed in `keep` (entrance and exit) are never filled. Returns the reduced
+    map; if a `stats` dict is given it gets the removed fraction of the free pixels
+    under "removed", the number of rounds and the time in seconds.
+    """
+    t0 = time.perf_counter()
+    full = maze_map == 1
+    protected = np.zeros(full.shape, dtype=bool)
+    for point in keep:
+        protected[point] = True
+
+    # Runs of identical rows and of identical columns are filled alike, so each is
+    # merged into one first and every round runs on the much smaller merged map
+    rows = np.ones(full.shape[0], dtype=bool)
+    rows[1:] = (full[1:] != full[:-1]).any(axis=1) | protected[1:].any(axis=1) | protected[:-1].any(axis=1)
+    cols = np.ones(full.shape[1], dtype=bool)
+    cols[1:] = (full[:, 1:] != full[:, :-1]).any(axis=0) | protected[:, 1:].any(axis=0) | protected[:, :-1].any(axis=0)
+    free = full[rows][:, cols]
+    protected = protected[rows][:, cols]
+
+    # the four directions as views, the pocket's closed side is at the top
+    views = [lambda a: a, lambda a: a[::-1], lambda a: a.T, lambda a: a.T[::-1]]
+    rounds = 0
+    changed = True
+    while changed:
+        rounds += 1
+        changed = False
+        for view in views:
+            filled = pocket_mask(np.ascontiguousarray(view(free)), np.ascontiguousarray(view(protected)))
+            if filled.any():
+                view(free)[filled] = False
+                changed = True
+
+    reduced = free[np.cumsum(rows) - 1][:, np.cumsum(cols) - 1].astype(np.uint8)
+    if stats is not None:
+        total = int(np.count_nonzero(maze_map == 1))
+        stats["removed"] = (total - int(np.count_nonzero(reduced))) / max(total, 1)
+        stats["rounds"] = rounds
+        stats["seconds"] = time.perf_counter() - t0
+    return reduced
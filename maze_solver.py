@@ -1,13 +1,21 @@
+import sys
 import time
 import cv2
 import numpy as np
 import threading
-import colorsys
 import savePointsCSV
 import getRobotCoordinates
+import grid_search
+import fast_kernels
+import frame_source
+import distance_field
+import incremental_planner
+import any_angle
 
 
 class Point(object):
+    # Fixed attributes and a hash, so points are small and can be used in sets and as dict keys
+    __slots__ = ("x", "y")
 
     def __init__(self, x=0, y=0):
         self.x = x
@@ -19,10 +27,27 @@ class Point(object):
     def __eq__(self, other):
         return self.x == other.x and self.y == other.y
 
+    def __hash__(self):
+        return hash((self.x, self.y))
+
+    def __repr__(self):
+        return f"Point({self.x}, {self.y})"
+
 rw = 2
 p = 0
 start = Point()
 end = Point()
+wall = None
+planner = None
+# Click markers and the last path, drawn only on the display copy of img
+markers = []
+pathPoints = []
+# The last path sent to the robot, None before the first search
+solvedPath = None
+# Counts the images the maze was read from, the key of its cached distance field
+mapGeneration = 0
+wallGeneration = -1
+mazeMap = None
 
 dir4 = [Point(0, -1), Point(0, 1), Point(1, 0), Point(-1, 0)]
 
@@ -46,8 +71,11 @@ def getCountOfPoints(ls):
     return result
 
 def getInterPolationPoints(path, pathArrayWithCount):
-    global img
+    global img, wall
 
+    # Walls of the image, built once by BFS instead of reading three channels per probe
+    if wall is None:
+        wall = grid_search.wall_mask(img)
     interpolationPoints = [path[0]]
     count = 0
 
@@ -59,7 +87,7 @@ def getInterPolationPoints(path, pathArrayWithCount):
         
         if pointX == -1 and pointY == 0:
             # Moving left
-            if img[path[count].y][path[count].x-1][0] != 0 or img[path[count].y][path[count].x-1][1] != 0 or img[path[count].y][path[count].x-1][2] != 0:
+            if not wall[path[count].y, path[count].x - 1]:
                 # print("-----No Wall Found when moving left")
                 interpolationPoints.append(Point(path[count].x - 25, interpolationPoints[-1].y))
             else:
@@ -68,7 +96,7 @@ def getInterPolationPoints(path, pathArrayWithCount):
 
         elif pointX == 1 and pointY == 0:
             # Moving right
-            if img[path[count].y][path[count].x+1][0] != 0 or img[path[count].y][path[count].x+1][1] != 0 or img[path[count].y][path[count].x+1][2] != 0:
+            if not wall[path[count].y, path[count].x + 1]:
                 # print("-----No Wall Found when moving right")
                 interpolationPoints.append(Point(path[count].x + 25, interpolationPoints[-1].y))
 
@@ -78,7 +106,7 @@ def getInterPolationPoints(path, pathArrayWithCount):
 
         elif pointX == 0 and pointY == -1:
             # Moving up
-            if img[path[count].y-1][path[count].x][0] != 0 or img[path[count].y-1][path[count].x][1] != 0 or img[path[count].y-1][path[count].x][2] != 0:
+            if not wall[path[count].y - 1, path[count].x]:
                 # print("-----No Wall Found when moving up")
                 interpolationPoints.append(Point(interpolationPoints[-1].x, path[count].y - 25))
 
@@ -88,7 +116,7 @@ def getInterPolationPoints(path, pathArrayWithCount):
 
         elif pointX == 0 and pointY == 1:
             # Moving down
-            if img[path[count].y+1][path[count].x][0] != 0 or img[path[count].y+1][path[count].x][1] != 0 or img[path[count].y+1][path[count].x][2] != 0:
+            if not wall[path[count].y + 1, path[count].x]:
                 # print("-----No Wall Found when moving down")
                 interpolationPoints.append(Point(interpolationPoints[-1].x, path[count].y + 25))
             else:
@@ -134,49 +162,98 @@ def centeredPath(path):
 
     return path
 
-def BFS(s, e):
-
-    global img, h, w
-    const = 10000
-
-    found = False
-    q = []
-    v = [[0 for j in range(w)] for i in range(h)]
-    parent = [[Point() for j in range(w)] for i in range(h)]
-
-    q.append(s)
-    v[s.y][s.x] = 1
-    while len(q) > 0:
-        p = q.pop(0)
-        for d in dir4:
-            cell = p + d
-            if (cell.x >= 0 and cell.x < w and cell.y >= 0 and cell.y < h and v[cell.y][cell.x] == 0 and
-                    (img[cell.y][cell.x][0] != 0 or img[cell.y][cell.x][1] != 0 or img[cell.y][cell.x][2] != 0)):
-                q.append(cell)
-                v[cell.y][cell.x] = v[p.y][p.x] + 1  # Later
-
-                # img[cell.y][cell.x] = list(reversed(
-                #     [i * 255 for i in colorsys.hsv_to_rgb(v[cell.y][cell.x] / const, 1, 1)])
-                # )
-                parent[cell.y][cell.x] = p
-                if cell == e:
-                    found = True
-                    del q[:]
-                    break
-
-    path = []
-    if found:
-        p = e
-        while p != s:
-            path.append(p)
-            p = parent[p.y][p.x]
-        path.append(p)
-        path.reverse()
-        centeredPath(path)
-
-        for i, j in zip(path[:-1], path[1:]):
-            cv2.line(img, (i.x, i.y), (j.x, j.y), (255, 255, 0), 1)
-        cv2.imshow("Image path of BFS", img)
+def anyAnglePath(path):
+    # Straight segments at any angle: every waypoint goes to the robot as it is, no cardinal interpolation
+    robotCoordinates = [getRobotCoordinates.getRobotCoordinates(p.x, p.y) for p in path]
+    print("Any-angle robot coordinates = ", [(p[0], p[1]) for p in robotCoordinates])
+
+    savePointsCSV.savePointsInCSV(robotCoordinates)
+
+    imageWithLine = img.copy()
+    for i, j in zip(path[:-1], path[1:]):
+        cv2.line(imageWithLine, (i.x, i.y), (j.x, j.y), (0, 255, 0), 1)
+    cv2.imshow('image with line', imageWithLine)
+
+    return path
+
+def incrementalPath(maze_map, s, e, stats=None):
+    global planner
+
+    # A new planner only for the first call or a new end, after that the start moves and the map is diffed
+    if planner is None or planner.goal != e[0] * w + e[1] or planner.shape != maze_map.shape:
+        planner = incremental_planner.IncrementalPlanner(maze_map, s, e)
+        return planner.path(stats)
+    planner.move_start(s)
+    return planner.update(maze_map, stats)
+
+def displayImage():
+    # The path and the click markers go on a copy, img stays the maze the search reads
+    display = img.copy()
+    for i, j in zip(pathPoints[:-1], pathPoints[1:]):
+        cv2.line(display, (i.x, i.y), (j.x, j.y), (255, 255, 0), 1)
+    for point, color in markers:
+        cv2.rectangle(display, (point.x - rw, point.y - rw),
+                      (point.x + rw, point.y + rw), color, -1)
+    return display
+
+def BFS(s, e, method="bfs"):
+
+    global img, h, w, wall, mazeMap, wallGeneration, pathPoints, solvedPath
+
+    # Wall mask of the image as the search sees it, also used by the centering pass, built once per image
+    if wallGeneration != mapGeneration:
+        wall = grid_search.wall_mask(img)
+        mazeMap = (~wall).view(np.uint8)
+        wallGeneration = mapGeneration
+    maze_map = mazeMap
+
+    if method == "bfs":
+        # Queue BFS on the occupancy map with array queue and parents, in dir4 order and the first parent
+        # wins: one compiled loop, or level by level in NumPy without Numba
+        bfsParents = fast_kernels.bfs_parents if fast_kernels.COMPILED else grid_search.bfs_parents
+        startIndex, endIndex = s.y * w + s.x, e.y * w + e.x
+        parent, _ = bfsParents(maze_map.reshape(-1), h, w, startIndex, endIndex,
+                               np.array([d.y for d in dir4]), np.array([d.x for d in dir4]), False)
+        found = parent[endIndex] != -1
+        cells = grid_search.reconstruct_path(parent, startIndex, endIndex, w) if found else []
+        path = [Point(x, y) for y, x in cells]
+    else:
+        if method == "theta":
+            # Lazy Theta* waypoints joined by straight lines at any angle
+            cells = any_angle.any_angle_search(maze_map, (s.y, s.x), (e.y, e.x))
+        elif method == "field":
+            # Walk down the distance field of e, flooded only the first time this maze and end are seen
+            field = distance_field.get_distance_field(maze_map, (e.y, e.x), key=("image", mapGeneration))
+            cells = field.path_from((s.y, s.x))
+        elif method == "incremental":
+            # D* Lite kept between calls, a new frame or start only repairs what changed
+            stats = {}
+            cells = incrementalPath(maze_map, (s.y, s.x), (e.y, e.x), stats)
+            print(f"{method} expanded {stats['expanded']} nodes in total")
+        else:
+            # A* or jump point search on a single-channel occupancy map, see grid_search
+            stats = {}
+            cells = grid_search.search(maze_map, (s.y, s.x), (e.y, e.x), method=method, stats=stats)
+            print(f"{method} expanded {stats['expanded']} nodes")
+        found = cells is not None
+        path = [Point(x, y) for y, x in cells] if found else []
+
+    # a click on the end itself gives a single point, with no move to post-process
+    if not found or len(path) < 2:
+        path = []
+    # The live feed solves every frame, the CSV is only rewritten and the coordinates printed for a new path
+    if path == solvedPath:
+        return
+    solvedPath = path
+    pathPoints = path
+
+    if path:
+        if method == "theta":
+            anyAnglePath(path)
+        else:
+            centeredPath(path)
+
+        cv2.imshow("Image path of BFS", displayImage())
         print("Path Found")
     else:
         print("Path Not Found")
@@ -187,24 +264,28 @@ def mouse_event(event, pX, pY, flags, param):
 
     if event == cv2.EVENT_LBUTTONUP:
         if p == 0:
-            cv2.rectangle(img, (pX - rw, pY - rw),
-                          (pX + rw, pY + rw), (0, 0, 255), -1)
+            markers.append((Point(pX, pY), (0, 0, 255)))
             start = Point(pX, pY)
             print("start = ", start.x, start.y)
             p += 1
         elif p == 1:
-            cv2.rectangle(img, (pX - rw, pY - rw),
-                          (pX + rw, pY + rw), (0, 200, 50), -1)
+            markers.append((Point(pX, pY), (0, 200, 50)))
             end = Point(pX, pY)
             print("end = ", end.x, end.y)
             p += 1
+        else:
+            # every further click is a new start towards the same end
+            markers.append((Point(pX, pY), (0, 0, 255)))
+            start = Point(pX, pY)
+            print("start = ", start.x, start.y)
+            p += 1
 
 def disp():
     global img
     cv2.imshow("Image", img)
     cv2.setMouseCallback('Image', mouse_event)
     while True:
-        cv2.imshow("Image", img)
+        cv2.imshow("Image", displayImage())
         key = cv2.waitKey(1) & 0xFF
         if key == ord("q"):
             cv2.destroyAllWindows()
@@ -218,9 +299,22 @@ def disp():
 
         #     break
 
+def captureImage(image):
+    # Threshold, scale to 640 px wide and blur a grayscale capture into the image the search reads
+    _, image = cv2.threshold(image, 120, 255, cv2.THRESH_BINARY)
+    ratio = 640 / image.shape[1]
+    dim = (640, int(image.shape[0] * ratio))
+    image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    image = cv2.GaussianBlur(image,(5,5),0)
+    return cv2.resize(image, dim, interpolation=cv2.INTER_LINEAR)
+
+# Opened once and read on a background thread, the loop only takes the newest frame
+camera = frame_source.get_frame_source(1)
 while True:
-    cap = cv2.VideoCapture(1)
-    ret, frame = cap.read()
+    ret, frame = camera.read()
+    if not ret:
+        print("Failed to capture frame.")
+        break
     cv2.imshow('ImageFrame', frame)
     key = cv2.waitKey(1) & 0xFF
     if key == ord('c'):
@@ -228,16 +322,19 @@ while True:
         break
     elif key == ord('q'):
         break
-        
+
 # image = cv2.imread("images/maze.jpg", cv2.IMREAD_GRAYSCALE)
-_, image = cv2.threshold(image, 120, 255, cv2.THRESH_BINARY)
-ratio = 640 / image.shape[1]
-dim = (640, int(image.shape[0] * ratio))
-image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
-image = cv2.GaussianBlur(image,(5,5),0)
-img = cv2.resize(image, dim, interpolation=cv2.INTER_LINEAR)
+img = captureImage(image)
 h, w = img.shape[:2]
 
+# With --live, keep solving on the live feed after the capture: every new frame and every new start is repaired
+# by the D* Lite planner from what changed. Without it the capture stays and clicks are answered from the distance field
+liveFeed = "--live" in sys.argv[1:]
+searchMethod = "incremental" if liveFeed else "field"
+if not liveFeed:
+    print(f"Camera: {camera.summary()}")
+    camera.release()
+
 print("Select start and end points : ")
 
 t = threading.Thread(target=disp, args=())
@@ -247,7 +344,27 @@ t.start()
 while p < 2:
     pass
 
-BFS(start, end)
+BFS(start, end, method=searchMethod)
+
+# Click more start points to re-solve the same maze
+print("Select more start points, q to quit : ")
+solved = p
+while t.is_alive():
+    newFrame = False
+    if liveFeed:
+        ret, frame = camera.read(timeout=0.1)
+        if ret:
+            img = captureImage(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+            mapGeneration += 1
+            newFrame = True
+    if newFrame or p > solved:
+        solved = p
+        BFS(start, end, method=searchMethod)
+    if not liveFeed:
+        time.sleep(0.01)
+if liveFeed:
+    print(f"Camera: {camera.summary()}")
+    camera.release()
 
 cv2.waitKey(0)
 cv2.destroyAllWindows()
\ No newline at end of file
@@ -2,109 +2,75 @@
 import cv2
 import numpy as np
 import matplotlib.pyplot as plt
-import math
 import os
+import grid_search
+import clearance_map
+import maze_reduction
+import solver_registry
+# moved to solution_path, still importable from here
+from solution_path import check_endpoints, check_connected, find_solution_path, turn_indices, simplify_path
+import segment_path
+import getRobotCoordinates
+import savePointsCSV
 
 #%%
+def border_openings(binary_img):
+    """
+    Centres of the runs of free (255) pixels on the border of a binary maze image.
+    """
+    free = binary_img == 255
+    return grid_search.perimeter_openings(free[0, :], free[:, -1], free[-1, :], free[:, 0])
+
 def detect_entrance_exit(binary_img):
-    # [Same as before]
-    top_border = np.where(binary_img[0, :] == 255)[0]
-    bottom_border = np.where(binary_img[-1, :] == 255)[0]
-    left_border = np.where(binary_img[:, 0] == 255)[0]
-    right_border = np.where(binary_img[:, -1] == 255)[0]
-
-    if len(top_border) > 0:
-        entrance = (0, top_border[0]+4)
-    elif len(left_border) > 0:
-        entrance = (left_border[0]+4, 0)
-    else:
+    """
+    Entrance and exit of a binary maze image (255 = free) among the centres of the
+    openings on its whole border: the entrance on the top or left border, the exit on
+    the bottom or right one. With more than one candidate on a side the closest
+    connected entrance and exit are chosen by one multi-source search over all of
+    them. Raises ValueError if there is no such pair.
+    """
+    entrances, exits = grid_search.split_openings(border_openings(binary_img), binary_img.shape)
+    if len(entrances) == 0:
         raise ValueError("Entrance not found.")
-
-    if len(bottom_border) > 0:
-        exit_point = (binary_img.shape[0] - 1, bottom_border[0]+4)
-    elif len(right_border) > 0:
-        exit_point = (right_border[0]+4, binary_img.shape[1] - 1)
-    else:
+    if len(exits) == 0:
         raise ValueError("Exit not found.")
+    if len(entrances) == 1 and len(exits) == 1:
+        return entrances[0], exits[0]
+
+    # entrances first, so the lower index of the pair is the entrance
+    points = entrances + exits
+    pair = grid_search.nearest_pair_search((binary_img == 255).astype(np.uint8), points,
+                                           groups=[0] * len(entrances) + [1] * len(exits))
+    if pair is None:
+        raise ValueError(f"None of the {len(entrances)} entrances is connected to one of the {len(exits)} exits.")
+    return points[min(pair[0], pair[1])], points[max(pair[0], pair[1])]
+
+def largest_feasible_clearance(clearance):
+    """
+    Largest min_clearance of a ClearanceMap at which the maze still has an entrance
+    and an exit on its border that are connected, or 0 if there is none.
+    """
+    def feasible(min_clearance):
+        adjusted_maze = 255 * clearance.maze_map(min_clearance)
+        try:
+            entrance, exit_point = detect_entrance_exit(adjusted_maze)
+        except ValueError:
+            return False
+        return clearance.connects(min_clearance, entrance, exit_point)
+
+    low, high = 0, clearance.max_clearance
+    while low < high:
+        middle = (low + high + 1) // 2
+        if feasible(middle):
+            low = middle
+        else:
+            high = middle - 1
+    return low
 
-    return entrance, exit_point
-
-def find_solution_path(maze_map, start, end):
-    # [Same as before, with cardinal directions]
-    queue = [start]
-    visited = set()
-    prev = {start: None}
-
-    found_end = False
-
-    while queue:
-        current = queue.pop(0)
-        if current in visited:
-            continue
-        visited.add(current)
-
-        if current == end:
-            found_end = True
-            break
-
-        for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            neighbor = (current[0] + dx, current[1] + dy)
-            if (
-                0 <= neighbor[0] < maze_map.shape[0]
-                and 0 <= neighbor[1] < maze_map.shape[1]
-                and maze_map[neighbor] == 1
-                and neighbor not in visited
-            ):
-                queue.append(neighbor)
-                prev[neighbor] = current
-
-    if not found_end:
-        raise ValueError("No path found from start to end.")
-
-    # Reconstruct the path
-    path = []
-    current = end
-    while current is not None:
-        path.append(current)
-        current = prev[current]
-    path.reverse()
-
-    # Simplify the path to include only significant points
-    simplified_path = [path[0]]  # Start with the entrance point
-    last_direction = None
-
-    # Define a threshold distance to ignore minor turns near the entrance
-    entrance_threshold = 5  # Adjust as needed based on maze scale
-
-    for i in range(1, len(path)):
-        prev_point = path[i - 1]
-        current_point = path[i]
-        # Compute the direction vector
-        direction = (current_point[0] - prev_point[0], current_point[1] - prev_point[1])
-
-        if last_direction is None:
-            last_direction = direction
-            continue
-
-        # Compute the angle between last direction and current direction
-        angle = math.degrees(math.atan2(direction[1], direction[0]) - math.atan2(last_direction[1], last_direction[0]))
-        angle = abs((angle + 180) % 360 - 180)  # Normalize angle to [0, 180]
-
-        # Check if the point is beyond the entrance threshold
-        distance_from_entrance = abs(current_point[0] - path[0][0]) + abs(current_point[1] - path[0][1])
-
-        # Consider it a turn if angle exceeds threshold and beyond entrance threshold
-        if angle > 10 and distance_from_entrance > entrance_threshold:
-            simplified_path.append(prev_point)
-            last_direction = direction
-
-    # Add the final point
-    simplified_path.append(path[-1])
-
-    return simplified_path
-
-def adjust_points_to_center(maze_map, points):
-    dist_transform = cv2.distanceTransform(maze_map, cv2.DIST_L2, 5)
+def adjust_points_to_center(maze_map, points, dist_transform=None):
+    # A clearance map computed for the capture can be passed in instead of a new transform
+    if dist_transform is None:
+        dist_transform = cv2.distanceTransform(maze_map, cv2.DIST_L2, 5)
     adjusted_points = []
     window_size = 15  # Adjust based on maze size and robot size
     half_window = window_size // 2
@@ -129,109 +95,48 @@ def adjust_points_to_center(maze_map, points):
 
     return adjusted_points
 
-def interpolate_points(start, end, threshold=3):
-    """
-    Generate intermediate points between start and end, handling diagonal movements
-    and filling all gaps. Uses a threshold to infer cardinal directions.
+def align_to_cardinal(adjusted_points):
     """
-    points = []
-    dx = abs(end[0] - start[0])  # Vertical difference
-    dy = abs(end[1] - start[1])  # Horizontal difference
-
-    # If already aligned, return cardinal points
-    if dx == 0 or dy == 0:
-        return interpolate_cardinal_points(start, end)
-
-    # Check if within the threshold to infer alignment
-    if dx <= threshold and dy > threshold:  # Approximate horizontal
-        mid_point = (start[0], end[1])  # Force alignment
-        return interpolate_cardinal_points(start, mid_point) + interpolate_cardinal_points(mid_point, end)
-    elif dy <= threshold and dx > threshold:  # Approximate vertical
-        mid_point = (end[0], start[1])  # Force alignment
-        return interpolate_cardinal_points(start, mid_point) + interpolate_cardinal_points(mid_point, end)
-
-    # For larger gaps, break into two steps
-    if dx > threshold and dy > threshold:
-        mid_point = (start[0], end[1])  # Break diagonally into cardinal moves
-        return interpolate_cardinal_points(start, mid_point) + interpolate_cardinal_points(mid_point, end)
-
-    # Log and raise an error if unresolvable
-    print(f"Cannot resolve movement between: Start={start}, End={end}")
-    raise ValueError(f"Invalid movement between {start} and {end}: Cannot interpolate.")    
-
-def interpolate_cardinal_points(start, end):
+    Snap each waypoint onto the row or column of the previous one so every segment
+    is horizontal or vertical.
     """
-    Generate points for strictly horizontal or vertical movements.
-    """
-    points = []
-    if start[0] == end[0]:  # Horizontal movement
-        step = 1 if start[1] < end[1] else -1
-        for y in range(start[1], end[1] + step, step):
-            points.append((start[0], y))
-    elif start[1] == end[1]:  # Vertical movement
-        step = 1 if start[0] < end[0] else -1
-        for x in range(start[0], end[0] + step, step):
-            points.append((x, start[1]))
-    return points
+    aligned_points = [adjusted_points[0]]
+    for i in range(1, len(adjusted_points) - 1):
+        prev_point = aligned_points[-1]
+        curr_point = adjusted_points[i]
+        next_point = adjusted_points[i + 1]
+
+        # Align curr_point to be either same row or same column as prev_point
+        if prev_point[0] == next_point[0]:  # Horizontal line
+            aligned_point = (prev_point[0], curr_point[1])
+        elif prev_point[1] == next_point[1]:  # Vertical line
+            aligned_point = (curr_point[0], prev_point[1])
+        else:
+            # Decide based on the majority direction
+            if abs(prev_point[0] - curr_point[0]) > abs(prev_point[1] - curr_point[1]):
+                aligned_point = (curr_point[0], prev_point[1])
+            else:
+                aligned_point = (prev_point[0], curr_point[1])
+        aligned_points.append(aligned_point)
+    aligned_points.append(adjusted_points[-1])  # Add the last point
+    return aligned_points
 
 def refine_path(path, threshold=3):
     """
     Refine the path to ensure all points are aligned along cardinal directions,
-    filling any gaps with intermediate points using a threshold.
+    closing any gaps with a corner point using a threshold. Returns the corners;
+    segment_path.SegmentPath.from_points(path).points() gives every pixel.
     """
-    refined_path = [path[0]]  # Start with the first point
-    for i in range(1, len(path)):
-        prev = refined_path[-1]
-        curr = path[i]
-        if prev[0] == curr[0] or prev[1] == curr[1]:  # Aligned
-            refined_path.append(curr)
-        else:  # Gap detected, interpolate points
-            interpolated = interpolate_points(prev, curr, threshold)
-            refined_path.extend(interpolated[1:])  # Skip the first point to avoid duplication
-    return refined_path
+    return segment_path.SegmentPath.from_points(path, threshold).waypoints()
 
 def save_path_instructions(path, file_append, robot_width=192):
     """
-    Generate movement instructions from the refined path, scaled to the robot's block size.
+    Generate movement instructions from the path (waypoints or a SegmentPath), scaled
+    to the robot's block size. The segments are used directly, no pixel is expanded.
     """
-    path = refine_path(path)  # Ensure path is refined
-    instructions = []
-    pixels_in_direction = 0  # Counter for pixels moved in the current direction
-    current_direction = None
-
-    for i in range(1, len(path)):
-        prev = path[i - 1]
-        curr = path[i]
-
-        # Determine the direction of movement
-        if curr[0] == prev[0]:  # Horizontal movement
-            new_direction = "Right" if curr[1] > prev[1] else "Left"
-        elif curr[1] == prev[1]:  # Vertical movement
-            new_direction = "Down" if curr[0] > prev[0] else "Up"
-        else:
-            raise ValueError(f"Invalid movement detected between {prev} and {curr}: Diagonal movement is not allowed.")
-
-        if current_direction is None:  # First step, initialize direction
-            current_direction = new_direction
-        elif new_direction == current_direction:  # Continue in the same direction
-            pixels_in_direction += abs(curr[0] - prev[0] + curr[1] - prev[1])
-        else:  # Direction change (turn detected)
-            # Add the "Go Straight" instruction scaled to the robot's width
-            blocks = max(1, pixels_in_direction // robot_width)  # Ensure at least 1 block
-            instructions.append(f"Go Straight {blocks} Block{'s' if blocks > 1 else ''}")
-
-            # Add the turn instruction
-            turn_direction = determine_turn(current_direction, new_direction)
-            instructions.append(f"Turn {turn_direction}")
-
-            # Reset for the new direction
-            current_direction = new_direction
-            pixels_in_direction = abs(curr[0] - prev[0] + curr[1] - prev[1])
-
-    # Add the final "Go Straight" instruction
-    if pixels_in_direction > 0:
-        blocks = max(1, pixels_in_direction // robot_width)
-        instructions.append(f"Go Straight {blocks} Block{'s' if blocks > 1 else ''}")
+    if not isinstance(path, segment_path.SegmentPath):
+        path = segment_path.SegmentPath.from_points(path)
+    instructions = path.instructions(robot_width)
 
     # Save instructions to a file
     file_save = f"./path_instructions_{file_append}.txt"
@@ -240,28 +145,6 @@ def save_path_instructions(path, file_append, robot_width=192):
 
     return instructions
 
-def determine_turn(prev_direction, new_direction):
-    """
-    Determine whether the turn is Left or Right based on the direction change.
-    """
-    turn_map = {
-        ("Up", "Right"): "Right",
-        ("Right", "Down"): "Right",
-        ("Down", "Left"): "Right",
-        ("Left", "Up"): "Right",
-        ("Up", "Left"): "Left",
-        ("Left", "Down"): "Left",
-        ("Down", "Right"): "Left",
-        ("Right", "Up"): "Left",
-    }
-
-    # Return the turn direction or log an error for unknown cases
-    if (prev_direction, new_direction) in turn_map:
-        return turn_map[(prev_direction, new_direction)]
-    else:
-        print(f"Unknown turn detected: from {prev_direction} to {new_direction}")
-        return "Unknown"
-
 #%%
 def main():
     # Load the maze image
@@ -281,18 +164,20 @@ def main():
     cv2.waitKey(0)
     cv2.destroyAllWindows()
 
-    # Dilate the walls to consider the robot's size
+    # Clearance of every free pixel to the walls, computed once per capture. Thresholding it
+    # gives the maze for any robot size without dilating the walls again
+    clearance = clearance_map.get_clearance_map(binary_img)
     robot_size =  35# Size of the robot in pixels
-    kernel_size = int(np.ceil(robot_size / 2))
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_size, kernel_size))
-    dilated_walls = cv2.dilate(255 - binary_img, kernel, iterations=1)
-    adjusted_maze = 255 - dilated_walls
+    min_clearance = clearance_map.clearance_for_robot(robot_size)
+    print(f"Clearance for the robot: {min_clearance} px, largest feasible: {largest_feasible_clearance(clearance)} px")
+    adjusted_maze = 255 * clearance.maze_map(min_clearance)
     
     cv2.imshow('Adjusted maze', adjusted_maze)
     cv2.waitKey(0)
     cv2.destroyAllWindows()
 
-    # Detect entrance and exit on the adjusted maze
+    # Detect entrance and exit on the adjusted maze, the closest connected pair of its border openings
+    print(f"Openings: {border_openings(adjusted_maze)}")
     entrance, exit_point = detect_entrance_exit(adjusted_maze)
     print(f"Entrance: {entrance}, Exit: {exit_point}")
 
@@ -304,49 +189,70 @@ def main():
     maze_map[exit_point] = 1
 
     # Find the solution path
+    # "auto" lets solver_registry pick the fastest solver from the maze statistics and the stored calibration,
+    # the lattice solver on a regular block grid, or any key of grid_search.SEARCH_METHODS, "pyramid",
+    # "skeleton", "centerline", "theta" or "visibility"
+    search_method = "auto"
+    search_stats = {}
+
+    # Optionally fill the dead ends first, in a perfect maze only the solution corridor is left to search
+    fill_dead_ends_first = False
+    search_map = maze_map
+    if fill_dead_ends_first:
+        reduction_stats = {}
+        search_map = maze_reduction.fill_dead_ends(maze_map, keep=(entrance, exit_point), stats=reduction_stats)
+        print(f"Dead-end filling removed {reduction_stats['removed']:.1%} of the free space "
+              f"in {reduction_stats['seconds'] * 1000:.0f} ms ({reduction_stats['rounds']} rounds)")
+
     try:
-        simplified_path = find_solution_path(maze_map, entrance, exit_point)
+        simplified_path = solver_registry.solve(search_map, entrance, exit_point, method=search_method,
+                                                binary_img=binary_img, stats=search_stats)
     except ValueError as e:
         print(e)
         return
+    search_method = search_stats["solver"]
+    print(f"Solver: {search_method}")
+    if "expanded" in search_stats:
+        print(f"{search_method} expanded {search_stats['expanded']} nodes")
+
+    # The lattice found by the registry, its pitch is the block size of the waypoints
+    lattice = search_stats.get("lattice")
+    if lattice is not None:
+        print(f"Lattice: {lattice.shape[0]}x{lattice.shape[1]} cells, pitch {lattice.pitch[0]:.1f}x{lattice.pitch[1]:.1f} px")
+
+    any_angle_points = False
+    if search_method in ("centerline", "theta", "visibility", "lattice"):
+        # The centre-line and lattice solvers return centred, axis-aligned waypoints, Theta* and the
+        # visibility graph straight segments at any angle
+        aligned_points = simplified_path
+        any_angle_points = search_method in ("theta", "visibility")
+    else:
+        # Adjust only the significant points (simplified path)
+        adjusted_points = adjust_points_to_center(maze_map, simplified_path, dist_transform=clearance.distance)
 
-    # Adjust only the significant points (simplified path)
-    adjusted_points = adjust_points_to_center(maze_map, simplified_path)
-
-    # Ensure adjusted points are aligned along cardinal directions
-    aligned_points = [adjusted_points[0]]
-    for i in range(1, len(adjusted_points) - 1):
-        prev_point = aligned_points[-1]
-        curr_point = adjusted_points[i]
-        next_point = adjusted_points[i + 1]
-
-        # Align curr_point to be either same row or same column as prev_point
-        if prev_point[0] == next_point[0]:  # Horizontal line
-            aligned_point = (prev_point[0], curr_point[1])
-        elif prev_point[1] == next_point[1]:  # Vertical line
-            aligned_point = (curr_point[0], prev_point[1])
-        else:
-            # Decide based on the majority direction
-            if abs(prev_point[0] - curr_point[0]) > abs(prev_point[1] - curr_point[1]):
-                aligned_point = (curr_point[0], prev_point[1])
-            else:
-                aligned_point = (prev_point[0], curr_point[1])
-        aligned_points.append(aligned_point)
-    aligned_points.append(adjusted_points[-1])  # Add the last point
+        # Ensure adjusted points are aligned along cardinal directions
+        aligned_points = align_to_cardinal(adjusted_points)
+    block_size = int(round(min(lattice.pitch))) if search_method == "lattice" else 192
 
     # Visualize the solution path
     solution_img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
 
-    # Draw the path as straight lines between aligned points
-    for i in range(len(aligned_points) - 1):
-        pt1 = (aligned_points[i][1], aligned_points[i][0])  # (x, y) format
-        pt2 = (aligned_points[i + 1][1], aligned_points[i + 1][0])
-        cv2.line(solution_img, pt1, pt2, (0, 0, 255), thickness=1)
+    if any_angle_points:
+        # Draw the path as straight lines between the waypoints (visibility waypoints are floats)
+        for i in range(len(aligned_points) - 1):
+            pt1 = (round(aligned_points[i][1]), round(aligned_points[i][0]))  # (x, y) format
+            pt2 = (round(aligned_points[i + 1][1]), round(aligned_points[i + 1][0]))
+            cv2.line(solution_img, pt1, pt2, (0, 0, 255), thickness=1)
+    else:
+        # Cardinal paths are kept as segments, one line per segment and no pixel list
+        segments = segment_path.SegmentPath.from_points(list(dict.fromkeys(aligned_points)))
+        segments.draw(solution_img, (0, 0, 255), thickness=1)
+        print(f"Path: {len(segments)} segments, {segments.pixel_count} px")
 
     # Draw the turn points
     for point in aligned_points[1:-1]:  # Exclude start and end
         x, y = point
-        cv2.circle(solution_img, (y, x), 1, (0, 255, 0), -1)  # Green circles at turns
+        cv2.circle(solution_img, (round(y), round(x)), 1, (0, 255, 0), -1)  # Green circles at turns
         print(f"x coordinate: {x}, y coordniate: {y}")
 
     # Draw entrance and exit points
@@ -356,7 +262,13 @@ def main():
 
     aligned_points = list(dict.fromkeys(aligned_points))
 
-    save_path_instructions(aligned_points[0:], file_append=img_name)
+    if any_angle_points:
+        # Diagonal segments cannot become cardinal instructions, hand the waypoints to the robot directly
+        robot_points = [getRobotCoordinates.getRobotCoordinates(y, x) for x, y in aligned_points]
+        print(f"Robot waypoints: {robot_points}")
+        savePointsCSV.savePointsInCSV(robot_points)
+    else:
+        save_path_instructions(segments, file_append=img_name, robot_width=block_size)
 
     # Show and save the solution image
     plt.imshow(solution_img)
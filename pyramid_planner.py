@@ -0,0 +1,111 @@
+import cv2
+import numpy as np
+import grid_search
+
+
+def pool_free(maze_map):
+    """
+    Halve maze_map (1 = free) by min-pooling over 2x2 blocks: a coarse cell is free
+    only when all four pixels are free, so a coarse path never crosses a wall.
+    """
+    height, width = maze_map.shape
+    padded = np.zeros((height + height % 2, width + width % 2), dtype=np.uint8)
+    padded[:height, :width] = maze_map == 1
+    return padded.reshape(padded.shape[0] // 2, 2, padded.shape[1] // 2, 2).min(axis=(1, 3))
+
+
+def connected(maze_map, start, end):
+    _, labels = cv2.connectedComponents(maze_map.astype(np.uint8), connectivity=4)
+    return labels[start] == labels[end]
+
+
+def build_pyramid(maze_map, start, end, levels=None, coarsest=256):
+    """
+    [maze_map, half, quarter, ...] with start and end kept open on every level.
+
+    Pooling stops after `levels` halvings, or when levels is None once the longest
+    side is at most `coarsest` pixels or one more halving would close the last
+    corridor between start and end, so thin corridors are never pooled away.
+    """
+    pyramid = [maze_map]
+    while levels is None or len(pyramid) <= levels:
+        if levels is None and max(pyramid[-1].shape) <= coarsest:
+            break
+        level = len(pyramid)
+        coarse = pool_free(pyramid[-1])
+        if min(coarse.shape) < 2:
+            break
+        coarse[start[0] >> level, start[1] >> level] = 1
+        coarse[end[0] >> level, end[1] >> level] = 1
+        if levels is None and not connected(coarse, (start[0] >> level, start[1] >> level),
+                                            (end[0] >> level, end[1] >> level)):
+            break
+        pyramid.append(coarse)
+    return pyramid
+
+
+def band_cells(path, coarse_shape, fine_map, band):
+    """
+    Sorted flat indices of the free pixels of fine_map that lie under the coarse path
+    dilated by `band` coarse cells.
+    """
+    mask = np.zeros(coarse_shape, dtype=np.uint8)
+    rows, cols = np.array(path).T
+    mask[rows, cols] = 1
+    mask = cv2.dilate(mask, np.ones((2 * band + 1, 2 * band + 1), np.uint8))
+    coarse_rows, coarse_cols = np.nonzero(mask)
+
+    # every coarse cell covers a 2x2 block of the finer level
+    fine_rows = (2 * coarse_rows[:, None] + np.array([0, 0, 1, 1])).reshape(-1)
+    fine_cols = (2 * coarse_cols[:, None] + np.array([0, 1, 0, 1])).reshape(-1)
+    height, width = fine_map.shape
+    inside = (fine_rows < height) & (fine_cols < width)
+    fine_rows, fine_cols = fine_rows[inside], fine_cols[inside]
+    free = fine_map[fine_rows, fine_cols] == 1
+    return np.sort(fine_rows[free].astype(np.int64) * width + fine_cols[free])
+
+
+def pyramid_search(maze_map, start, end, levels=None, band=4, stats=None):
+    """
+    Coarse-to-fine path planning on a min-pooled pyramid of maze_map.
+
+    The coarsest level is solved with a full BFS, then each finer level is searched
+    only inside a band of `band` coarse cells around the path found one level up, so
+    no full-resolution search state is ever allocated. If the coarse level has no
+    path, or the path cannot be refined inside its band, a full-resolution
+    bfs_search is run instead. Returns the full pixel path or None, like bfs_search;
+    `stats` gets the expanded cells of all levels, the level count and whether the
+    fallback ran.
+    """
+    start = (int(start[0]), int(start[1]))
+    end = (int(end[0]), int(end[1]))
+    # the entrance may sit on a pixel the caller did not mark free
+    if maze_map[start] != 1:
+        maze_map = maze_map.copy()
+        maze_map[start] = 1
+    pyramid = build_pyramid(maze_map, start, end, levels)
+
+    top = len(pyramid) - 1
+    level_stats = {}
+    path = grid_search.bfs_search(pyramid[top], (start[0] >> top, start[1] >> top),
+                                  (end[0] >> top, end[1] >> top), stats=level_stats)
+    expanded = level_stats.get("expanded", 0)
+
+    for level in range(top - 1, -1, -1):
+        if path is None:
+            break
+        cells = band_cells(path, pyramid[level + 1].shape, pyramid[level], band)
+        path = grid_search.sparse_bfs_search(cells, pyramid[level].shape, (start[0] >> level, start[1] >> level),
+                                             (end[0] >> level, end[1] >> level), stats=level_stats)
+        expanded += level_stats["expanded"]
+
+    fallback = path is None
+    if fallback:
+        path = grid_search.bfs_search(maze_map, start, end, stats=level_stats)
+        expanded += level_stats["expanded"]
+
+    if stats is not None:
+        stats["expanded"] = expanded
+        stats["levels"] = len(pyramid)
+        stats["fallback"] = fallback
+    return path
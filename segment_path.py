@@ -0,0 +1,144 @@
+import cv2
+import numpy as np
+import getRobotCoordinates
+
+# Unit (row, col) steps of the four cardinal directions and the names the instructions use
+DIRECTION_NAMES = {(-1, 0): "Up", (1, 0): "Down", (0, -1): "Left", (0, 1): "Right"}
+
+
+class SegmentPath(object):
+    """
+    Axis-aligned path stored as segments: the (row, col) start, the unit step and the
+    length in pixels of each, in three arrays. Consecutive segments never go in the
+    same direction, so their number is the number of turns plus one.
+
+    Instructions, drawing and robot coordinates are computed from the segments, the
+    pixels are only produced by pixels() when a caller really needs every one of them.
+    """
+
+    def __init__(self, origin, starts, steps, lengths):
+        self.origin = (int(origin[0]), int(origin[1]))
+        self.starts = np.asarray(starts, dtype=np.int64).reshape(-1, 2)
+        self.steps = np.asarray(steps, dtype=np.int64).reshape(-1, 2)
+        self.lengths = np.asarray(lengths, dtype=np.int64).reshape(-1)
+
+    @classmethod
+    def from_points(cls, points, threshold=3):
+        """
+        Segments through waypoints that are meant to be axis-aligned. A gap between
+        two waypoints that are not aligned is closed with a corner, like refine_path
+        did: horizontal first when the vertical offset is within `threshold`, vertical
+        first when the horizontal one is, horizontal first when both exceed it.
+        Raises ValueError when both offsets are within the threshold.
+        """
+        corners = [(int(points[0][0]), int(points[0][1]))]
+        for point in points[1:]:
+            previous, point = corners[-1], (int(point[0]), int(point[1]))
+            dx, dy = abs(point[0] - previous[0]), abs(point[1] - previous[1])
+            if dx != 0 and dy != 0:
+                if dx <= threshold and dy <= threshold:
+                    raise ValueError(f"Invalid movement between {previous} and {point}: Cannot interpolate.")
+                if dy <= threshold < dx:
+                    corners.append((point[0], previous[1]))
+                else:
+                    corners.append((previous[0], point[1]))
+            corners.append(point)
+
+        corners = np.array(corners, dtype=np.int64)
+        offsets = np.diff(corners, axis=0)
+        lengths = np.abs(offsets).sum(axis=1)
+        moving = lengths > 0
+        starts, offsets, lengths = corners[:-1][moving], offsets[moving], lengths[moving]
+        steps = np.sign(offsets)
+        # merge straight runs that were given as several waypoints
+        first = np.ones(len(steps), dtype=bool)
+        first[1:] = (steps[1:] != steps[:-1]).any(axis=1)
+        run = np.cumsum(first) - 1
+        return cls(corners[0], starts[first], steps[first], np.bincount(run, weights=lengths).astype(np.int64))
+
+    def __len__(self):
+        return len(self.lengths)
+
+    @property
+    def pixel_count(self):
+        return int(self.lengths.sum()) + 1
+
+    @property
+    def end(self):
+        if len(self) == 0:
+            return self.origin
+        row, col = self.starts[-1] + self.steps[-1] * self.lengths[-1]
+        return int(row), int(col)
+
+    def waypoints(self):
+        """
+        Start, corners and end as (row, col) tuples.
+        """
+        return [tuple(point) for point in self.starts.tolist()] + [self.end]
+
+    def directions(self):
+        """
+        Direction name ("Up", "Down", "Left", "Right") of every segment.
+        """
+        return [DIRECTION_NAMES[step] for step in map(tuple, self.steps.tolist())]
+
+    def pixels(self):
+        """
+        Every pixel of the path as an N x 2 array, built from the segments in one go.
+        """
+        total = int(self.lengths.sum())
+        segment = np.repeat(np.arange(len(self)), self.lengths)
+        distance = np.arange(1, total + 1) - np.repeat(np.cumsum(self.lengths) - self.lengths, self.lengths)
+        pixels = np.empty((total + 1, 2), dtype=np.int64)
+        pixels[0] = self.origin
+        pixels[1:] = self.starts[segment] + self.steps[segment] * distance[:, None]
+        return pixels
+
+    def points(self):
+        """
+        pixels() as a list of (row, col) tuples.
+        """
+        return [tuple(point) for point in self.pixels().tolist()]
+
+    def instructions(self, robot_width=192):
+        """
+        "Go Straight n Blocks" and "Turn Left/Right" instructions, one pair per segment,
+        with n the segment length in whole robot widths (at least 1).
+        """
+        turns = self.turns()
+        instructions = []
+        for k, blocks in enumerate(np.maximum(1, self.lengths // robot_width).tolist()):
+            if k > 0:
+                instructions.append(f"Turn {turns[k - 1]}")
+            instructions.append(f"Go Straight {blocks} Block{'s' if blocks > 1 else ''}")
+        return instructions
+
+    def turns(self):
+        """
+        "Left" or "Right" for the turn between every two segments, from the sign of the
+        cross product of their steps (rows grow downwards).
+        """
+        steps = self.steps
+        cross = steps[:-1, 0] * steps[1:, 1] - steps[:-1, 1] * steps[1:, 0]
+        turns = np.where(cross < 0, "Right", "Left").tolist()
+        directions = self.directions()
+        for k in np.flatnonzero(cross == 0).tolist():
+            print(f"Unknown turn detected: from {directions[k]} to {directions[k + 1]}")
+            turns[k] = "Unknown"
+        return turns
+
+    def draw(self, img, color=(0, 0, 255), thickness=1):
+        """
+        Draw every segment as one line on img (in place) and return it.
+        """
+        waypoints = self.waypoints()
+        for (row1, col1), (row2, col2) in zip(waypoints[:-1], waypoints[1:]):
+            cv2.line(img, (col1, row1), (col2, row2), color, thickness=thickness)
+        return img
+
+    def robot_points(self):
+        """
+        Robot coordinates of the waypoints. The camera to robot mapping is affine, so
+        the straight segments between them stay straight and no pixel is mapped.
+        """
+        return [getRobotCoordinates.getRobotCoordinates(col, row) for row, col in self.waypoints()]
@@ -0,0 +1,174 @@
+import math
+import cv2
+import numpy as np
+import grid_search
+import fast_kernels
+import maze_graph
+import clearance_map
+import any_angle
+import visibility_graph
+import centerline_planner
+import pyramid_planner
+
+
+def check_endpoints(maze_map, start, end):
+    """
+    Raise ValueError when start or end is on a wall of maze_map (1 = free).
+    """
+    if maze_map[start] != 1 or maze_map[end] != 1:
+        raise ValueError(f"No path found from start to end: start {tuple(map(int, start))} or "
+                         f"end {tuple(map(int, end))} is on a wall.")
+
+
+def check_connected(maze_map, start, end):
+    """
+    Flood the 4-connected free region of start into a uint8 mask, one byte per pixel
+    that is freed again on return, and raise ValueError when end is not in it.
+    """
+    check_endpoints(maze_map, start, end)
+    height, width = maze_map.shape
+    mask = np.zeros((height + 2, width + 2), dtype=np.uint8)
+    cv2.floodFill(np.ascontiguousarray(maze_map, dtype=np.uint8), mask, (int(start[1]), int(start[0])), 1,
+                  flags=4 | cv2.FLOODFILL_MASK_ONLY | (1 << 8))
+    if not mask[end[0] + 1, end[1] + 1]:
+        raise ValueError(f"No path found from start to end: end {tuple(map(int, end))} is not in the free "
+                         f"region of start {tuple(map(int, start))}.")
+
+
+def find_solution_path(maze_map, start, end, method="bfs", stats=None, precheck=True, min_clearance=None, key=None):
+    # `key` names this maze for the cached graphs and clearance maps (see maze_graph.maze_key),
+    # so a repeated query does not hash the pixels again
+    if min_clearance is not None:
+        # maze_map is the undilated maze, keep the pixels with enough clearance from the cached clearance map
+        maze_map = clearance_map.get_clearance_map(maze_map, key=key).maze_map(min_clearance).copy()
+        maze_map[start] = 1
+        maze_map[end] = 1
+        if key is not None:
+            key = key, min_clearance, tuple(start), tuple(end)
+
+    if precheck:
+        # Reject disconnected endpoints in linear time before searching, for every method, with a flood
+        # of start's region into a byte mask that is freed before the search allocates its own state
+        check_connected(maze_map, start, end)
+
+    if method == "skeleton":
+        # Dijkstra on the cached corridor graph of this maze, already returns waypoints
+        return maze_graph.get_skeleton_graph(maze_map, key=key).solve(start, end)
+
+    if method == "visibility":
+        # Dijkstra on the cached visibility graph of the wall corners, returns straight segments. Corridors
+        # narrower than the margin the graph erodes the free space by are not in it: when start and end
+        # are connected but the graph has no path, Lazy Theta* below gives the segments instead
+        try:
+            return visibility_graph.get_visibility_graph(maze_map, key=key).solve(start, end)
+        except ValueError:
+            check_connected(maze_map, start, end)
+            if stats is not None:
+                stats["fallback"] = "theta"
+            method = "theta"
+
+    if method == "theta":
+        # Lazy Theta* on blocks of the free pixels pulled taut on the pixels, returns straight segments at any angle
+        waypoints = any_angle.any_angle_search(maze_map, start, end, stats=stats)
+        if waypoints is None:
+            raise ValueError("No path found from start to end.")
+        return waypoints
+
+    if method == "centerline":
+        # Dijkstra on centre-line costs, already returns centred and axis-aligned waypoints
+        waypoints = centerline_planner.centerline_search(maze_map, start, end, stats=stats)
+        if waypoints is None:
+            raise ValueError("No path found from start to end.")
+        return waypoints
+
+    if method == "pyramid":
+        # Coarse-to-fine search, only a band around the coarse path is searched at full resolution
+        path = pyramid_planner.pyramid_search(maze_map, start, end, stats=stats)
+    else:
+        # Search the free cells of maze_map with one of grid_search.SEARCH_METHODS
+        path = grid_search.search(maze_map, start, end, method=method, stats=stats)
+    if path is None:
+        raise ValueError("No path found from start to end.")
+
+    # Simplify the path to include only significant points
+    return simplify_path(path)
+
+
+def turn_indices(points, entrance_threshold=5):
+    """
+    Indices of the turn points simplify_path keeps, for an N x 2 array of (row, col)
+    points whose steps are at most one pixel, found in one vectorised pass.
+
+    With unit steps the 10 degree test of the loop only asks whether two steps go in
+    different directions, so the steps from np.diff are compared as integer codes.
+    The last direction only changes at a point beyond the entrance threshold, where
+    a step is either a turn or already in that direction, so it is the direction of
+    the last such step before (or of the first step).
+    """
+    points = np.asarray(points, dtype=np.int64)
+    if len(points) < 3:
+        return np.zeros(0, dtype=np.int64)
+    steps = np.diff(points, axis=0)
+    codes = 3 * steps[:, 0] + steps[:, 1]
+    # atan2(0, 0) is the angle of a step down, so the loop sees no turn between them
+    codes[codes == 0] = 3
+    if entrance_threshold is None:
+        far = np.ones(len(points), dtype=bool)
+    else:
+        far = np.abs(points[:, 0] - points[0, 0]) + np.abs(points[:, 1] - points[0, 1]) > entrance_threshold
+
+    # step k goes from point k to k + 1, the first one and those ending beyond the threshold set the direction
+    sets = far[1:].copy()
+    sets[0] = True
+    last = np.maximum.accumulate(np.where(sets, np.arange(len(steps)), 0))
+    return np.flatnonzero((codes[1:] != codes[last[:-1]]) & far[2:]) + 1
+
+
+def simplify_path(path, entrance_threshold=5, vectorized=True):
+    """
+    Reduce a pixel path (list of (row, col) or N x 2 array) to its start, turn points
+    and end. Turns closer than `entrance_threshold` (Manhattan) to the start are
+    ignored, None keeps them all. Paths of unit steps go through turn_indices,
+    vectorized=False or longer steps run the original loop; both keep the same points.
+    """
+    threshold = -1 if entrance_threshold is None else entrance_threshold
+    points = np.asarray(path, dtype=np.int64).reshape(-1, 2)
+    turns = None
+    if fast_kernels.COMPILED:
+        # The same turn test as the loop below, compiled
+        turns = fast_kernels.turn_indices(points[:, 0], points[:, 1], threshold)
+    elif vectorized and (len(points) < 2 or np.abs(np.diff(points, axis=0)).max() <= 1):
+        turns = turn_indices(points, entrance_threshold)
+    if turns is not None:
+        keep = np.concatenate(([0], turns, [len(points) - 1]))
+        return [tuple(point) for point in points[keep].tolist()]
+
+    simplified_path = [path[0]]  # Start with the entrance point
+    last_direction = None
+
+    for i in range(1, len(path)):
+        prev_point = path[i - 1]
+        current_point = path[i]
+        # Compute the direction vector
+        direction = (current_point[0] - prev_point[0], current_point[1] - prev_point[1])
+
+        if last_direction is None:
+            last_direction = direction
+            continue
+
+        # Compute the angle between last direction and current direction
+        angle = math.degrees(math.atan2(direction[1], direction[0]) - math.atan2(last_direction[1], last_direction[0]))
+        angle = abs((angle + 180) % 360 - 180)  # Normalize angle to [0, 180]
+
+        # Check if the point is beyond the entrance threshold
+        distance_from_entrance = abs(current_point[0] - path[0][0]) + abs(current_point[1] - path[0][1])
+
+        # Consider it a turn if angle exceeds threshold and beyond entrance threshold
+        if angle > 10 and distance_from_entrance > threshold:
+            simplified_path.append(prev_point)
+            last_direction = direction
+
+    # Add the final point
+    simplified_path.append(path[-1])
+
+    return simplified_path
@@ -0,0 +1,191 @@
+import json
+import math
+import os
+import platform
+import time
+import numpy as np
+import maze_lattice
+import solution_path
+
+# Methods of find_solution_path that find a shortest 4-connected path, so their
+# waypoints have the same path length and only differ in speed and in which of
+# several equally short paths they take; the calibration times each of them and
+# checks the lengths against bfs. "pyramid" and "skeleton" may return longer paths,
+# "skeleton", "theta" and "visibility" no cardinal waypoints, so they are only used
+# when asked for by name
+CANDIDATES = ("bfs", "astar", "jps", "bidirectional")
+
+# Used when there is no calibration for this machine yet
+DEFAULT_METHOD = "jps"
+
+# Rows (and columns) of the map the corridor width is estimated from
+STATISTICS_LINES = 256
+
+CALIBRATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "solver_calibration.json")
+
+
+def maze_statistics(maze_map, binary_img=None):
+    """
+    Cheap statistics of a maze map (1 = free) to choose a solver by: pixel count,
+    free-pixel ratio, corridor width and whether a regular block lattice is found
+    (on binary_img if given, else on the map). The corridor width is estimated
+    from STATISTICS_LINES random rows and as many columns of the map: free pixels
+    per free run end, twice the area over the boundary length, which is exact for
+    straight corridors. Returns (statistics dict, MazeLattice or None).
+    """
+    free_pixels = int(np.count_nonzero(maze_map == 1))
+    # random rather than every n-th line, which can alias with the block pitch
+    rng = np.random.default_rng(0)
+    rows = np.sort(rng.choice(maze_map.shape[0], min(maze_map.shape[0], STATISTICS_LINES), replace=False))
+    cols = np.sort(rng.choice(maze_map.shape[1], min(maze_map.shape[1], STATISTICS_LINES), replace=False))
+    sampled, ends = 0, 0
+    for lines in (maze_map[rows], maze_map[:, cols].T):
+        # a wall column on both sides closes the runs at the border
+        padded = np.zeros((lines.shape[0], lines.shape[1] + 2), dtype=bool)
+        padded[:, 1:-1] = lines == 1
+        sampled += int(np.count_nonzero(padded))
+        ends += int(np.count_nonzero(padded[:, 1:] != padded[:, :-1]))
+    lattice = maze_lattice.detect_lattice(binary_img if binary_img is not None else maze_map)
+    statistics = {
+        "pixels": int(maze_map.size),
+        "free_ratio": free_pixels / max(maze_map.size, 1),
+        "corridor_width": sampled / ends if ends else 0.0,
+        "lattice": lattice is not None,
+    }
+    return statistics, lattice
+
+
+def features(statistics):
+    """
+    Position of a maze in the space the calibrated mazes are compared in.
+    """
+    return np.array([math.log2(max(statistics["pixels"], 1)),
+                     math.log2(max(statistics["corridor_width"], 1.0)),
+                     statistics["free_ratio"]])
+
+
+def path_length(waypoints):
+    """
+    Length in pixels of a path of cardinal waypoints.
+    """
+    return int(sum(abs(b[0] - a[0]) + abs(b[1] - a[1]) for a, b in zip(waypoints[:-1], waypoints[1:])))
+
+
+def calibrate(sizes=(256, 512, 1024, 2048), corridors=((16, 4), (64, 8)), methods=CANDIDATES,
+              path=CALIBRATION_FILE):
+    """
+    Time every candidate method on synthetic mazes of each size and (cell, wall)
+    corridor layout, and store the statistics, the times and the fastest method of
+    every maze as JSON at `path` (None to skip writing). Each maze is new, so the
+    times include building per-maze caches like the skeleton graph.
+    Returns the calibration dict.
+    """
+    import benchmark_search
+
+    entries = []
+    print(f"{'size':>6} {'corridor':>9} " + " ".join(f"{method:>10}" for method in methods) + f" {'fastest':>20}")
+    for cell, wall in corridors:
+        for size in sizes:
+            maze_map, entrance, exit_point = benchmark_search.load_maze(size, cell=cell, wall=wall)
+            statistics, _ = maze_statistics(maze_map)
+            seconds, lengths = {}, {}
+            for method in methods:
+                t0 = time.perf_counter()
+                waypoints = solution_path.find_solution_path(maze_map, entrance, exit_point, method=method)
+                seconds[method] = time.perf_counter() - t0
+                lengths[method] = path_length(waypoints)
+            # a method whose path is longer than the BFS one is never picked for this maze
+            shortest = path_length(solution_path.find_solution_path(maze_map, entrance, exit_point, method="bfs"))
+            exact = [method for method in methods if lengths[method] == shortest]
+            for method in set(methods) - set(exact):
+                print(f"{method} found a path of {lengths[method]} px instead of {shortest} px")
+            fastest = min(exact, key=seconds.get) if exact else DEFAULT_METHOD
+            entries.append({"statistics": statistics, "seconds": seconds, "fastest": fastest})
+            print(f"{size:>6} {statistics['corridor_width']:>7.1f}px " +
+                  " ".join(f"{seconds[method]:>9.3f}s" for method in methods) + f" {fastest:>20}")
+
+    calibration = {"machine": platform.node(), "created": time.strftime("%Y-%m-%d %H:%M:%S"), "entries": entries}
+    if path is not None:
+        with open(path, "w") as f:
+            json.dump(calibration, f, indent=1)
+    return calibration
+
+
+def load_calibration(path=CALIBRATION_FILE):
+    """
+    The stored calibration, or None if it has not been run on this machine.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+_calibration = {}
+
+
+def get_calibration(path=CALIBRATION_FILE):
+    """
+    load_calibration, read from disk only the first time.
+    """
+    if path not in _calibration:
+        _calibration[path] = load_calibration(path)
+    return _calibration[path]
+
+
+def select_method(statistics, calibration=None):
+    """
+    Solver for a maze with the given statistics: the lattice solver when a lattice
+    was found, else the method that was fastest on the nearest calibrated maze, or
+    DEFAULT_METHOD without a calibration.
+    """
+    if statistics["lattice"]:
+        return "lattice"
+    if not calibration or not calibration["entries"]:
+        return DEFAULT_METHOD
+    position = features(statistics)
+    nearest = min(calibration["entries"], key=lambda entry: np.linalg.norm(features(entry["statistics"]) - position))
+    if nearest["fastest"] in CANDIDATES:
+        return nearest["fastest"]
+    # stored before the candidates were narrowed to the shortest-path searches
+    seconds = {method: t for method, t in nearest["seconds"].items() if method in CANDIDATES}
+    return min(seconds, key=seconds.get) if seconds else DEFAULT_METHOD
+
+
+def solve(maze_map, start, end, method="auto", binary_img=None, stats=None, calibration=None, **kwargs):
+    """
+    One entry point for solving a maze map in place of find_solution_path. With
+    method="auto" the solver is chosen by select_method from maze_statistics and
+    the stored calibration; any other method goes to find_solution_path as it is.
+    Other keyword arguments are passed on to find_solution_path.
+
+    If a `stats` dict is given, the chosen solver is stored under "solver", the
+    maze statistics under "statistics" and the detected MazeLattice (or None)
+    under "lattice", so callers reuse its pitch instead of detecting it again.
+    Raises ValueError if there is no path.
+    """
+    if method == "auto":
+        statistics, lattice = maze_statistics(maze_map, binary_img)
+        method = select_method(statistics, calibration if calibration is not None else get_calibration())
+        if stats is not None:
+            stats["statistics"] = statistics
+            stats["lattice"] = lattice
+        if method == "lattice":
+            try:
+                waypoints = lattice.solve(start, end)
+                if stats is not None:
+                    stats["solver"] = method
+                return waypoints
+            except ValueError:
+                # start or end off the lattice: choose among the pixel solvers
+                statistics = dict(statistics, lattice=False)
+                method = select_method(statistics, calibration if calibration is not None else get_calibration())
+    if stats is not None:
+        stats["solver"] = method
+    return solution_path.find_solution_path(maze_map, start, end, method=method, stats=stats, **kwargs)
+
+
+if __name__ == "__main__":
+    # Re-run the calibration on this machine and store it next to this file
+    calibrate()
+    print(f"Calibration stored in {CALIBRATION_FILE}")
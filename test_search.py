@@ -0,0 +1,199 @@
+import itertools
+import cv2
+import numpy as np
+import benchmark_search
+import clearance_map
+import fast_kernels
+import grid_search
+import incremental_planner
+import maze_graph
+import maze_reduction
+import maze_solving
+import segment_path
+import solution_path
+
+
+def random_maps(count=200, seed=0):
+    """
+    Small random maps (1 = free) with start and end in opposite corners, half of them
+    noise and half smoothed into blobs, so many are cut apart at diagonal pinches.
+    """
+    rng = np.random.default_rng(seed)
+    for k in range(count):
+        height, width = rng.integers(6, 30, size=2)
+        maze_map = (rng.random((height, width)) > 0.35).astype(np.uint8)
+        if k % 2:
+            maze_map = (cv2.medianBlur(255 * maze_map, 3) > 0).astype(np.uint8)
+        start, end = (0, 0), (int(height) - 1, int(width) - 1)
+        maze_map[start] = maze_map[end] = 1
+        yield maze_map, start, end
+
+
+def small_mazes():
+    """
+    Fixed small synthetic mazes (maze_map, entrance, exit_point), from wide to narrow corridors.
+    """
+    for size, cell, wall in ((128, 32, 8), (192, 16, 4), (96, 8, 2)):
+        yield benchmark_search.load_maze(size, cell=cell, wall=wall)
+
+
+def is_path(maze_map, path, start, end):
+    # 4-connected steps over free cells from start to end
+    steps = np.abs(np.diff(np.array(path), axis=0)).sum(axis=1)
+    return path[0] == start and path[-1] == end and (steps == 1).all() and all(maze_map[point] == 1 for point in path)
+
+
+def python_kernel(function):
+    # the Python function behind a Numba kernel, or the function itself without Numba
+    return getattr(function, "py_func", function)
+
+
+def skeleton_path(maze_map, start, end):
+    try:
+        return maze_graph.SkeletonGraph(maze_map).solve(start, end)
+    except ValueError:
+        return None
+
+
+def test_skeleton_does_not_cross_a_diagonal_pinch():
+    # two free blocks that touch only at one corner
+    maze_map = np.zeros((6, 7), dtype=np.uint8)
+    maze_map[0:3, 0:3] = 1
+    maze_map[3:6, 3:7] = 1
+    assert grid_search.bfs_search(maze_map, (0, 0), (5, 6)) is None
+    assert skeleton_path(maze_map, (0, 0), (5, 6)) is None
+
+
+def test_skeleton_agrees_with_bfs_on_reachability():
+    for maze_map, start, end in random_maps():
+        found = grid_search.bfs_search(maze_map, start, end) is not None
+        assert (skeleton_path(maze_map, start, end) is not None) == found
+
+
+def test_visibility_finds_a_path_in_narrow_corridors():
+    for corridor in (2, 3, 4, 5):
+        maze_map, entrance, exit_point = benchmark_search.load_maze(128, cell=corridor + 2, wall=2)
+        assert grid_search.bfs_search(maze_map, entrance, exit_point) is not None
+        waypoints = solution_path.find_solution_path(maze_map, entrance, exit_point, method="visibility")
+        assert waypoints[0] == entrance and waypoints[-1] == exit_point
+
+
+def test_visibility_agrees_with_bfs_on_reachability():
+    for maze_map, start, end in random_maps():
+        found = grid_search.bfs_search(maze_map, start, end) is not None
+        try:
+            waypoints = solution_path.find_solution_path(maze_map, start, end, method="visibility")
+        except ValueError:
+            waypoints = None
+        assert (waypoints is not None) == found
+
+
+def test_clearance_map_matches_the_wall_dilation():
+    # robot sizes with odd and even kernels, 35 is the 18 px kernel of maze_solving.main
+    binary_img = benchmark_search.make_test_maze(640, cell=40, wall=6)
+    clearance = clearance_map.ClearanceMap(binary_img)
+    for robot_size in (10, 20, 35, 36, 60, 90):
+        kernel_size = int(np.ceil(robot_size / 2))
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_size, kernel_size))
+        dilated = cv2.dilate(255 - binary_img, kernel)
+        adjusted = clearance.maze_map(clearance_map.clearance_for_robot(robot_size))
+        assert (255 * adjusted == 255 - dilated).all()
+
+
+def test_bfs_search_matches_the_original_bfs():
+    for maze_map, start, end in itertools.chain(small_mazes(), random_maps(50)):
+        assert grid_search.bfs_search(maze_map, start, end) == benchmark_search.reference_bfs(maze_map, start, end)
+
+
+def test_bfs_parents_matches_the_kernel():
+    steps_row, steps_col = np.array([-1, 1, 0, 0]), np.array([0, 0, 1, -1])
+    for maze_map, start, end in small_mazes():
+        height, width = maze_map.shape
+        arguments = (maze_map.reshape(-1), height, width, start[0] * width + start[1], end[0] * width + end[1],
+                     steps_row, steps_col)
+        for keep_last in (False, True):
+            parent, expanded = grid_search.bfs_parents(*arguments, keep_last)
+            kernel_parent, kernel_expanded = python_kernel(fast_kernels.bfs_parents)(*arguments, keep_last)
+            assert (parent == kernel_parent).all() and expanded == kernel_expanded
+
+
+def test_search_methods_match_bfs():
+    for maze_map, start, end in small_mazes():
+        reference = grid_search.bfs_search(maze_map, start, end)
+        assert grid_search.packed_bfs_search(maze_map, start, end) == reference
+        paths = [grid_search.search(maze_map, start, end, method=method) for method in grid_search.SEARCH_METHODS
+                 if method != "turns"]
+        paths.append(grid_search.turn_search(maze_map, start, end, turn_cost=0))
+        for path in paths:
+            assert is_path(maze_map, path, start, end) and len(path) == len(reference)
+    for maze_map, start, end in random_maps(50):
+        found = grid_search.bfs_search(maze_map, start, end) is not None
+        for method in grid_search.SEARCH_METHODS:
+            assert (grid_search.search(maze_map, start, end, method=method) is not None) == found
+
+
+def test_incremental_repair_matches_bfs():
+    rng = np.random.default_rng(0)
+    maze_map, start, end = benchmark_search.load_maze(128, cell=16, wall=4)
+    planner = incremental_planner.IncrementalPlanner(maze_map, start, end)
+    assert len(planner.path()) == len(grid_search.bfs_search(maze_map, start, end))
+    for _ in range(10):
+        # a live frame with a few flipped 4x4 patches
+        frame = maze_map.copy()
+        for row, col in rng.integers(124, size=(5, 2)):
+            frame[row:row + 4, col:col + 4] ^= 1
+        frame[start] = frame[end] = 1
+        path = planner.update(frame)
+        reference = grid_search.bfs_search(frame, start, end)
+        assert (path is None) == (reference is None)
+        assert path is None or (is_path(frame, path, start, end) and len(path) == len(reference))
+
+
+def test_dead_end_filling_keeps_the_shortest_length():
+    for maze_map, start, end in small_mazes():
+        reduced = maze_reduction.fill_dead_ends(maze_map, keep=(start, end))
+        assert len(grid_search.bfs_search(reduced, start, end)) == len(grid_search.bfs_search(maze_map, start, end))
+
+
+def test_nearest_pair_matches_every_pair():
+    blocks, repeats = benchmark_search.make_test_blocks(256, cell=32, wall=8)
+    # open a few more border cells so there are several entrances and exits
+    blocks[0, [3, 7]] = blocks[-1, [1, 5]] = blocks[[3, 5], 0] = blocks[[1, 7], -1] = 255
+    maze_map = (np.repeat(np.repeat(blocks, repeats, axis=0), repeats, axis=1) // 255).astype(np.uint8)
+    entrances, exits = grid_search.split_openings(maze_solving.border_openings(255 * maze_map), maze_map.shape)
+    assert len(entrances) > 1 and len(exits) > 1
+    points = entrances + exits
+    i, j, path = grid_search.nearest_pair_search(maze_map, points, groups=[0] * len(entrances) + [1] * len(exits))
+    lengths = [len(grid_search.bfs_search(maze_map, a, b) or ()) for a, b in itertools.product(entrances, exits)]
+    assert is_path(maze_map, path, points[i], points[j])
+    assert len(path) == min(length for length in lengths if length)
+
+
+def test_first_wall_matches_the_kernel():
+    first_wall = python_kernel(fast_kernels.first_wall)
+    maze_map, start, end = benchmark_search.load_maze(96, cell=8, wall=2)
+    height, width = maze_map.shape
+    img = np.repeat(255 * maze_map[:, :, None], 3, axis=2)
+    wall = grid_search.wall_mask(img)
+    # every path pixel, the corners and rays leaving the image at its four borders
+    points = grid_search.bfs_search(maze_map, start, end) + [(0, 0), (0, width - 1), (height - 1, 0),
+                                                             (height - 1, width - 1), (3, width - 2), (height - 2, 5)]
+    for row, col in points:
+        for dr, dc in grid_search.DIRECTIONS:
+            for side in (-1, 1):
+                assert (first_wall(img, row, col, dr, dc, side * dc, side * dr, 16) ==
+                        grid_search.first_wall(wall, row, col, dr, dc, side * dc, side * dr, 16))
+
+
+def test_simplify_path_matches_the_loop():
+    for maze_map, start, end in small_mazes():
+        path = grid_search.bfs_search(maze_map, start, end)
+        assert solution_path.simplify_path(path) == solution_path.simplify_path(path, vectorized=False)
+
+
+def test_segments_expand_to_the_path():
+    for maze_map, start, end in small_mazes():
+        path = grid_search.bfs_search(maze_map, start, end)
+        # with every turn kept the waypoints are the corners of the path
+        segments = segment_path.SegmentPath.from_points(solution_path.simplify_path(path, entrance_threshold=None))
+        assert [tuple(point) for point in segments.pixels().tolist()] == path
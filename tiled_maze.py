@@ -0,0 +1,349 @@
+import heapq
+import tempfile
+from collections import OrderedDict
+import numpy as np
+import grid_search
+
+# Side of a square tile in pixels
+TILE = 1024
+
+# Distance of cells not reached (yet)
+UNREACHED = np.iinfo(np.int32).max
+
+
+def read_pgm_header(path):
+    """
+    Return (shape, offset) of the pixels of a binary 8-bit PGM (P5) image: its height
+    and width and the byte offset where the raw pixel rows start.
+    """
+    with open(path, "rb") as f:
+        fields = []
+        while len(fields) < 4:
+            line = f.readline()
+            if not line:
+                raise ValueError(f"{path} is not a binary PGM image.")
+            fields.extend(line.split(b"#")[0].split())
+        # the pixels start right after the single whitespace that ends the header
+        offset = f.tell()
+    if fields[0] != b"P5" or int(fields[3]) > 255:
+        raise ValueError(f"{path} is not an 8-bit binary PGM image.")
+    return (int(fields[2]), int(fields[1])), offset
+
+
+def write_pgm_header(f, shape):
+    f.write(b"P5\n%d %d\n255\n" % (shape[1], shape[0]))
+
+
+class TiledMaze(object):
+    """
+    A maze image too large for memory, read from a raw 8-bit file one tile at a time.
+
+    The file is mapped with np.memmap only for the band of rows of the tile being read
+    and the mapping is dropped right after, so pages of the image never pile up in the
+    process. The thresholded tiles (1 = free) are kept in a small LRU cache.
+    """
+
+    def __init__(self, filename, shape, offset=0, tile=TILE, threshold=127, cached_tiles=16):
+        self.filename = filename
+        self.shape = (int(shape[0]), int(shape[1]))
+        self.offset = offset
+        self.tile = tile
+        self.threshold = threshold
+        self.cached_tiles = cached_tiles
+        self.tiles = (-(-self.shape[0] // tile), -(-self.shape[1] // tile))
+        self.cache = OrderedDict()
+        self.loads = 0
+
+    @classmethod
+    def from_pgm(cls, path, **kwargs):
+        shape, offset = read_pgm_header(path)
+        return cls(path, shape, offset, **kwargs)
+
+    @classmethod
+    def from_npy(cls, path, **kwargs):
+        pixels = np.load(path, mmap_mode="r")
+        if pixels.dtype != np.uint8 or pixels.ndim != 2 or not pixels.flags.c_contiguous:
+            raise ValueError(f"{path} does not hold a 2-D C-ordered uint8 image.")
+        shape, offset = pixels.shape, pixels.offset
+        del pixels
+        return cls(path, shape, offset, **kwargs)
+
+    def read(self, rows, cols):
+        """
+        Pixels of the given row and column ranges, read through a temporary mapping of
+        just those rows.
+        """
+        (r0, r1), (c0, c1) = rows, cols
+        band = np.memmap(self.filename, dtype=np.uint8, mode="r", offset=self.offset + r0 * self.shape[1],
+                         shape=(r1 - r0, self.shape[1]))
+        pixels = np.array(band[:, c0:c1])
+        del band
+        return pixels
+
+    def origin(self, tile):
+        return tile[0] * self.tile, tile[1] * self.tile
+
+    def tile_of(self, point):
+        return int(point[0]) // self.tile, int(point[1]) // self.tile
+
+    def tile_map(self, tile):
+        """
+        Binary map (1 = free) of one tile, from the cache or read from the file.
+        """
+        if tile in self.cache:
+            self.cache.move_to_end(tile)
+            return self.cache[tile]
+        r0, c0 = self.origin(tile)
+        r1, c1 = min(r0 + self.tile, self.shape[0]), min(c0 + self.tile, self.shape[1])
+        maze_map = (self.read((r0, r1), (c0, c1)) > self.threshold).astype(np.uint8)
+        self.loads += 1
+        self.cache[tile] = maze_map
+        if len(self.cache) > self.cached_tiles:
+            self.cache.popitem(last=False)
+        return maze_map
+
+    def border(self, side):
+        """
+        Free flags along one border of the image: "top", "bottom", "left" or "right".
+        """
+        height, width = self.shape
+        if side in ("top", "bottom"):
+            row = 0 if side == "top" else height - 1
+            return self.read((row, row + 1), (0, width))[0] > self.threshold
+        col = 0 if side == "left" else width - 1
+        return np.concatenate([self.read((r0, min(r0 + self.tile, height)), (col, col + 1))[:, 0]
+                               for r0 in range(0, height, self.tile)]) > self.threshold
+
+    def entrance_exit(self):
+        """
+        Entrance and exit among the centres of the openings on the border, split like
+        maze_solving.detect_entrance_exit: the entrance on the top or left border, the
+        exit on the bottom or right one. With more than one candidate on a side the
+        first of each in grid_search.split_openings is taken, no search is run on the
+        sheet.
+        """
+        openings = grid_search.perimeter_openings(self.border("top"), self.border("right"),
+                                                  self.border("bottom"), self.border("left"))
+        entrances, exits = grid_search.split_openings(openings, self.shape)
+        if len(entrances) == 0:
+            raise ValueError("Entrance not found.")
+        if len(exits) == 0:
+            raise ValueError("Exit not found.")
+        return entrances[0], exits[0]
+
+
+class TiledPlanner(object):
+    """
+    Out-of-core BFS over a TiledMaze. The distance of every pixel lives in a
+    temporary file on disk, not in memory. Tiles are flooded one at a time,
+    always the tile with the closest pending offer first. An offer is a cell
+    reached across a tile border, with its distance. A pass floods its tile from
+    the offers that improve it and sends an offer across every border cell it
+    improved, so a tile is flooded again if a shorter way into it turns up later.
+    The search stops when no pending offer can shorten the path to the end, at
+    which point the distances to it are exact.
+
+    Only the current tile, the tile cache and the pending offers are resident.
+    The path is recovered by walking down the stored distances from the end.
+    """
+
+    def __init__(self, maze):
+        self.maze = maze
+        height, width = maze.shape
+        # stored value is distance + 1, so the zero-filled file means "not reached"
+        self.store = tempfile.TemporaryFile()
+        self.store.truncate(height * width * 4)
+        self.passes = 0
+
+    def close(self):
+        self.store.close()
+
+    def distances(self, tile, values=None):
+        """
+        Read the stored values of a tile, or write `values` over them.
+        """
+        height, width = self.maze.shape
+        r0, c0 = self.maze.origin(tile)
+        r1, c1 = min(r0 + self.maze.tile, height), min(c0 + self.maze.tile, width)
+        band = np.memmap(self.store, dtype=np.int32, mode="r+", offset=r0 * width * 4, shape=(r1 - r0, width))
+        if values is None:
+            values = np.array(band[:, c0:c1])
+        else:
+            band[:, c0:c1] = values
+        del band
+        return values
+
+    def flood_tile(self, tile, offers):
+        """
+        One BFS pass over a tile from offers {cell: distance} in image coordinates.
+        Returns the offers for the neighbouring tiles, {cell: distance}, and the
+        stored values of the tile after the pass.
+        """
+        self.passes += 1
+        free = self.maze.tile_map(tile)
+        height, width = free.shape
+        r0, c0 = self.maze.origin(tile)
+        stored = self.distances(tile)
+        distance = np.where(stored > 0, stored.astype(np.int64) - 1, UNREACHED).reshape(-1)
+        before = distance.copy()
+        flat_free = free.reshape(-1) == 1
+
+        cells = np.array([(row - r0) * width + col - c0 for row, col in offers], dtype=np.int64)
+        values = np.array(list(offers.values()), dtype=np.int64)
+        order = np.argsort(values, kind="stable")
+        cells, values = cells[order], values[order]
+        keep = flat_free[cells] & (values < distance[cells])
+        cells, values = cells[keep], values[keep]
+
+        frontier = np.zeros(0, dtype=np.int64)
+        level = int(values[0]) if len(values) else 0
+        k = 0
+        while len(frontier) or k < len(values):
+            if not len(frontier):
+                level = max(level, int(values[k]))
+            # offers join the wave when it reaches their distance
+            joining = k
+            while joining < len(values) and values[joining] == level:
+                joining += 1
+            if joining > k:
+                new = cells[k:joining]
+                new = np.unique(new[distance[new] > level])
+                distance[new] = level
+                frontier = np.union1d(frontier, new)
+                k = joining
+
+            candidates, _ = grid_search.neighbor_candidates(frontier, flat_free, width)
+            frontier = np.unique(candidates[distance[candidates] > level + 1])
+            distance[frontier] = level + 1
+            level += 1
+
+        reached = distance != UNREACHED
+        stored = np.where(reached, distance + 1, 0).astype(np.int32).reshape(height, width)
+        self.distances(tile, stored)
+
+        # improved border cells pass one step more across the border
+        improved = (distance < before).reshape(height, width)
+        distance = distance.reshape(height, width)
+        sent = {}
+        for dr, dc in grid_search.DIRECTIONS:
+            if dr:
+                row = 0 if dr == -1 else height - 1
+                if not 0 <= r0 + row + dr < self.maze.shape[0]:
+                    continue
+                for col in np.flatnonzero(improved[row]).tolist():
+                    sent[(r0 + row + dr, c0 + col)] = int(distance[row, col]) + 1
+            else:
+                col = 0 if dc == -1 else width - 1
+                if not 0 <= c0 + col + dc < self.maze.shape[1]:
+                    continue
+                for row in np.flatnonzero(improved[:, col]).tolist():
+                    sent[(r0 + row, c0 + col + dc)] = int(distance[row, col]) + 1
+        return sent, stored
+
+    def search(self, start, end, stats=None):
+        """
+        Flood tiles from start until the distance to end is final. Returns the length
+        of the shortest path, or None when end cannot be reached.
+        """
+        start, end = (int(start[0]), int(start[1])), (int(end[0]), int(end[1]))
+        end_tile = self.maze.tile_of(end)
+        pending = {self.maze.tile_of(start): {start: 0}}
+        queue = [(0, self.maze.tile_of(start))]
+        best = UNREACHED
+        largest = 1
+        while queue:
+            closest, tile = heapq.heappop(queue)
+            if tile not in pending or min(pending[tile].values()) != closest:
+                continue
+            if closest >= best:
+                break
+            sent, stored = self.flood_tile(tile, pending.pop(tile))
+            if tile == end_tile:
+                r0, c0 = self.maze.origin(tile)
+                value = int(stored[end[0] - r0, end[1] - c0])
+                if value:
+                    best = min(best, value - 1)
+            for cell, distance in sent.items():
+                offers = pending.setdefault(self.maze.tile_of(cell), {})
+                if distance < offers.get(cell, UNREACHED):
+                    offers[cell] = distance
+                    heapq.heappush(queue, (min(offers.values()), self.maze.tile_of(cell)))
+            largest = max(largest, sum(len(offers) for offers in pending.values()))
+
+        if stats is not None:
+            stats["passes"] = self.passes
+            stats["tile_loads"] = self.maze.loads
+            stats["pending"] = largest
+            stats["length"] = best if best != UNREACHED else None
+        return best if best != UNREACHED else None
+
+    def waypoints(self, start, end):
+        """
+        Turn points of a shortest path from start to end, walking from end down the
+        stored distances one pixel at a time. The walk keeps its direction while it
+        can, so corridors come out straight.
+        """
+        start, end = (int(start[0]), int(start[1])), (int(end[0]), int(end[1]))
+        height, width = self.maze.shape
+        tiles = OrderedDict()
+
+        def value(cell):
+            tile = self.maze.tile_of(cell)
+            if tile not in tiles:
+                tiles[tile] = self.distances(tile)
+                if len(tiles) > 4:
+                    tiles.popitem(last=False)
+            r0, c0 = self.maze.origin(tile)
+            return int(tiles[tile][cell[0] - r0, cell[1] - c0])
+
+        points = [end]
+        cell, heading = end, None
+        current = value(end)
+        while cell != start:
+            moves = grid_search.DIRECTIONS if heading is None else [heading] + grid_search.DIRECTIONS
+            for dr, dc in moves:
+                row, col = cell[0] + dr, cell[1] + dc
+                if 0 <= row < height and 0 <= col < width and value((row, col)) == current - 1:
+                    cell, heading = (row, col), (dr, dc)
+                    current -= 1
+                    break
+            add_turn_points(points, [cell])
+        return points[::-1]
+
+
+def add_turn_points(points, path):
+    """
+    Extend a list of turn points with the following cells of a 4-connected path,
+    keeping only the cells where the direction changes and the last one.
+    """
+    for cell in path:
+        if len(points) >= 2:
+            a, b = points[-2], points[-1]
+            if (b[0] - a[0]) * (cell[1] - b[1]) == (b[1] - a[1]) * (cell[0] - b[0]):
+                # straight on: move the last turn point instead of adding one
+                points[-1] = cell
+                continue
+        points.append(cell)
+
+
+def solve_sheet(path, start=None, end=None, tile=TILE, threshold=127, stats=None):
+    """
+    Turn points of a path through a large maze sheet stored as an 8-bit PGM or .npy
+    image, without ever reading the whole image. Entrance and exit are found on the
+    border like in maze_solving when not given. Raises ValueError if there is no path.
+    """
+    if str(path).endswith(".npy"):
+        maze = TiledMaze.from_npy(path, tile=tile, threshold=threshold)
+    else:
+        maze = TiledMaze.from_pgm(path, tile=tile, threshold=threshold)
+    if start is None or end is None:
+        entrance, exit_point = maze.entrance_exit()
+        start = entrance if start is None else start
+        end = exit_point if end is None else end
+    planner = TiledPlanner(maze)
+    try:
+        if planner.search(start, end, stats=stats) is None:
+            raise ValueError("No path found from start to end.")
+        return planner.waypoints(start, end)
+    finally:
+        planner.close()
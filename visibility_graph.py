@@ -0,0 +1,209 @@
+import heapq
+import math
+import cv2
+import numpy as np
+import clearance_map
+import maze_graph
+
+
+def orientation(ax, ay, bx, by, cx, cy):
+    """
+    Sign of the turn a -> b -> c for arrays of points: 1 left, -1 right, 0 collinear.
+    """
+    return np.sign((bx - ax) * (cy - ay) - (by - ay) * (cx - ax))
+
+
+def inflated_free_map(binary_img, robot_radius):
+    """
+    Pixels where a square robot of half-width `robot_radius` fits, i.e. the maze with
+    its walls inflated by the robot, from the cached clearance map of the image.
+    """
+    return clearance_map.get_clearance_map(binary_img).maze_map(int(robot_radius) + 1)
+
+
+class VisibilityGraph(object):
+    """
+    Visibility graph of the obstacle corners of a free map (1 = free for the robot's
+    centre, so walls are already inflated by the robot, see inflated_free_map).
+
+    The boundary of the free space is traced with cv2.findContours and simplified
+    with cv2.approxPolyDP into polygons. Only the corners where an obstacle pokes
+    into the free space can lie on a shortest path, so those are the graph nodes;
+    two nodes are joined when the segment between them crosses no polygon edge and
+    stays in free space. Queries are Dijkstra over the nodes plus start and end,
+    so their cost depends on the number of wall corners, not on the resolution.
+    """
+
+    # points sampled on every candidate segment against the free map
+    samples = 16
+
+    def __init__(self, free_map, epsilon=2.0):
+        self.free = free_map == 1
+        height, width = self.free.shape
+        # trace the polygons on a slightly eroded map, so the approximation error of
+        # approxPolyDP never reaches into the walls
+        margin = int(math.ceil(epsilon))
+        eroded = cv2.erode(self.free.astype(np.uint8), np.ones((2 * margin + 1, 2 * margin + 1), np.uint8))
+        contours, hierarchy = cv2.findContours(eroded, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)
+
+        nodes, before, after, starts, ends = [], [], [], [], []
+        for k, contour in enumerate(contours):
+            polygon = cv2.approxPolyDP(contour, epsilon, True).reshape(-1, 2).astype(np.float64)
+            if len(polygon) < 3:
+                continue
+            # contour of a hole in the free space, i.e. of a free-standing obstacle
+            hole = hierarchy[0][k][3] != -1
+            previous, following = np.roll(polygon, 1, axis=0), np.roll(polygon, -1, axis=0)
+            area = np.sum(polygon[:, 0] * following[:, 1] - following[:, 0] * polygon[:, 1])
+            turn = orientation(previous[:, 0], previous[:, 1], polygon[:, 0], polygon[:, 1],
+                               following[:, 0], following[:, 1]) * np.sign(area)
+            # corners convex towards the obstacle: concave corners of an outer free
+            # boundary, convex corners of a hole
+            corners = turn > 0 if hole else turn < 0
+            nodes.extend(polygon[corners].tolist())
+            before.extend(previous[corners].tolist())
+            after.extend(following[corners].tolist())
+            # edges along the image border are openings of the maze, not walls
+            border = (((polygon[:, 0] == 0) & (following[:, 0] == 0)) |
+                      ((polygon[:, 0] == width - 1) & (following[:, 0] == width - 1)) |
+                      ((polygon[:, 1] == 0) & (following[:, 1] == 0)) |
+                      ((polygon[:, 1] == height - 1) & (following[:, 1] == height - 1)))
+            starts.append(polygon[~border])
+            ends.append(following[~border])
+
+        self.nodes = np.array(nodes, dtype=np.float64).reshape(-1, 2)  # (x, y) = (col, row)
+        # the polygon edges of every corner point from it along the two sides of the obstacle
+        self.sides = (np.array(before, dtype=np.float64).reshape(-1, 2) - self.nodes,
+                      np.array(after, dtype=np.float64).reshape(-1, 2) - self.nodes)
+        self.edge_starts = np.concatenate(starts) if starts else np.zeros((0, 2))
+        self.edge_ends = np.concatenate(ends) if ends else np.zeros((0, 2))
+        self.adjacency = self.connect(self.nodes, same=True)
+
+    def leaves_corner(self, ids, directions):
+        """
+        Whether a segment leaving the corners `ids` in `directions` (n x 2) stays out of
+        the obstacle: the obstacle fills the angle under 180 degrees between the two
+        polygon edges of a corner, and the segment may run along an edge but not inside.
+        """
+        first, second = self.sides[0][ids], self.sides[1][ids]
+
+        def cross(u, v):
+            return np.sign(u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0])
+
+        turn = cross(first, second)
+        return ~((cross(first, directions) == turn) & (cross(directions, second) == turn))
+
+    def visible(self, a, targets, source=None, target_ids=None):
+        """
+        Boolean mask of the targets (n x 2, x/y) that can be reached from point a in
+        a straight line: every sample on the segment is in free space, the segment
+        neither crosses nor touches a polygon edge other than those meeting at its ends,
+        and it does not leave a corner into its obstacle. `source` and `target_ids` are
+        the node indices of a and of the targets, if they are corners.
+        """
+        mask = np.zeros(len(targets), dtype=bool)
+        if len(targets) == 0:
+            return mask
+        ax, ay = a
+        t = (np.arange(1, self.samples) / self.samples)[None, :]
+        cols = np.rint(ax + t * (targets[:, 0:1] - ax)).astype(np.int64)
+        rows = np.rint(ay + t * (targets[:, 1:2] - ay)).astype(np.int64)
+        # the cheap test first, most pairs in a maze are blocked by a wall
+        clear = self.free[rows, cols].all(axis=1)
+        if source is not None:
+            clear &= self.leaves_corner(np.full(len(targets), source), targets - a)
+        if target_ids is not None:
+            clear &= self.leaves_corner(target_ids, a - targets)
+        candidates = np.flatnonzero(clear)
+        if len(candidates) == 0:
+            return mask
+
+        bx, by = targets[candidates, 0:1], targets[candidates, 1:2]
+        px, py = self.edge_starts[:, 0], self.edge_starts[:, 1]
+        qx, qy = self.edge_ends[:, 0], self.edge_ends[:, 1]
+        hits = ((orientation(ax, ay, bx, by, px, py) * orientation(ax, ay, bx, by, qx, qy) <= 0) &
+                (orientation(px, py, qx, qy, ax, ay) * orientation(px, py, qx, qy, bx, by) <= 0) &
+                (np.minimum(ax, bx) <= np.maximum(px, qx)) & (np.minimum(px, qx) <= np.maximum(ax, bx)) &
+                (np.minimum(ay, by) <= np.maximum(py, qy)) & (np.minimum(py, qy) <= np.maximum(ay, by)))
+        # edges meeting at a or b always touch the segment
+        at_a = ((px == ax) & (py == ay)) | ((qx == ax) & (qy == ay))
+        at_b = ((px == bx) & (py == by)) | ((qx == bx) & (qy == by))
+        hits &= ~(at_a | at_b)
+        mask[candidates[~hits.any(axis=1)]] = True
+        return mask
+
+    def connect(self, sources, same=False):
+        """
+        Adjacency lists [(node index, length), ...] from every source to the visible
+        corner nodes. With same=True the sources are the nodes themselves and each
+        pair is tested once.
+        """
+        adjacency = [[] for _ in range(len(sources))]
+        for i, a in enumerate(sources):
+            first = i + 1 if same else 0
+            ids = np.arange(first, len(self.nodes))
+            mask = self.visible(a, self.nodes[first:], source=i if same else None, target_ids=ids)
+            for j in ids[mask].tolist():
+                length = math.hypot(*(self.nodes[j] - a))
+                adjacency[i].append((j, length))
+                if same:
+                    adjacency[j].append((i, length))
+        return adjacency
+
+    def solve(self, start, end):
+        """
+        Shortest polyline from start to end, (row, col) points, as floats in continuous
+        image coordinates. Raises ValueError if end cannot be reached.
+        """
+        points = np.array([[start[1], start[0]], [end[1], end[0]]], dtype=np.float64)
+        count = len(self.nodes)
+        links = self.connect(points)
+        direct = self.visible(points[0], points[1:])[0]
+
+        # Dijkstra: nodes 0..count-1, start = count, end = count + 1
+        goal = count + 1
+        distance = {count: 0.0}
+        parent = {count: None}
+        queue = [(0.0, count)]
+        done = set()
+        # the end is a neighbour of every node that sees it
+        end_links = {j: length for j, length in links[1]}
+        while queue:
+            d, u = heapq.heappop(queue)
+            if u in done:
+                continue
+            done.add(u)
+            if u == goal:
+                break
+            if u == count:
+                neighbors = list(links[0])
+                if direct:
+                    neighbors.append((goal, math.hypot(*(points[1] - points[0]))))
+            else:
+                neighbors = list(self.adjacency[u])
+                if u in end_links:
+                    neighbors.append((goal, end_links[u]))
+            for v, length in neighbors:
+                if d + length < distance.get(v, math.inf):
+                    distance[v] = d + length
+                    parent[v] = u
+                    heapq.heappush(queue, (d + length, v))
+
+        if goal not in done:
+            raise ValueError("No path found from start to end.")
+        order = [goal]
+        while parent[order[-1]] is not None:
+            order.append(parent[order[-1]])
+        xy = {count: points[0], goal: points[1]}
+        return [(float(p[1]), float(p[0])) for p in (xy[u] if u in xy else self.nodes[u] for u in order[::-1])]
+
+
+_graph_cache = maze_graph.MazeCache()
+
+
+def get_visibility_graph(free_map, epsilon=2.0, key=None):
+    """
+    Return the VisibilityGraph of a free map, building it only the first time it is seen.
+    """
+    key = maze_graph.maze_key(free_map) if key is None else key, epsilon
+    return _graph_cache.get(key, lambda: VisibilityGraph(free_map, epsilon))